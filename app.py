@@ -1,13 +1,78 @@
+import os
+import time
+import threading
+
+# Start of the import, for the startup timing report
+STARTED = time.perf_counter()
+
 import dash
 import dash_bootstrap_components as dbc
 
 from dash import dcc, html
 
+from utils.datasetRegistry import registry
+from utils.callbackCache import warm_callbacks
+from utils.imageRoutes import register_image_routes
+from utils.imageVariants import missing_variants
 
+
+# Dash builds its validation layout from the layout() of every page on the first request. The
+# page layouts are skeletons that read no data; options and figures are filled in by callbacks.
 app = dash.Dash(__name__, use_pages=True)
 
 server = app.server
 
+# Serve the word cloud images as static files
+register_image_routes(server)
+
+
+def warm_up():
+    """
+    Load all datasets that were not requested yet and build the cached figures.
+    """
+    started = time.perf_counter()
+    loaded = registry.load_all()
+    warm_callbacks(background=False)
+    # Workers forked from a preloaded master find everything loaded already
+    if loaded:
+        print(f'{registry.timing_report()}\nWarm-up finished in {time.perf_counter() - started:.2f} s')
+
+    # Without variants the Keyword Analysis page sends the large originals and nothing is prefetched
+    missing = missing_variants()
+    if missing:
+        print(f'Warning: {len(missing)} word clouds have no up-to-date WebP variants, '
+              f'build them with: python -m utils.imageVariants')
+
+
+_background_lock = threading.Lock()
+_background_started = False
+
+
+def start_background_tasks():
+    """
+    Start the threads that warm up the datasets and figures and reload changed datasets, once per process.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
+    # Pages load their datasets on first access; the rest is loaded in the background
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+    # Reload datasets in the background when files under data/ change
+    registry.start_watcher()
+
+
+# The threads are started by the serving process, not at import: the Flask reloader imports the
+# app in a watching process that never serves requests, and threads do not survive a fork. gunicorn
+# preloads the app in its master and starts them in every worker, see post_fork() in gunicorn.conf.py.
+@server.before_request
+def _start_background_tasks():
+    if os.environ.get('DEFER_BACKGROUND_TASKS') != '1':
+        start_background_tasks()
+
 app.layout = html.Div(
     [
         # Header section
@@ -45,6 +110,8 @@ app.layout = html.Div(
     ]
 )
 
+print(f'App imported in {time.perf_counter() - STARTED:.2f} s')
+
 # ------------------------------------------------------------------------------
 # Starting the Dash app
 if __name__ == "__main__":
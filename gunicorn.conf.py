@@ -0,0 +1,45 @@
+import gc
+import os
+
+# gunicorn configuration, start the server with:
+#   gunicorn app:server
+#
+# The app is loaded once in the master process before the workers are forked, so all workers
+# share the memory pages of the datasets instead of loading their own copies. Pages are copied
+# only when a process writes to them; gc.freeze() moves all objects of the master into a permanent
+# generation, so the garbage collector of the workers does not write to them either.
+#
+# Print the memory that every worker shares and uses alone with:
+#   python -m utils.memoryReport <pid of the master>
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+preload_app = True
+
+# The data watcher and the warm-up thread are started in the workers, see post_fork()
+os.environ['DEFER_BACKGROUND_TASKS'] = '1'
+
+
+def when_ready(server):
+    # Runs in the master after the app was loaded and before the first worker is forked. The
+    # datasets are loaded here instead of lazily in the workers, so the workers share them.
+    from utils.datasetRegistry import registry
+    from utils.callbackCache import warm_callbacks
+    from utils.imageVariants import build_variants
+
+    # Build the missing word cloud variants on deployment, before any worker serves them
+    written, _ = build_variants()
+    server.log.info('Built %d image variants', written)
+
+    registry.load_all()
+    warm_callbacks(background=False)
+    server.log.info(registry.timing_report())
+    gc.collect()
+    gc.freeze()
+    server.log.info('Datasets loaded, %d objects frozen for the workers', gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    from app import start_background_tasks
+
+    start_background_tasks()
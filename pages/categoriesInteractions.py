@@ -1,4 +1,3 @@
-import pandas as pd
 import dash
 
 import plotly.graph_objects as go
@@ -7,164 +6,197 @@ import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
 from dash import dcc, html, callback
 
+from utils.callbackCache import memoize
+from utils.confidenceIntervals import error_bars, group_mean_intervals
+from utils.dataSchemas import CATEGORY_VIDEOS
+from utils.datasetRegistry import registry
+
 
 dash.register_page(__name__,  name='Categories Interactions')
 
 # Loading CSVs required for this page.
 
-catdf = pd.read_csv('data/duration/categoryInteractions.csv')
+VIDEOS_PATH = 'data/categoryData/Categories_Formatted.csv'
+
+registry.register('category_videos', lambda: CATEGORY_VIDEOS.read(VIDEOS_PATH), [VIDEOS_PATH])
+
+
+def load_category_interactions():
+    """
+    Average likes and comments per category with bootstrap confidence intervals.
 
-catdf2 = pd.read_csv('data/categoryData/Categories_Formatted.csv')
+    :return: DataFrame with the columns 'Category', 'Like/View' and 'Comment/View', each with its
+             '... lower' and '... upper' bounds.
+    :rtype: pandas.DataFrame
+    """
+    videos = registry.get('category_videos')
+    return group_mean_intervals(videos, 'Title', ['Like/View', 'Comment/View']).rename(columns={'Title': 'Category'})
+
+
+# The intervals are resampled once per data version, not on every page load.
+
+registry.register('category_interactions', load_category_interactions, [VIDEOS_PATH])
 
 # Creating the first barchart.
 
-fig = go.Figure(data=[
-    go.Bar( name='Average Likes', x=catdf['Category'], y=catdf['Average Likes']),
-    go.Bar( name='Avegare Comments', x=catdf['Category'], y=catdf['Average Comments'], marker_color='#dd2b2b')
-],)
 
-fig.update_layout(title_text='Average Viewer Interactions in Different Categories', barmode='stack',
-            plot_bgcolor='#e7e7e7',
-            paper_bgcolor='#d1d1d1')
-fig.update_xaxes(title='Category')
-fig.update_yaxes(title='Interactions per 1000 Views')
+def create_interaction_figure(catdf):
+    """
+    Create the stacked barchart of average likes and comments per category.
+
+    :param catdf: Averages with the columns 'Category', 'Like/View' and 'Comment/View' and their
+                  confidence intervals, see load_category_interactions().
+    :type catdf: pandas.DataFrame
+    :return: The barchart.
+    :rtype: plotly.graph_objs._figure.Figure
+    """
+    fig = go.Figure(data=[
+        go.Bar( name='Average Likes', x=catdf['Category'], y=catdf['Like/View'], error_y=error_bars(catdf, 'Like/View')),
+        go.Bar( name='Avegare Comments', x=catdf['Category'], y=catdf['Comment/View'], marker_color='#dd2b2b',
+                error_y=error_bars(catdf, 'Comment/View'))
+    ],)
+
+    fig.update_layout(title_text='Average Viewer Interactions in Different Categories', barmode='stack',
+                plot_bgcolor='#e7e7e7',
+                paper_bgcolor='#d1d1d1')
+    fig.update_xaxes(title='Category')
+    fig.update_yaxes(title='Interactions per 1000 Views')
+    return fig
 
 
 # Layout
 
-layout = html.Div(
-
-    dbc.Row(
-        
-        [
-
-        # Title for this page.
-        
-        dbc.Col(
-            html.H2('Viewer Interaction in Different Categories', style={'color': '#dd2b2b'}),
-                width={'size': 5, 'offset': 1},
-                style={'height':'80px'},
-        ),
-
-        # Short site description.
-        
-        dbc.Row(dbc.Col(
-                html.H5('The charts on this page show the differences in viewer engagement across different categories.', ),
-                width={'size': 7, 'offset': 1},
-                style={'height':'80px'},
-            )),
-
-            # Inserting the first barchart.
-            
-            dbc.Row([
-                dbc.Col(dcc.Graph(
-                id='category-bar', figure=fig),
-                width={'size': 7, 'offset': 1},
-                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
-                
-                ),
+def layout(**kwargs):
+    # The layout holds no data, so importing the page and validating its callbacks does not load the
+    # videos; the first barchart is drawn by update_interaction_bar().
 
-            # Text next to the first figure.
-            
-            dbc.Col(html.H5('''
-                        This bar chart shows the average likes and comments in selected categories.
-                        To obtain this data, we selected 4 to 5 channels per category and analyzed the video information for a total of 1000 videos per category.
-                        For better comparison, we selected channels that have similar characteristics for each category.
-                        All videos used for this chart are from English-speaking channels that have more than one million subscribers. Additionally,
-                        we excluded YouTube Shorts from this statistic. Adding to that, we made sure that the length and views of the selected channels' videos were comparable.
-                        Of course, it is not possible to find 5000 videos that have the same amount of views and playtime,
-                        but most videos used for this chart are in the same range of views and have a simillar length.
-                        
-                    '''))
-            ]),
-
-            # Seperation line between visualizations.
-            
-            dbc.Row([
-                dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
-                width={'size':10, 'offset':1}
-                        )
-            ],
-
-            style={'height':'50px'},
+    return html.Div(
 
-            ),
+        dbc.Row(
+
+            [
+
+            # Title for this page.
 
-            # Title for the second figure.
-            
             dbc.Col(
-                html.H2('Additional Data on Categories', style={'color': '#dd2b2b'}),
-                width={'size': 5, 'offset': 1},
-                style={'height':'70px'}
+                html.H2('Viewer Interaction in Different Categories', style={'color': '#dd2b2b'}),
+                    width={'size': 5, 'offset': 1},
+                    style={'height':'80px'},
             ),
 
-            # Inserting the dropdown menu to change between barcharts.
-            
-            dbc.Row(
-                dbc.Col(dcc.Dropdown(
-                id='category-drop',
-                options=[{'label': 'Average Views', 'value': 'Views'},
-                        {'label': 'Average Video Length', 'value': 'Length'},
-                        ],
-                        value='Views',
-                        clearable=False
-                        ),
-
-                        style={'color': '#262626'},
-                        width={'size': 2, 'offset': 1} ),
+            # Short site description.
 
-            ),
+            dbc.Row(dbc.Col(
+                    html.H5('The charts on this page show the differences in viewer engagement across different categories.', ),
+                    width={'size': 7, 'offset': 1},
+                    style={'height':'80px'},
+                )),
 
-            # Inserting an empty row to create a gap between dropdown menu and boxplots.
-            
-            dbc.Row(dbc.Row(html.H5(),style={'height':'20px'})),
-
-            # Inserting the barcharts.
-            
-            dbc.Row([
-                dbc.Col(dcc.Graph(
-                id='category-bar-2',),
-                width={'size': 7, 'offset': 1},
-                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
-                
-                ),
+                # Inserting the first barchart.
 
-                # Text next to the second figure.
+                dbc.Row([
+                    dbc.Col(dcc.Graph(
+                    id='category-bar'),
+                    width={'size': 7, 'offset': 1},
+                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
+
+                    ),
+
+                # Text next to the first figure.
 
                 dbc.Col(html.H5('''
-                        This bar chart contains some additional information about the chart above.
-                        For every video, you can see the average views per video in the dataset,
-                        as well as the average duration of a video. The data is supposed to give some more context to the selection of videos for this page.
-                        While collecting our data, we were trying to get statistics from similar videos and channels for each category.
-                        These bar charts show that most of the videos are quite close to each other in terms of views and length,
-                        with Comedy being an exception. Due to the fact that the average length for comedy videos is much shorter than for the other categories,
-                        it was not possible for us to find enough videos that match our criteria.
+                            This bar chart shows the average likes and comments in selected categories.
+                            To obtain this data, we selected 4 to 5 channels per category and analyzed the video information for a total of 1000 videos per category.
+                            For better comparison, we selected channels that have similar characteristics for each category.
+                            All videos used for this chart are from English-speaking channels that have more than one million subscribers. Additionally,
+                            we excluded YouTube Shorts from this statistic. Adding to that, we made sure that the length and views of the selected channels' videos were comparable.
+                            Of course, it is not possible to find 5000 videos that have the same amount of views and playtime,
+                            but most videos used for this chart are in the same range of views and have a simillar length.
+                            The error bars show 95% bootstrap confidence intervals of the averages.
+
                         '''))
-            ]),
+                ]),
 
-            
-    ]),
-    
-)
+                # Seperation line between visualizations.
 
-# Callback
+                dbc.Row([
+                    dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
+                    width={'size':10, 'offset':1}
+                            )
+                ],
 
-@callback(
-    Output('category-bar-2', 'figure'),
-    [Input('category-drop', 'value')]
-)
+                style={'height':'50px'},
+
+                ),
+
+                # Title for the second figure.
+
+                dbc.Col(
+                    html.H2('Additional Data on Categories', style={'color': '#dd2b2b'}),
+                    width={'size': 5, 'offset': 1},
+                    style={'height':'70px'}
+                ),
+
+                # Inserting the dropdown menu to change between barcharts.
 
-# Callback Function
+                dbc.Row(
+                    dbc.Col(dcc.Dropdown(
+                    id='category-drop',
+                    options=[{'label': 'Average Views', 'value': 'Views'},
+                            {'label': 'Average Video Length', 'value': 'Length'},
+                            ],
+                            value='Views',
+                            clearable=False
+                            ),
+
+                            style={'color': '#262626'},
+                            width={'size': 2, 'offset': 1} ),
+
+                ),
+
+                # Inserting an empty row to create a gap between dropdown menu and boxplots.
+
+                dbc.Row(dbc.Row(html.H5(),style={'height':'20px'})),
+
+                # Inserting the barcharts.
+
+                dbc.Row([
+                    dbc.Col(dcc.Graph(
+                    id='category-bar-2',),
+                    width={'size': 7, 'offset': 1},
+                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
+
+                    ),
+
+                    # Text next to the second figure.
+
+                    dbc.Col(html.H5('''
+                            This bar chart contains some additional information about the chart above.
+                            For every video, you can see the average views per video in the dataset,
+                            as well as the average duration of a video. The data is supposed to give some more context to the selection of videos for this page.
+                            While collecting our data, we were trying to get statistics from similar videos and channels for each category.
+                            These bar charts show that most of the videos are quite close to each other in terms of views and length,
+                            with Comedy being an exception. Due to the fact that the average length for comedy videos is much shorter than for the other categories,
+                            it was not possible for us to find enough videos that match our criteria.
+                            '''))
+                ]),
+
+
+        ]),
+
+    )
 
 # Function returns different barcharts, based on value received from the dropdown menu.
 
-def update_category_bar(selected_value) :
+def build_category_bar(selected_value) :
 
     # Creating new dataframes with averages for each category.
-    
-    vdf = catdf2.groupby('Title')['Video_Views'].mean().reset_index()
 
-    sdf = catdf2.groupby('Title')['Seconds'].mean().reset_index()
+    catdf2 = registry.get('category_videos')
+
+    vdf = catdf2.groupby('Title', observed=True)['Video_Views'].mean().reset_index()
+
+    sdf = catdf2.groupby('Title', observed=True)['Seconds'].mean().reset_index()
 
     if selected_value == 'Views' :
 
@@ -184,3 +216,25 @@ def update_category_bar(selected_value) :
     
 
 
+# Callbacks
+
+# The first barchart is drawn when the page is rendered, so it always shows the current data.
+
+@callback(
+    Output('category-bar', 'figure'),
+    [Input('category-bar', 'id')]
+)
+@memoize('category_interactions', domain=[('category-bar',)])
+def update_interaction_bar(_):
+    return create_interaction_figure(registry.get('category_interactions'))
+
+
+# Callback Function; both barcharts are built in advance once per data version.
+
+@callback(
+    Output('category-bar-2', 'figure'),
+    [Input('category-drop', 'value')]
+)
+@memoize('category_videos', domain=[('Views',), ('Length',)])
+def update_category_bar(selected_value) :
+    return build_category_bar(selected_value)
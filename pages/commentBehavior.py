@@ -1,6 +1,3 @@
-import os
-import pandas as pd
-
 import dash
 import dash_bootstrap_components as dbc
 import plotly.express as px
@@ -8,176 +5,148 @@ import plotly.express as px
 from dash.dependencies import Input, Output
 from dash import dcc, html, callback
 
-dash.register_page(__name__, name='Comment Behavior')
+from utils.callbackCache import memoize
+from utils.channelStore import ChannelCatalog
+from utils.datasetRegistry import registry
 
-# Define the list of YouTube channels for data retrieval
-channels = [
-    'baldandbankrupt',
-    'BestEverFoodReviewShow',
-    'ColdFusion',
-    'HaraldBaldr',
-    'PracticalEngineeringChannel',
-    'RoCarsTV',
-    'strictlydumpling',
-    'tavarish',
-    'theonlyzanny',
-    'thespiffingbrit',
-    'TravelThirstyBlog',
-    'YesTheory'
-]
+dash.register_page(__name__, name='Comment Behavior')
 
 # Define the directory path where the comment data is stored
 directory_path = "data/comments/"
 
-# List to hold DataFrames for each channel
-dataframes = []
-
-# Iterate through each channel to read and process its data
-for channel in channels:
-    filepath = os.path.join(directory_path, channel, "development.csv")
-
-
-    # Check if the file exists
-    if os.path.exists(filepath):
-        df = pd.read_csv(filepath)
-        
-        # Aggregate daily statistics
-        daily_stats = df.groupby('Day').agg({
-            'Average per Video': 'mean',
-            'Relative Probability (%)': 'mean'
-        })
-        daily_stats = daily_stats.reset_index()
-        daily_stats['Channel'] = channel
-        
-        # Append the DataFrame to the list
-        dataframes.append(daily_stats)
-    else:
-        print(f"File 'development.csv' for channel '{channel}' not found.")
-
-# Combine all DataFrames into one
-combined_df = pd.concat(dataframes)
-
-# Aggregate overall averages
-average_overall = combined_df.groupby('Day').agg({
-    'Average per Video': 'mean',
-    'Relative Probability (%)': 'mean'
-}).reset_index()
-average_overall['Channel'] = 'Overall'
-average_overall = average_overall[average_overall['Day'] <= 30]
+# Discover the channels and load their summary; the full data of a channel is loaded when it is selected.
+# Changed files only reload their own channels.
+registry.register('comment_channels', lambda: ChannelCatalog(directory_path), [directory_path],
+                  updater=lambda catalog, changed_paths: catalog.updated(changed_paths))
 
 # ///////////////Layout//////////////////
 
-layout = html.Div([
-    # Header
-    dbc.Row(
-        [
-            dbc.Col(
-                html.H2('Youtube Comments', style={'color': '#dd2b2b'}),
-                width={'size': 5, 'offset': 1},
-            ),
-        ]
-    ),
-    # Description
-    dbc.Row(
-        [
-            dbc.Col(
-                html.H5('''
-                This section is about commenting behavior on YouTube videos.
-                The data is from selected channels, from different categories,
-                in order to create the most accurate image possible.
-                '''),
-                width={'size': 5, 'offset': 1},
+
+def layout(**kwargs):
+    # The layout holds no data, so importing the page and validating its callbacks does not load
+    # the channels; the channel dropdown is filled in by update_channel_options().
+    return html.Div([
+        # Header
+        dbc.Row(
+            [
+                dbc.Col(
+                    html.H2('Youtube Comments', style={'color': '#dd2b2b'}),
+                    width={'size': 5, 'offset': 1},
+                ),
+            ]
+        ),
+        # Description
+        dbc.Row(
+            [
+                dbc.Col(
+                    html.H5('''
+                    This section is about commenting behavior on YouTube videos.
+                    The data is from selected channels, from different categories,
+                    in order to create the most accurate image possible.
+                    '''),
+                    width={'size': 5, 'offset': 1},
+                ),
+            ],
+            style={'height': '100px'}
+        ),
+        # Dropdown for selecting value type
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(
+                id='value-dropdown',
+                options=[
+                    {'label': 'Relative Probability', 'value': 'Relative Probability (%)'},
+                    {'label': 'Average per Video', 'value': 'Average per Video'}
+                ],
+                value='Relative Probability (%)',
+                clearable=False,
+                searchable=False,
             ),
+                style={'color': '#262626'},
+                width={'size': 2, 'offset': 1})
         ],
-        style={'height': '100px'}
-    ),
-    # Dropdown for selecting value type
-    dbc.Row([
-        dbc.Col(dcc.Dropdown(
-            id='value-dropdown',
-            options=[
-                {'label': 'Relative Probability', 'value': 'Relative Probability (%)'},
-                {'label': 'Average per Video', 'value': 'Average per Video'}
-            ],
-            value='Relative Probability (%)',
-            clearable=False,
-            searchable=False,
+            style={'height': '50px'}
         ),
-            style={'color': '#262626'},
-            width={'size': 2, 'offset': 1})
-    ],
-        style={'height': '50px'}
-    ),
-    # Overall Line Chart
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='overall-line-chart'), width={'size': 8, 'offset': 1},
-                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                       'box-shadow': '0px 2px 5px #949494'},
-                ),
-        dbc.Col(html.H5('''
-            In this graph, you can clearly see that a very large proportion of comments are written on the first day, and only 1/5 are written on the second day.
-            After 10 days, less than 1% of comments are written. This shows how fast-moving videos on YouTube are.
-            '''),
-                width=2
-                )
-    ]),
-    # Separator
-    dbc.Row([
-        dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
-                width={'size': 10, 'offset': 1}
-                )
-    ],
-        style={'height': '50px'},
-    ),
-    # Channel Selection Description
-    dbc.Row([
-        dbc.Col(html.H5('''
-                In this section, you can take a closer look at what the comment behavior is like on the selected channels.
-                To do this, simply select the channel in the drop-down menu. You can then click on the individual days to get a more detailed overview.
-                You also have the option to move “Days After Release” to get further away from the release date.
+        # Overall Line Chart
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='overall-line-chart'), width={'size': 8, 'offset': 1},
+                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                           'box-shadow': '0px 2px 5px #949494'},
+                    ),
+            dbc.Col(html.H5('''
+                In this graph, you can clearly see that a very large proportion of comments are written on the first day, and only 1/5 are written on the second day.
+                After 10 days, less than 1% of comments are written. This shows how fast-moving videos on YouTube are.
                 '''),
-                width={'size': 5, 'offset': 1}, )
-    ],
-        style={'height': '120px'}
-    ),
-    # Channel Dropdown
-    dbc.Row([
-        dbc.Col(dcc.Dropdown(
-            id='channel-dropdown',
-            options=[{'label': channel, 'value': channel} for channel in channels],
-            value=channels[0],
-            clearable=False,
-            searchable=False,
+                    width=2
+                    )
+        ]),
+        # Separator
+        dbc.Row([
+            dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
+                    width={'size': 10, 'offset': 1}
+                    )
+        ],
+            style={'height': '50px'},
         ),
-            style={'color': '#262626'},
-            width={'size': 2, 'offset': 1}
+        # Channel Selection Description
+        dbc.Row([
+            dbc.Col(html.H5('''
+                    In this section, you can take a closer look at what the comment behavior is like on the selected channels.
+                    To do this, simply select the channel in the drop-down menu. You can then click on the individual days to get a more detailed overview.
+                    You also have the option to move “Days After Release” to get further away from the release date.
+                    '''),
+                    width={'size': 5, 'offset': 1}, )
+        ],
+            style={'height': '120px'}
         ),
-        dbc.Col(
-        )
-    ],
-        style={'height': '50px'}
-    ),
-    # Bar Chart for Channel Comments
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='comment-bar-chart'), width={'size': 5, 'offset': 1},
-                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                       'box-shadow': '0px 2px 5px #949494'}, ),
-        dbc.Col(dcc.Graph(id='selected-comment-bar-chart'), width={'size': 5, 'offset': 0},
-                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                       'box-shadow': '0px 2px 5px #949494'}, )
-    ]),
-    dbc.Row([
-        dbc.Col(html.H5())
-    ]),
-])
+        # Channel Dropdown
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(
+                id='channel-dropdown',
+                options=[],
+                clearable=False,
+                searchable=True,
+            ),
+                style={'color': '#262626'},
+                width={'size': 2, 'offset': 1}
+            ),
+            dbc.Col(
+            )
+        ],
+            style={'height': '50px'}
+        ),
+        # Bar Chart for Channel Comments
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='comment-bar-chart'), width={'size': 5, 'offset': 1},
+                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                           'box-shadow': '0px 2px 5px #949494'}, ),
+            dbc.Col(dcc.Graph(id='selected-comment-bar-chart'), width={'size': 5, 'offset': 0},
+                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                           'box-shadow': '0px 2px 5px #949494'}, )
+        ]),
+        dbc.Row([
+            dbc.Col(html.H5())
+        ]),
+    ])
 
 
 # ///////////////Callbacks//////////////////
+# Fill in the channels when the page is rendered, so the dropdown lists newly added channels
+@callback(
+    [Output('channel-dropdown', 'options'),
+     Output('channel-dropdown', 'value')],
+    [Input('channel-dropdown', 'id')]
+)
+def update_channel_options(_):
+    channels = registry.get('comment_channels').channels
+    return [{'label': channel, 'value': channel} for channel in channels], channels[0]
+
+
 # Callback to update overall line chart
 @callback(
     Output('overall-line-chart', 'figure'),
     [Input('value-dropdown', 'value')]
 )
+@memoize('comment_channels')
 def update_overall_line_chart(selected_value):
     if selected_value == 'Relative Probability (%)':
         value_title = 'Relative Probability (%)'
@@ -186,6 +155,7 @@ def update_overall_line_chart(selected_value):
     else:
         value_title = 'Value'
 
+    average_overall = registry.get('comment_channels').overall()
     overall_line_chart = px.bar(
         average_overall,
         x='Day',
@@ -207,9 +177,9 @@ def update_overall_line_chart(selected_value):
     [Input('channel-dropdown', 'value'),
      Input('value-dropdown', 'value')]
 )
+@memoize('comment_channels')
 def update_bar_chart(selected_channel, selected_value):
-    data_path = f'data/comments/{selected_channel}/'
-    channel_data = pd.read_csv(f'{data_path}development.csv')
+    channel_data = registry.get('comment_channels').get(selected_channel).daily
     # channel_data = channel_data[channel_data['Day'] <= 100]
 
     if selected_value == 'Relative Probability (%)':
@@ -245,18 +215,20 @@ def update_bar_chart(selected_channel, selected_value):
      Input('value-dropdown', 'value')]
 )
 def update_selected_bar_chart(clickData, selected_channel, selected_value):
-    data_path = f'data/comments/{selected_channel}/'
-    filepath = os.path.join(data_path, "development_daily.csv")
-    df = pd.read_csv(filepath)
-    df['Relative Probability (%)'] = df['Relative Probability']
+    # Only the clicked day matters, the rest of the click data (bbox, pointNumber, ...) would split the cache
+    selected_day = clickData['points'][0]['x'] - 1 if clickData else None
+    return selected_day_bar_chart(selected_day, selected_channel, selected_value)
 
-    if clickData:
-        selected_day = clickData['points'][0]['x']
-        selected_day = selected_day - 1
-    else:
-        selected_day = df['Day'].iloc[0]
 
-    selected_day_data = df[df['Day'] == selected_day]
+@memoize('comment_channels')
+def selected_day_bar_chart(selected_day, selected_channel, selected_value):
+    channel_data = registry.get('comment_channels').get(selected_channel)
+
+    if selected_day is None:
+        selected_day = channel_data.first_day
+
+    # The hours of a day are one row of the day x hour matrices
+    selected_day_data = channel_data.hours(selected_day)
 
     selected_figure = px.bar(
         selected_day_data,
@@ -1,161 +1,239 @@
-import pandas as pd
 import plotly.express as px
 
 import dash
 import dash_bootstrap_components as dbc
 
-from dash import dcc, html, callback
+from dash import dcc, html, callback, ctx
 from dash.dependencies import Input, Output
 
+from utils.callbackCache import memoize
+from utils.commentStore import load_comment_corpus
+from utils.datasetRegistry import registry
+
 # register page
 dash.register_page(__name__, name='Covid Comments')
 
-# read in comment data
-COVID_COMMENTS = pd.read_csv(r'data/covidComments/comments_with_emotions.csv')
-YEARS = COVID_COMMENTS['year'].unique().tolist()
-YEARS.append('All Years')
-QUERIES = COVID_COMMENTS['query'].unique().tolist()
-QUERIES.append('All Queries')
+# read in comment data; the comment texts stay in a memory-mapped store, the counts per
+# (year, query, emotion) are computed once
+COVID_COMMENTS_PATH = r'data/covidComments/comments_with_emotions.csv'
+registry.register('covid_comments', lambda: load_comment_corpus(COVID_COMMENTS_PATH), [COVID_COMMENTS_PATH])
+
+# number of comments per page of the comment browser
+COMMENTS_PER_PAGE = 10
+
+EMOTION_ORDER = ['joy', 'sadness', 'fear', 'anger', 'disgust', 'ambiguous']
+EMOTION_COLORS = {'joy': '#7EBB22', 'sadness': '#AC44CC', 'fear': '#7D3C98', 'anger': '#E63946', 'disgust': '#F1C40F'}
+
+
+def selected_emotion_counts(selected_year, selected_query, search):
+    """
+    Look up the number of comments per emotion for the selected year, query and search.
+
+    :param selected_year: The selected year ('All Years' or a specific year).
+    :type selected_year: str
+    :param selected_query: The selected query ('All Queries' or a specific query).
+    :type selected_query: str
+    :param search: Words and quoted phrases the comments must contain, empty for all comments.
+    :type search: str
+    :return: Series of counts indexed by emotion, without emotions that do not occur.
+    :rtype: pandas.Series
+    """
+    counts = registry.get('covid_comments').emotion_cube(search).emotion_counts(
+        year=None if selected_year == 'All Years' else selected_year,
+        query=None if selected_query == 'All Queries' else selected_query)
+    return counts[counts > 0]
 
 # define layout
-layout = html.Div([
+def layout(**kwargs):
+    # The layout holds no data, so importing the page and validating its callbacks does not load
+    # the comments; the dropdown options are filled in by update_dropdown_options().
+    return html.Div([
+
+        # headline
+        dbc.Row(
+            [
+                dbc.Col(
+                    children=[html.H2('Covid Comments', style={'color': '#dd2b2b'}),
+                              html.H3(
+                                  'How has the mood among the Youtube comments changed during the course of the COVID19 '
+                                  'pandemic?'),
+                              ],
+                    width={'size': 6, 'offset': 3},
 
-    # headline
-    dbc.Row(
-        [
-            dbc.Col(
-                children=[html.H2('Covid Comments', style={'color': '#dd2b2b'}),
-                          html.H3(
-                              'How has the mood among the Youtube comments changed during the course of the COVID19 '
-                              'pandemic?'),
-                          ],
-                width={'size': 6, 'offset': 3},
+                ),
+            ]
+        ),
+
+        # text
+        dbc.Row(
+            [
+                dbc.Col(
+                    children=[
+                        html.H5(
+                            '''To get a good source of comments on the COVID pandemic, we took ten different queries, 
+                            each covering a different aspect of the pandemic. This gave us over 19,000 comments on 
+                            unique videos. We always took the top 40 comments, sorted by relevance (YouTube algorithm), 
+                            uploaded in the same year as the video. To classify the comments, we used the IBM Watson 
+                            Natural Language Understanding API because of the granularity of its classification. We 
+                            declared a comment's emotion as ambiguous if the probability of the most likely emotion was 
+                            close to a guess. Explore our results and browse through the different queries and years for 
+                            a detailed view. '''),
+                    ],
+                    width={'size': 6, 'offset': 3},
 
+                ),
+            ]
+        ),
+        # dropdown menus
+        dbc.Row([
+            dbc.Col([
+
+                dbc.Label("Select Year"),
+                dcc.Dropdown(
+                    id='year-dropdown',
+                    options=[{'label': 'All Years', 'value': 'All Years'}],
+                    value='All Years',
+                    multi=False,
+                    style={'color': '#121212'},
+                    clearable=False,
+                    searchable=False
+                ),
+            ], width={'size': 3, 'offset': 3},
+                style={'color': '#dd2b2b'}
+            ),
+            dbc.Col([
+
+                dbc.Label("Select Query"),
+                dcc.Dropdown(
+                    id='query-dropdown',
+                    options=[{'label': 'All Queries', 'value': 'All Queries'}],
+                    value='All Queries',
+                    multi=False,
+                    style={'color': '#121212'},
+                    clearable=False,
+                    searchable=False
+                ),
+            ], width={'size': 3},
+                style={'color': '#dd2b2b'}
+            ),
+        ]),
+
+        # search
+        dbc.Row([
+            dbc.Col([
+
+                dbc.Label("Search Comments"),
+                dcc.Input(
+                    id='comment-search',
+                    type='text',
+                    value='',
+                    debounce=True,
+                    placeholder='e.g. vaccine "second dose"',
+                    style={'width': '100%', 'color': '#121212'},
+                ),
+            ], width={'size': 6, 'offset': 3},
+                style={'color': '#dd2b2b', 'margin-top': '10px'}
             ),
-        ]
-    ),
+        ]),
 
-    # text
-    dbc.Row(
-        [
+        # emotion histogram
+        dbc.Row([
             dbc.Col(
                 children=[
-                    html.H5(
-                        '''To get a good source of comments on the COVID pandemic, we took ten different queries, 
-                        each covering a different aspect of the pandemic. This gave us over 19,000 comments on 
-                        unique videos. We always took the top 40 comments, sorted by relevance (YouTube algorithm), 
-                        uploaded in the same year as the video. To classify the comments, we used the IBM Watson 
-                        Natural Language Understanding API because of the granularity of its classification. We 
-                        declared a comment's emotion as ambiguous if the probability of the most likely emotion was 
-                        close to a guess. Explore our results and browse through the different queries and years for 
-                        a detailed view. '''),
-                ],
-                width={'size': 6, 'offset': 3},
 
-            ),
-        ]
-    ),
-    # dropdown menus
-    dbc.Row([
-        dbc.Col([
-
-            dbc.Label("Select Year"),
-            dcc.Dropdown(
-                id='year-dropdown',
-                options=[{'label': str(year), 'value': year} for year in YEARS],
-                value='All Years',
-                multi=False,
-                style={'color': '#121212'},
-                clearable=False,
-                searchable=False
-            ),
-        ], width={'size': 3, 'offset': 3},
-            style={'color': '#dd2b2b'}
-        ),
-        dbc.Col([
-
-            dbc.Label("Select Query"),
-            dcc.Dropdown(
-                id='query-dropdown',
-                options=[{'label': query, 'value': query} for query in QUERIES],
-                value='All Queries',
-                multi=False,
-                style={'color': '#121212'},
-                clearable=False,
-                searchable=False
-            ),
-        ], width={'size': 3},
-            style={'color': '#dd2b2b'}
-        ),
-    ]),
+                    dcc.Graph(id='comment-histogram'),
 
-    # emotion histogram
-    dbc.Row([
-        dbc.Col(
-            children=[
+                ],
+                width={'size': 6, 'offset': 3},
+                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                       'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px'},
+            )
+        ]),
 
-                dcc.Graph(id='comment-histogram'),
+        # comment browser
+        dbc.Row([
+            dbc.Col(
+                children=[
+                    html.H5(id='comment-browser-title'),
+                    dbc.ListGroup(id='comment-list'),
+                    dbc.Pagination(id='comment-pagination', max_value=1, active_page=1, fully_expanded=False,
+                                   first_last=True, previous_next=True, style={'margin-top': '10px'}),
+                ],
+                width={'size': 6, 'offset': 3},
+                style={'padding': '10px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                       'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px', 'color': '#121212'},
+            )
+        ]),
 
-            ],
-            width={'size': 6, 'offset': 3},
-            style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                   'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px'},
-        )
-    ]),
+        # pie chart
+        dbc.Row([
+            dbc.Col(
+                children=[
 
-    # pie chart
-    dbc.Row([
-        dbc.Col(
-            children=[
+                    dbc.Col(dcc.Graph(id='comment-pie'))
 
-                dbc.Col(dcc.Graph(id='comment-pie'))
+                ],
+                width={'size': 4, 'offset': 3},
+                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                       'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px'},
+            ),
+            dbc.Col(
+                children=[
+                    html.H5('''As you can see, 'joy' and 'Sadness' are the two dominant emotions in each case. The 
+                    dominance of joy can be explained by the fact that it is the only positive emotion. Another reason 
+                    could be the sarcastic nature of the comment threads, which can be difficult for the AI to classify 
+                    correctly because sarcasm depends so much on context.''')
+                ],
+                width={'size': 2},
+                style={'margin-top': '20px'}
+            )
+        ]),
+
+        # line plot over all years
+        dbc.Row([
+            dbc.Col(html.H5('You have to select "All Years", to view the development of the comments over '
+                            'the years'),
+                    width={'size': 6, 'offset': 3},
+                    style={'margin-top': '20px'}
+                    ),
+            dbc.Col(
+                children=[
+                    dbc.Col(dcc.Graph(id='emotion-over-time')),
+                ],
 
-            ],
-            width={'size': 4, 'offset': 3},
-            style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                   'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px'},
-        ),
-        dbc.Col(
-            children=[
-                html.H5('''As you can see, 'joy' and 'Sadness' are the two dominant emotions in each case. The 
-                dominance of joy can be explained by the fact that it is the only positive emotion. Another reason 
-                could be the sarcastic nature of the comment threads, which can be difficult for the AI to classify 
-                correctly because sarcasm depends so much on context.''')
-            ],
-            width={'size': 2},
-            style={'margin-top': '20px'}
-        )
-    ]),
-
-    # line plot over all years
-    dbc.Row([
-        dbc.Col(html.H5('You have to select "All Years", to view the development of the comments over '
-                        'the years'),
                 width={'size': 6, 'offset': 3},
-                style={'margin-top': '20px'}
-                ),
-        dbc.Col(
-            children=[
-                dbc.Col(dcc.Graph(id='emotion-over-time')),
-            ],
-
-            width={'size': 6, 'offset': 3},
-            style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                   'box-shadow': '0px 2px 5px #949494'},
-        ),
+                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                       'box-shadow': '0px 2px 5px #949494'},
+            ),
 
-    ])
+        ])
 
-])
+    ])
 
 
 # ///////////////////Callbacks////////////////////////////
+# Fill in the years and queries of the comments when the page is rendered
+@callback(
+    [Output('year-dropdown', 'options'),
+     Output('query-dropdown', 'options')],
+    [Input('year-dropdown', 'id')]
+)
+def update_dropdown_options(_):
+    cube = registry.get('covid_comments').cube
+    years = list(cube.years) + ['All Years']
+    queries = list(cube.queries) + ['All Queries']
+    return ([{'label': str(year), 'value': year} for year in years],
+            [{'label': query, 'value': query} for query in queries])
+
+
 @callback(
     Output('comment-histogram', 'figure'),
     [Input('year-dropdown', 'value'),
-     Input('query-dropdown', 'value')]
+     Input('query-dropdown', 'value'),
+     Input('comment-search', 'value')]
 )
-def update_graph(selected_year, selected_query):
+@memoize('covid_comments')
+def update_graph(selected_year, selected_query, search):
     """
        Update the emotion distribution graph based on the selected year and query.
 
@@ -163,34 +241,82 @@ def update_graph(selected_year, selected_query):
        :type selected_year: str
        :param selected_query: The selected query for filtering comments ('All Queries' or a specific query).
        :type selected_query: str
+       :param search: Words and quoted phrases the comments must contain, empty for all comments.
+       :type search: str
        :return: Plotly figure object representing the emotion distribution graph.
        :rtype: plotly.graph_objs._figure.Figure
     """
-    filtered_df = COVID_COMMENTS.copy()
-    if selected_year != 'All Years':
-        filtered_df = filtered_df[filtered_df['year'] == selected_year]
-    if selected_query != 'All Queries':
-        filtered_df = filtered_df[filtered_df['query'] == selected_query]
-
-    emotion_order = ['joy', 'sadness', 'fear', 'anger', 'disgust', 'ambiguous']
+    emotion_counts = selected_emotion_counts(selected_year, selected_query, search).rename('count').reset_index()
 
     # Generate visualization using Plotly Express
-    fig = px.histogram(filtered_df, x='emotion', color='emotion', title='Emotion Distribution',
-                       category_orders={'emotion': emotion_order},
-                       color_discrete_map={'joy': '#7EBB22', 'sadness': '#AC44CC', 'fear': '#7D3C98',
-                                           'anger': '#E63946', 'disgust': '#F1C40F'})
+    fig = px.bar(emotion_counts, x='emotion', y='count', color='emotion', title='Emotion Distribution',
+                 category_orders={'emotion': EMOTION_ORDER},
+                 color_discrete_map=EMOTION_COLORS)
     fig.update_layout(plot_bgcolor='#e7e7e7',
                       paper_bgcolor='#d1d1d1', )
 
     return fig
 
 
+@callback(
+    [Output('comment-browser-title', 'children'),
+     Output('comment-list', 'children'),
+     Output('comment-pagination', 'max_value'),
+     Output('comment-pagination', 'active_page')],
+    [Input('comment-histogram', 'clickData'),
+     Input('year-dropdown', 'value'),
+     Input('query-dropdown', 'value'),
+     Input('comment-search', 'value'),
+     Input('comment-pagination', 'active_page')]
+)
+def update_comment_browser(click_data, selected_year, selected_query, search, active_page):
+    """
+        Show one page of the comments behind the clicked bar of the emotion histogram.
+
+        :param click_data: Click data of the histogram, contains the clicked emotion.
+        :type click_data: dict
+        :param selected_year: The selected year for filtering comments ('All Years' or a specific year).
+        :type selected_year: str
+        :param selected_query: The selected query for filtering comments ('All Queries' or a specific query).
+        :type selected_query: str
+        :param search: Words and quoted phrases the comments must contain, empty for all comments.
+        :type search: str
+        :param active_page: The selected page of the comment browser.
+        :type active_page: int
+        :return: Title, list items with the comments, number of pages and the page shown.
+        :rtype: tuple
+    """
+    if click_data is None:
+        return 'Click on a bar of the histogram to read the comments behind it.', [], 1, 1
+
+    # Start at the first page whenever the selection changes
+    if ctx.triggered_id != 'comment-pagination' or not active_page:
+        active_page = 1
+
+    emotion = click_data['points'][0]['x']
+    corpus = registry.get('covid_comments')
+    rows = corpus.rows(year=None if selected_year == 'All Years' else selected_year,
+                       query=None if selected_query == 'All Queries' else selected_query,
+                       emotion=emotion, search=search)
+    pages = max(1, -(-len(rows) // COMMENTS_PER_PAGE))
+    active_page = min(active_page, pages)
+
+    # Only the comments of the shown page are read from the text store
+    page_rows = rows[(active_page - 1) * COMMENTS_PER_PAGE:active_page * COMMENTS_PER_PAGE]
+    items = [dbc.ListGroupItem(text) for text in corpus.texts.get(page_rows)]
+
+    title = f"{len(rows)} comments classified as '{emotion}'"
+    return title, items, pages, active_page
+
+
 @callback(
     Output('comment-pie', 'figure'),
     [Input('year-dropdown', 'value'),
-     Input('query-dropdown', 'value')]
+     Input('query-dropdown', 'value'),
+     Input('comment-search', 'value')]
 )
-def update_pie(selected_year, selected_query):
+@memoize('covid_comments')
+def update_pie(selected_year, selected_query, search):
     """
         Update the relative emotion distribution pie chart based on the selected year and query.
 
@@ -198,25 +324,20 @@ def update_pie(selected_year, selected_query):
         :type selected_year: str
         :param selected_query: The selected query for filtering comments ('All Queries' or a specific query).
         :type selected_query: str
+        :param search: Words and quoted phrases the comments must contain, empty for all comments.
+        :type search: str
         :return: Plotly figure object representing the relative emotion distribution pie chart.
         :rtype: plotly.graph_objs._figure.Figure
     """
-    filtered_df = COVID_COMMENTS.copy()
-    if selected_year != 'All Years':
-        filtered_df = filtered_df[filtered_df['year'] == selected_year]
-    if selected_query != 'All Queries':
-        filtered_df = filtered_df[filtered_df['query'] == selected_query]
-
-    emotion_order = ['joy', 'sadness', 'fear', 'anger', 'disgust', 'ambiguous']
     # Calculate relative distribution of emotions
-    emotion_counts = filtered_df['emotion'].value_counts(normalize=True)
+    emotion_counts = selected_emotion_counts(selected_year, selected_query, search).sort_values(ascending=False)
+    emotion_counts = emotion_counts / emotion_counts.sum()
 
     # Generate visualization using Plotly Express
     fig = px.pie(names=emotion_counts.index, values=emotion_counts.values, title='Relative Emotion Distribution',
                  color=emotion_counts.index,
-                 category_orders={'emotion': emotion_order},
-                 color_discrete_map={'joy': '#7EBB22', 'sadness': '#AC44CC', 'fear': '#7D3C98',
-                                     'anger': '#E63946', 'disgust': '#F1C40F'})
+                 category_orders={'emotion': EMOTION_ORDER},
+                 color_discrete_map=EMOTION_COLORS)
     fig.update_layout(plot_bgcolor='#e7e7e7',
                       paper_bgcolor='#d1d1d1', )
 
@@ -226,9 +347,11 @@ def update_pie(selected_year, selected_query):
 @callback(
     Output('emotion-over-time', 'figure'),
     [Input('year-dropdown', 'value'),
-     Input('query-dropdown', 'value')]
+     Input('query-dropdown', 'value'),
+     Input('comment-search', 'value')]
 )
-def update_line_plot(selected_year, selected_query):
+@memoize('covid_comments')
+def update_line_plot(selected_year, selected_query, search):
     """
        Update the relative emotion distribution over time line plot based on the selected year and query.
 
@@ -236,28 +359,30 @@ def update_line_plot(selected_year, selected_query):
        :type selected_year: str
        :param selected_query: The selected query for filtering comments ('All Queries' or a specific query).
        :type selected_query: str
+       :param search: Words and quoted phrases the comments must contain, empty for all comments.
+       :type search: str
        :return: Plotly figure object representing the relative emotion distribution over time line plot.
        :rtype: plotly.graph_objs._figure.Figure
     """
     if selected_year != 'All Years':
         return px.line()  # Return empty plot if a specific year is selected
 
-    filtered_df = COVID_COMMENTS.copy()
-    if selected_query != 'All Queries':
-        filtered_df = filtered_df[filtered_df['query'] == selected_query]
-
-    emotion_order = ['joy', 'sadness', 'fear', 'anger', 'disgust', 'ambiguous']
     # Calculate relative distribution of emotions over time
-    emotion_counts_over_time = filtered_df.groupby(['year', 'emotion']).size().unstack(fill_value=0)
-    emotion_counts_over_time = emotion_counts_over_time.apply(lambda x: x / x.sum(), axis=1)  # Normalize by row
+    emotion_counts_over_time = registry.get('covid_comments').emotion_cube(search).counts_over_years(
+        query=None if selected_query == 'All Queries' else selected_query)
+    emotion_counts_over_time = emotion_counts_over_time.loc[emotion_counts_over_time.sum(axis=1) > 0,
+                                                            emotion_counts_over_time.sum(axis=0) > 0]
+    if emotion_counts_over_time.empty:
+        return px.line(title='Relative Emotion Distribution Over Time')  # No comments match the search
+
+    emotion_counts_over_time = emotion_counts_over_time.div(emotion_counts_over_time.sum(axis=1), axis=0)  # Normalize by row
 
     # Generate visualization using Plotly Express
     fig = px.line(emotion_counts_over_time, x=emotion_counts_over_time.index, y=emotion_counts_over_time.columns,
                   title='Relative Emotion Distribution Over Time',
                   labels={'year': 'Year', 'value': 'Relative Frequency', 'emotion': 'Emotion'},
-                  category_orders={'emotion': emotion_order},
-                  color_discrete_map={'joy': '#7EBB22', 'sadness': '#AC44CC', 'fear': '#7D3C98',
-                                      'anger': '#E63946', 'disgust': '#F1C40F'}, )
+                  category_orders={'emotion': EMOTION_ORDER},
+                  color_discrete_map=EMOTION_COLORS, )
 
     fig.update_xaxes(tickvals=[2020, 2021, 2022], ticktext=['2020', '2021', '2022'])
 
@@ -1,183 +1,288 @@
-import pandas as pd
-
 import dash
+import numpy as np
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 
 from dash import dcc, html, callback
 from dash.dependencies import Input, Output
 
+from utils.boxStats import MAX_OUTLIERS, box_statistics
+from utils.callbackCache import memoize
+from utils.confidenceIntervals import error_bars
+from utils.dataSchemas import BOXPLOT_VIDEOS
+from utils.datasetRegistry import registry
+from utils.durationBuckets import DEFAULT_EDGES, bucket_labels, load_duration_buckets
+
 dash.register_page(__name__, name='Duration Interactions')
 
 # Loading and formatting CSVs needed for this page.
 
-df = pd.read_csv('data/duration/Markiplier_Formatted.csv')
+DURATION_FOLDER = 'data/duration'
+BOXPLOT_PATH = 'data/duration/Boxplot_Data.csv'
 
-boxdf = pd.read_csv('data/duration/Boxplot_Data.csv')
+# Upper bounds in seconds of the video length buckets, the last bucket is open-ended.
 
-avg_like = df.groupby('Category')['Like/View'].mean().reset_index()
+DURATION_EDGES = DEFAULT_EDGES
 
-avg_comment = df.groupby('Category')['Comment/View'].mean().reset_index()
+DEFAULT_CHANNEL = 'Markiplier'
 
-# Creating the first Barchart.
+# All '*_Formatted.csv' files of the folder are bucketed once per data version.
 
-# Manually changing titles for the bars.
+registry.register('duration_buckets', lambda: load_duration_buckets(DURATION_FOLDER, DURATION_EDGES),
+                  [DURATION_FOLDER])
 
-bar_titles = ['0-5', '5-10', '10-20', '20-30', '30-60', '60+']
+# Titles of the bars and boxes, e.g. '0-5' for videos up to 5 minutes.
 
-fig = go.Figure(data=[
-    go.Bar(name='Average Likes', x=avg_like['Category'], y=avg_like['Like/View']),
-    go.Bar(name='Avegare Comments', x=avg_comment['Category'], y=avg_comment['Comment/View'], marker_color='#dd2b2b', )
-])
+bar_titles = bucket_labels(DURATION_EDGES)
 
-bar_titles = ['0-5', '5-10', '10-20', '20-30', '30-60', '60+']
-fig.update_layout(title_text='Average Viewer Interactions measured by Comments and Likes', barmode='stack',
-                  plot_bgcolor='#e7e7e7',
-                  paper_bgcolor='#d1d1d1')
-fig.update_xaxes(title='Video Length in Minutes', tickvals=avg_like['Category'], ticktext=bar_titles)
-fig.update_yaxes(title='Interactions per 1000 Views')
+# Value column, colour and axis title of the boxplots for every dropdown option.
 
-# Layout
+BOX_VALUES = {
+    'Comments': ('Comment/View', '#dd2b2b', 'Comments per 1000 Views'),
+    'Likes': ('Like/View', '#636efa', 'Likes per 1000 Views'),
+}
+
+
+def load_box_statistics():
+    """
+    Precompute the boxplots of all dropdown options per video length bucket.
+
+    :return: Maps every dropdown option to its statistics, see box_statistics().
+    :rtype: dict
+    """
+    boxdf = BOXPLOT_VIDEOS.read(BOXPLOT_PATH)
+    return {option: box_statistics(boxdf, 'Length', column, order=bar_titles)
+            for option, (column, color, title) in BOX_VALUES.items()}
 
-layout = html.Div(
 
-    dbc.Row(
+registry.register('duration_box_stats', load_box_statistics, [BOXPLOT_PATH])
 
-        [
-            # Title for this page.
 
-            dbc.Col(
-                html.H2('Viewer Interaction based on Video Length', style={'color': '#dd2b2b'}),
-                width={'size': 5, 'offset': 1},
-                style={'height': '80px'},
-            ),
+def create_interaction_figure(df):
+    """
+    Create the stacked barchart of average likes and comments per video length bucket.
+
+    :param df: Interactions per bucket with the columns 'Length', 'Like/View' and 'Comment/View'
+               and their confidence intervals, see DurationBuckets.channel().
+    :type df: pandas.DataFrame
+    :return: The barchart.
+    :rtype: plotly.graph_objs._figure.Figure
+    """
+    fig = go.Figure(data=[
+        go.Bar(name='Average Likes', x=df['Length'], y=df['Like/View'], error_y=error_bars(df, 'Like/View')),
+        go.Bar(name='Avegare Comments', x=df['Length'], y=df['Comment/View'], marker_color='#dd2b2b',
+               error_y=error_bars(df, 'Comment/View'))
+    ])
+
+    fig.update_layout(title_text='Average Viewer Interactions measured by Comments and Likes', barmode='stack',
+                      plot_bgcolor='#e7e7e7',
+                      paper_bgcolor='#d1d1d1')
+    fig.update_xaxes(title='Video Length in Minutes', type='category', categoryorder='array', categoryarray=bar_titles)
+    fig.update_yaxes(title='Interactions per 1000 Views')
+    return fig
+
+
+# Layout
 
-            # Short site description.
+def layout(**kwargs):
+    # The layout holds no data, so importing the page and validating its callbacks does not load the
+    # channels; the channel selector is filled in by update_channel_options().
 
-            dbc.Row(dbc.Col(
-                html.H5(
-                    'The charts on this page show the correlation between video length and viewer engagement for the channel "Markiplier".', ),
-                width={'size': 7, 'offset': 1},
-                style={'height': '80px'},
-            )),
+    return html.Div(
 
-            # Displaying the first barchart.
+        dbc.Row(
 
-            dbc.Row([
-                dbc.Col(dcc.Graph(
-                    id='duration-bar', figure=fig),
+            [
+                # Title for this page.
+
+                dbc.Col(
+                    html.H2('Viewer Interaction based on Video Length', style={'color': '#dd2b2b'}),
+                    width={'size': 5, 'offset': 1},
+                    style={'height': '80px'},
+                ),
+
+                # Short site description.
+
+                dbc.Row(dbc.Col(
+                    html.H5(
+                        'The charts on this page show the correlation between video length and viewer engagement. The barchart can be switched between channels and categories, the boxplots show the channel "Markiplier".', ),
                     width={'size': 7, 'offset': 1},
-                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                           'box-shadow': '0px 2px 5px #949494'},
+                    style={'height': '80px'},
+                )),
+
+                # Inserting the dropdown menu to choose the channel of the barchart.
+
+                dbc.Row(
+                    dbc.Col(dcc.Dropdown(
+                        id='duration-channel',
+                        options=[],
+                        clearable=False
+                    ),
+
+                        style={'color': '#262626'},
+                        width={'size': 2, 'offset': 1}),
+
                 ),
 
-                # Text next to the figure.
+                # Inserting an empty row to create a gap between dropdown menu and barchart.
 
-                dbc.Col(html.H5('''
-                    Since viewer engagement can vary a lot between different channels, this graph focuses on a single YouTube channel. We are using the channel "Markiplier" because there
-                    are lots of videos with a great variety in length uploaded to the channel. Another factor that influenced our choice is the amount of YouTube Shorts uploaded to the channel, 
-                    since in terms of length and interaction ratio, they are not comparable to regular videos on the platform. On Markiplier's channel, there are only 4 Shorts uploaded, so they don't have a noticeable 
-                    influence on our data because the data used on this page contains a total of 5000 Videos. The Barchart shows a clear trend, especially for the average comment values. The shortest videos have 
-                    the highest amount of comments, and the longer the video gets, the lower amount of comments per view. For the average like count, it can also be said that it is the highest for the 
-                    shortest video and the lowest for the longest video, but there is no clear trend for the categories in between.
-                    '''
+                dbc.Row(dbc.Row(html.H5(), style={'height': '20px'})),
 
-                                ))
-            ]),
+                # Displaying the first barchart.
 
-            # Seperation line between visualizations.
+                dbc.Row([
+                    dbc.Col(dcc.Graph(
+                        id='duration-bar', ),
+                        width={'size': 7, 'offset': 1},
+                        style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                               'box-shadow': '0px 2px 5px #949494'},
+                    ),
 
-            dbc.Row([
-                dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
-                        width={'size': 10, 'offset': 1}
-                        )
-            ],
+                    # Text next to the figure.
 
-                style={'height': '50px'},
+                    dbc.Col(html.H5('''
+                        Since viewer engagement can vary a lot between different channels, this graph focuses on a single YouTube channel. We are using the channel "Markiplier" because there
+                        are lots of videos with a great variety in length uploaded to the channel. Another factor that influenced our choice is the amount of YouTube Shorts uploaded to the channel, 
+                        since in terms of length and interaction ratio, they are not comparable to regular videos on the platform. On Markiplier's channel, there are only 4 Shorts uploaded, so they don't have a noticeable 
+                        influence on our data because the data used on this page contains a total of 5000 Videos. The Barchart shows a clear trend, especially for the average comment values. The shortest videos have 
+                        the highest amount of comments, and the longer the video gets, the lower amount of comments per view. For the average like count, it can also be said that it is the highest for the 
+                        shortest video and the lowest for the longest video, but there is no clear trend for the categories in between.
+                        The error bars show 95% bootstrap confidence intervals of the averages.
+                        '''
 
-            ),
+                                    ))
+                ]),
 
-            # Title for the second figure.
+                # Seperation line between visualizations.
 
-            dbc.Col(
-                html.H2('Data displayed as a Boxplot', style={'color': '#dd2b2b'}),
-                width={'size': 5, 'offset': 1},
-                style={'height': '70px'}
-            ),
+                dbc.Row([
+                    dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
+                            width={'size': 10, 'offset': 1}
+                            )
+                ],
 
-            # Inserting the dropdown menu to change between boxplots.
+                    style={'height': '50px'},
 
-            dbc.Row(
-                dbc.Col(dcc.Dropdown(
-                    id='duration-drop',
-                    options=[{'label': 'Comments', 'value': 'Comments'},
-                             {'label': 'Likes', 'value': 'Likes'},
-                             ],
-                    value='Comments',
-                    clearable=False
                 ),
 
-                    style={'color': '#262626'},
-                    width={'size': 2, 'offset': 1}),
+                # Title for the second figure.
 
-            ),
-
-            # Inserting an empty row to create a gap between dropdown menu and boxplots.
+                dbc.Col(
+                    html.H2('Data displayed as a Boxplot', style={'color': '#dd2b2b'}),
+                    width={'size': 5, 'offset': 1},
+                    style={'height': '70px'}
+                ),
 
-            dbc.Row(dbc.Row(html.H5(), style={'height': '20px'})),
+                # Inserting the dropdown menu to change between boxplots.
 
-            # Inserting the boxplots.
+                dbc.Row(
+                    dbc.Col(dcc.Dropdown(
+                        id='duration-drop',
+                        options=[{'label': 'Comments', 'value': 'Comments'},
+                                 {'label': 'Likes', 'value': 'Likes'},
+                                 ],
+                        value='Comments',
+                        clearable=False
+                    ),
 
-            dbc.Row([
-                dbc.Col(dcc.Graph(
-                    id='duration-boxplot', ),
-                    width={'size': 7, 'offset': 1},
-                    style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
-                           'box-shadow': '0px 2px 5px #949494'},
+                        style={'color': '#262626'},
+                        width={'size': 2, 'offset': 1}),
 
                 ),
 
-                # Text next to the boxplots.
+                # Inserting an empty row to create a gap between dropdown menu and boxplots.
 
-                dbc.Col(html.H5('''
-                        These boxplots show how the interaction values are distributed in each video length category. In the drop-down menu, you can choose between the comment and the like plots.
-                        In these boxplots, you can see that there are many outliers, especially for shorter videos. To filter out extreme points, we removed all entries 
-                        in the dataset that were more than 3 times the standard deviation away from the mean. In total, 190 entries were filtered out. Since we already filtered out the outliers that we do not 
-                        want to have in our visualization, we are using the linear algorithm for the computation of the boxplots. These boxplots show similar trends to the barchart above. You can see that the 
-                        amount of comments consistently gets lower the longer the videos get, while there is also no clear trend for the likes.
-                        '''))
-            ]),
+                dbc.Row(dbc.Row(html.H5(), style={'height': '20px'})),
 
-        ])
+                # Inserting the boxplots.
 
-),
+                dbc.Row([
+                    dbc.Col(dcc.Graph(
+                        id='duration-boxplot', ),
+                        width={'size': 7, 'offset': 1},
+                        style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px',
+                               'box-shadow': '0px 2px 5px #949494'},
 
+                    ),
+
+                    # Text next to the boxplots.
+
+                    dbc.Col(html.H5('''
+                            These boxplots show how the interaction values are distributed in each video length category. In the drop-down menu, you can choose between the comment and the like plots.
+                            In these boxplots, you can see that there are many outliers, especially for shorter videos. To filter out extreme points, we removed all entries 
+                            in the dataset that were more than 3 times the standard deviation away from the mean. In total, 190 entries were filtered out. Since we already filtered out the outliers that we do not 
+                            want to have in our visualization, we are using the linear algorithm for the computation of the boxplots. These boxplots show similar trends to the barchart above. You can see that the 
+                            amount of comments consistently gets lower the longer the videos get, while there is also no clear trend for the likes.
+                            The boxes are computed from all videos, but of a length category with more than {MAX_OUTLIERS} outliers only {MAX_OUTLIERS} are drawn,
+                            evenly spread over their range and including the most extreme ones; the plot notes how many are shown.
+                            '''.format(MAX_OUTLIERS=MAX_OUTLIERS)))
+                ]),
+
+            ])
+
+    )
 
-# Callback to receive input from dropdown menu and change plots.
+
+# Callback to list the channels when the page is rendered, so the selector always lists the current files.
 
 @callback(
-    Output('duration-boxplot', 'figure'),
-    [Input('duration-drop', 'value')]
+    [Output('duration-channel', 'options'),
+     Output('duration-channel', 'value')],
+    [Input('duration-channel', 'id')]
 )
-# Callback Function.
+def update_channel_options(_):
+    channels = registry.get('duration_buckets').channels
+    value = DEFAULT_CHANNEL if DEFAULT_CHANNEL in channels else (channels[0] if channels else None)
+    return [{'label': channel, 'value': channel} for channel in channels], value
 
-# Function returns different boxplots for 'Comments' or 'Likes'.
 
-def update_duration_box(selected_value):
-    if selected_value == 'Comments':
+# Callback to show the barchart of the selected channel; the buckets of all channels are precomputed.
 
-        trace = go.Box(x=boxdf['Length'], y=boxdf['Comment/View'], marker_color='#dd2b2b', name='Boxplot')
-
-        layout = go.Layout(title=f'Boxplot for {selected_value}', xaxis_title='Video Duration in Minutes',
-                           yaxis_title='Comments per 1000 Views', plot_bgcolor='#e7e7e7', paper_bgcolor='#d1d1d1')
+@callback(
+    Output('duration-bar', 'figure'),
+    [Input('duration-channel', 'value')]
+)
+@memoize('duration_buckets')
+def update_duration_bar(channel):
+    buckets = registry.get('duration_buckets')
+    if channel not in buckets.channels:
+        return {}
+    return create_interaction_figure(buckets.channel(channel))
 
-        return {'data': [trace], 'layout': layout}
 
-    elif selected_value == 'Likes':
+# Callback to receive input from dropdown menu and change plots.
 
-        trace2 = go.Box(x=boxdf['Length'], y=boxdf['Like/View'], name='Boxplot2')
+@callback(
+    Output('duration-boxplot', 'figure'),
+    [Input('duration-drop', 'value')]
+)
+# Callback Function.
 
-        layout = go.Layout(title=f'Boxplot for {selected_value}', xaxis_title='Video Duration in Minutes',
-                           yaxis_title='Likes per 1000 Views', plot_bgcolor='#e7e7e7', paper_bgcolor='#d1d1d1')
+# Function returns different boxplots for 'Comments' or 'Likes', built from the precomputed statistics.
 
-        return {'data': [trace2], 'layout': layout}
+@memoize('duration_box_stats')
+def update_duration_box(selected_value):
+    stats = registry.get('duration_box_stats')[selected_value]
+    _, color, yaxis_title = BOX_VALUES[selected_value]
+
+    trace = go.Box(x=stats['group'], q1=stats['q1'], median=stats['median'], q3=stats['q3'],
+                   lowerfence=stats['lowerfence'], upperfence=stats['upperfence'], boxpoints=False,
+                   marker_color=color, name='Boxplot', showlegend=False)
+
+    # Outliers are drawn as a separate trace, since boxes with precomputed statistics have no points.
+    outliers = go.Scatter(x=stats['group'].repeat(stats['outliers'].map(len)),
+                          y=np.concatenate(stats['outliers'].tolist()) if len(stats) else [],
+                          mode='markers', marker=dict(color=color, size=4, opacity=0.7), name='Outliers',
+                          showlegend=False, hovertemplate='%{y}<extra>Outlier</extra>')
+
+    layout = go.Layout(title=f'Boxplot for {selected_value}', xaxis_title='Video Duration in Minutes',
+                       yaxis_title=yaxis_title, plot_bgcolor='#e7e7e7', paper_bgcolor='#d1d1d1')
+
+    # Boxes with more than MAX_OUTLIERS outliers only draw a sample of them
+    thinned = [f'{group}: {len(shown)} of {count}' for group, shown, count
+               in zip(stats['group'], stats['outliers'], stats['outlier_count']) if len(shown) < count]
+    if thinned:
+        layout.update(annotations=[dict(text='Outliers shown ' + ', '.join(thinned), xref='paper', yref='paper',
+                                        x=1, y=1.06, xanchor='right', showarrow=False, font=dict(size=11))])
+
+    return {'data': [trace, outliers], 'layout': layout}
@@ -1,6 +1,3 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-
 import dash
 import dash_bootstrap_components as dbc
 import plotly.express as px
@@ -8,42 +5,49 @@ import plotly.express as px
 from dash import dcc, html, callback
 from dash.dependencies import Input, Output, State
 
+from utils.assetManifest import build_asset_manifest
+from utils.callbackCache import memoize
+from utils.datasetRegistry import registry
+from utils.imageRoutes import image_url, variant_url
+from utils.keywordStore import ALL_TOPICS, TOPIC_FOLDER, YEARLY_FOLDER, load_keyword_store
+from utils.wordCloudRenderer import WordCloudCache
+
 # register page
 dash.register_page(__name__, name='Keyword Analysis')
 
 # specify topics
 TOPICS = ['sports', 'gaming', 'lifestyle', 'politics', 'society', 'knowledge']
 step_size = 1
+YEARS = range(2013, 2024)
 
+# scan the word cloud images and frequency files once; fails at startup if one is missing
+topic_images = build_asset_manifest(TOPICS + [ALL_TOPICS], YEARS)
+IMAGE_PATHS = dict(zip(zip(topic_images['topic'], topic_images['year']), topic_images['image']))
 
-def create_image_dataframe():
-    """
-    this method creates a dataframe storing all the paths for the topic separated wordclouds
-    :return: A Dataframe, with columns : topic, year, path
-    """
-    image_df = pd.DataFrame()
-    i = 0
-
-    # define topic specific paths and save them to a dataframe.
-    for topic in TOPICS:
-        for year in range(2013, 2024):
-            path = f'data/keyWordClouds/topicKeyWords/youtube_keywords_{topic}_{year}.png'
-            new_row = pd.DataFrame({'topic': topic, 'year': str(year), 'path': path}, index=[i])
-            image_df = pd.concat([image_df, new_row])
-            i += 1
+# read in all keyword frequency lists once
+registry.register('keyword_store', lambda: load_keyword_store(TOPICS + [ALL_TOPICS], YEARS),
+                  [TOPIC_FOLDER, YEARLY_FOLDER])
 
-    # define overall categories paths and save them to a dataframe.
-    for year in range(2013, 2024):
-        path = f'data/keyWordClouds/yearlyKeyWords/youtube_keywords_{year}.jpg'
-        new_row = pd.DataFrame({'topic': 'all categories', 'year': str(year), 'path': path}, index=[i])
+# words shown in the term trajectory chart when the page is opened
+DEFAULT_TERMS = ['minecraft', 'fortnite']
 
-        image_df = pd.concat([image_df, new_row], )
-        i += 1
+# word clouds of custom selections
+wordcloud_cache = WordCloudCache()
 
-    return image_df
 
+def wordcloud_path(topic, year):
+    """
+    Path of the word cloud image of a topic and year.
+
+    :param topic: The topic ('all categories' or a specific topic).
+    :type topic: str
+    :param year: The year.
+    :type year: int
+    :return: Path to the image.
+    :rtype: str
+    """
+    return IMAGE_PATHS[(topic, year)]
 
-topic_images = create_image_dataframe()
 
 # define marks for plot
 marks = {str(year): str(year) for year in topic_images['year'].unique()}
@@ -146,7 +150,9 @@ layout = html.Div([
         dbc.Col(
             children=[
 
-                dcc.Graph(id='graph'),
+                html.Img(id='graph', alt='Word cloud', style={'width': '100%'}),
+                # links that let the browser prefetch the neighbouring years in the background
+                html.Div(id='wordcloud-prefetch', style={'display': 'none'}),
 
             ],
             width={'size': 6, 'offset': 3},
@@ -171,11 +177,135 @@ layout = html.Div([
     ],
 
     ),
+
+    # text paragraph for the term trajectory
+    dbc.Row([
+        dbc.Col(
+            children=[
+                html.H5('''Follow single keywords through the years: choose one or more words to see how often they 
+                appeared among the keywords of the selected category from 2013 to 2023. A year in which a word was 
+                not among the frequent keywords counts as zero.''')
+            ],
+            width={'size': 6, 'offset': 3},
+            style={'margin-top': '20px'},
+        ),
+    ]),
+
+    # term selection
+    dbc.Row([
+        dbc.Col(
+            children=[
+                dcc.Dropdown(
+                    id='term-dropdown',
+                    options=[{'label': term, 'value': term} for term in DEFAULT_TERMS],
+                    value=DEFAULT_TERMS,
+                    multi=True,
+                    placeholder='Type to search for keywords',
+                ),
+            ],
+            width={'size': 4, 'offset': 3},
+            style={'color': '#121212'},
+        ),
+        dbc.Col(
+            children=[
+                dcc.RadioItems(
+                    id='trajectory-measure',
+                    options=[{'label': ' Count', 'value': 'count'},
+                             {'label': ' Share of keywords (%)', 'value': 'share'}],
+                    value='share',
+                    inline=True,
+                    inputStyle={'margin-left': '10px'},
+                ),
+            ],
+            width={'size': 2},
+            style={'display': 'flex', 'align-items': 'center'},
+        ),
+    ]),
+
+    # text paragraph for the custom word cloud
+    dbc.Row([
+        dbc.Col(
+            children=[
+                html.H5('''Create your own word cloud: combine any categories and a range of years to see their most 
+                frequent keywords together.''')
+            ],
+            width={'size': 6, 'offset': 3},
+            style={'margin-top': '20px'},
+        ),
+    ]),
+
+    # selection of the custom word cloud
+    dbc.Row([
+        dbc.Col(
+            children=[
+                dcc.Dropdown(
+                    id='custom-topics-dropdown',
+                    options=[{'label': topic, 'value': topic} for topic in TOPICS],
+                    value=TOPICS[:2],
+                    multi=True,
+                    searchable=False,
+                ),
+            ],
+            width={'size': 3, 'offset': 3},
+            style={'color': '#121212'},
+        ),
+        dbc.Col(
+            children=[
+                dbc.Label('Number of words'),
+                dcc.Slider(id='custom-top-n', min=50, max=300, step=50, value=150),
+            ],
+            width={'size': 3},
+        ),
+    ]),
+    dbc.Row([
+        dbc.Col(
+            children=[
+                dcc.RangeSlider(id='custom-year-range', min=2013, max=2023, step=step_size, value=[2013, 2023],
+                                marks=marks),
+            ],
+            width={'size': 6, 'offset': 3},
+            style={'margin-top': '5px'},
+        ),
+    ]),
+
+    # the custom word cloud
+    dbc.Row([
+        dbc.Col(
+            children=[
+
+                dcc.Loading(html.Img(id='custom-wordcloud', alt='Custom word cloud', style={'width': '100%'})),
+
+            ],
+            width={'size': 6, 'offset': 3},
+            style={'padding': '5px', 'background-color': 'white', 'border-radius': '10px',
+                   'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px'},
+        )
+    ],
+
+    ),
+
+    # term trajectory chart
+    dbc.Row([
+        dbc.Col(
+            children=[
+
+                dcc.Graph(id='term-trajectory-chart'),
+
+            ],
+            width={'size': 6, 'offset': 3},
+            style={'padding': '5px', 'background-color': 'white', 'border-radius': '10px',
+                   'box-shadow': '0px 2px 5px #949494', 'margin-top': '20px'},
+        )
+    ],
+
+    ),
 ])
 
 
 @callback(
-    Output('graph', 'figure'),
+    [Output('graph', 'src'),
+     Output('graph', 'style'),
+     Output('wordcloud-prefetch', 'children')],
     [Input('category-dropdown', 'value'),
      Input('year-slider', 'value')]
 )
@@ -187,22 +317,25 @@ def update_wordcloud(topic, year):
         :type topic: str
         :param year: The selected year for the word cloud.
         :type year: int
-        :return: Plotly figure object representing the word cloud image.
-        :rtype: plotly.graph_objs._figure.Figure
+        :return: URL of the word cloud image, the image style with the thumbnail shown while the image
+                 loads, and prefetch links for the neighbouring years.
+        :rtype: tuple
         """
-    if topic == 'all categories':
-        path = f'data/keyWordClouds/yearlyKeyWords/youtube_keywords_{year}.jpg'
-    else:
-        path = f'data/keyWordClouds/topicKeyWords/youtube_keywords_{topic}_{year}.jpg'
-
-    img = plt.imread(path)
-
-    fig = px.imshow(img)
+    # The browser loads and caches the compressed files itself
+    src = image_url(wordcloud_path(topic, year), 'full')
+    style = {'width': '100%'}
+    thumb = variant_url(wordcloud_path(topic, year), 'thumb')
+    if thumb is not None:
+        style.update({'background-image': f'url("{thumb}")', 'background-size': '100% 100%'})
 
-    fig.update_xaxes(showticklabels=False)
-    fig.update_yaxes(showticklabels=False)
+    # Thumbnails of all years and the full images of the previous and next year. Only built variants
+    # are prefetched; the originals are too large to download ahead on every slider step.
+    urls = [variant_url(wordcloud_path(topic, other_year), 'thumb') for other_year in YEARS if other_year != year]
+    urls += [variant_url(wordcloud_path(topic, other_year), 'full')
+             for other_year in (year - step_size, year + step_size) if other_year in YEARS]
+    prefetch = [html.Link(rel='prefetch', href=url) for url in urls if url is not None]
 
-    return fig
+    return src, style, prefetch
 
 
 @callback(
@@ -237,6 +370,7 @@ def update_slider_value(left_clicks, right_clicks, current_value):
     [Input('category-dropdown', 'value'),
      Input('year-slider', 'value')]
 )
+@memoize('keyword_store')
 def update_word_frequency_chart(topic, year):
     """
         Update the word frequency chart based on the selected topic and year.
@@ -248,14 +382,7 @@ def update_word_frequency_chart(topic, year):
         :return: Plotly figure object representing the word frequency chart.
         :rtype: plotly.graph_objs._figure.Figure
         """
-    if topic == 'all categories':
-        path = f'data/keyWordClouds/yearlyFrequentWords/frequent_words_{year}.csv'
-    else:
-        path = f'data/keyWordClouds/topicFrequentWords/frequent_words_{topic}_{year}'
-
-    frequent_words = pd.read_csv(path)
-
-    frequent_words = frequent_words.nlargest(50, 'numbers')
+    frequent_words = registry.get('keyword_store').top(topic, year, 50)
 
     fig = px.bar(x=frequent_words['numbers'], y=frequent_words['words'], color_discrete_sequence=['#dd2b2b'],
                  orientation='h')
@@ -267,3 +394,93 @@ def update_word_frequency_chart(topic, year):
 
                       )
     return fig
+
+
+@callback(
+    Output('term-dropdown', 'options'),
+    [Input('term-dropdown', 'search_value')],
+    [State('term-dropdown', 'value')]
+)
+def update_term_options(search_value, selected_terms):
+    """
+        Offer the keywords starting with the typed text.
+
+        :param search_value: The text typed into the dropdown.
+        :type search_value: str
+        :param selected_terms: The currently selected keywords, which always stay in the options.
+        :type selected_terms: list
+        :return: The dropdown options.
+        :rtype: list
+        """
+    terms = list(selected_terms or [])
+    if search_value:
+        terms += [term for term in registry.get('keyword_store').terms.complete(search_value) if term not in terms]
+    return [{'label': term, 'value': term} for term in terms]
+
+
+@callback(
+    Output('term-trajectory-chart', 'figure'),
+    [Input('term-dropdown', 'value'),
+     Input('category-dropdown', 'value'),
+     Input('trajectory-measure', 'value')]
+)
+@memoize('keyword_store')
+def update_term_trajectory(terms, topic, measure):
+    """
+        Update the term trajectory chart based on the selected keywords, topic and measure.
+
+        :param terms: The selected keywords.
+        :type terms: list
+        :param topic: The selected topic ('all categories' or a specific topic).
+        :type topic: str
+        :param measure: 'count' for the number of occurrences, 'share' for the share of all keywords of a year.
+        :type measure: str
+        :return: Plotly figure object representing the term trajectory chart.
+        :rtype: plotly.graph_objs._figure.Figure
+        """
+    trajectory = registry.get('keyword_store').terms.trajectory(terms or [], topic, share=measure == 'share')
+
+    fig = px.line(trajectory, x=trajectory.index, y=trajectory.columns, markers=True,
+                  labels={'year': 'Year', 'value': 'Share (%)' if measure == 'share' else 'Frequency',
+                          'term': 'Keyword'})
+    fig.update_layout(title='Keyword Trajectory',
+                      font=dict(color='black'),
+                      plot_bgcolor='white',
+                      )
+    return fig
+
+
+@callback(
+    Output('custom-wordcloud', 'src'),
+    [Input('custom-topics-dropdown', 'value'),
+     Input('custom-year-range', 'value'),
+     Input('custom-top-n', 'value')]
+)
+def update_custom_wordcloud(topics, year_range, top_n):
+    """
+        Render a word cloud of the combined keywords of the selected topics and years.
+
+        :param topics: The selected topics.
+        :type topics: list
+        :param year_range: The first and the last selected year.
+        :type year_range: list
+        :param top_n: Number of words in the word cloud.
+        :type top_n: int
+        :return: The word cloud as data URI.
+        :rtype: str
+        """
+    # The same selection in another order is the same word cloud
+    return custom_wordcloud(tuple(sorted(topics or [])), tuple(year_range), top_n)
+
+
+def custom_wordcloud(topics, year_range, top_n):
+    # Rendered word clouds are kept in their own size bounded cache instead of the callback cache,
+    # keyed by the selection and the keyword files
+    first_year, last_year = year_range
+    key = (topics, year_range, top_n, registry.fingerprint(['keyword_store']))
+
+    def frequencies():
+        terms = registry.get('keyword_store').terms
+        return terms.top_terms(topics, range(first_year, last_year + 1), top_n)
+
+    return wordcloud_cache.get(key, frequencies)
@@ -1,26 +1,24 @@
-import os
-import json
-import pandas as pd
-
 import dash
 import dash_bootstrap_components as dbc
 import plotly.express as px
 
 from dash import dcc, html, callback
-from geopy.geocoders import Nominatim
 from dash.dependencies import Input, Output
 from datetime import datetime, timedelta
 
+from utils.callbackCache import memoize
+from utils.countryIndex import INDEX_PATH, load_country_index, zoom_for_bounds
+from utils.dataSchemas import CATEGORIES
+from utils.datasetRegistry import registry
+from utils.trendsIngest import load_trends, update_trends
+
 
 # Register the page with the specified name
 dash.register_page(__name__, name='Trends')
 
-# Initialize geolocator for country coordinates
-geolocator = Nominatim(user_agent="country_locator")
-
-# Load Europe GeoJSON data
-with open('data/europe.geojson', encoding='utf-8') as f:
-    geojson_data = json.load(f)
+# Offline country index (centroids and bounding boxes keyed by ISO2), part of the registry
+# fingerprint so memoized maps are recomputed when the index is rebuilt
+registry.register('country_index', load_country_index, [INDEX_PATH])
 
 # Define data folder and EU countries ISO2 codes
 data_folder = 'data/Trends100vRegions'
@@ -62,177 +60,174 @@ eu_countries_iso2 = {
     'USA': 'US',
 }
 
-# Read category options from a CSV file
-category_options = pd.read_csv('data/Categories.csv')
+# Category options, read when the page is rendered
+CATEGORIES_PATH = 'data/Categories.csv'
+registry.register('categories', lambda: CATEGORIES.read(CATEGORIES_PATH), [CATEGORIES_PATH])
 
-# Load data from CSV files in the specified folder
-file_list = os.listdir(data_folder)
-dfs = []
 
-# Concatenate all CSV files into a single DataFrame
-for file_name in file_list:
-    if file_name.endswith('.csv'):
-        df = pd.read_csv(os.path.join(data_folder, file_name))
-        df['Country'] = file_name[:2]
-        dfs.append(df)
-weekly_df = pd.concat(dfs, ignore_index=True)
+# Build the (country, date, category) cube once; callbacks only read slices of the current one.
+# Days appended to the files later are added to the cube without re-reading the history.
+registry.register('trends_cube', lambda: load_trends(data_folder), [data_folder],
+                  updater=lambda cube, changed_paths: update_trends(cube, changed_paths, data_folder))
 
 # Function to get coordinates of a country
 def get_country_coordinates(country):
-    location = geolocator.geocode(country)
+    location = registry.get('country_index').get(country)
     if location:
-        return location.latitude, location.longitude
+        return location['Lat'], location['Lon']
     else:
         return None, None
 
-# Load initial data for pie chart
-pie_data = pd.read_csv(f'{data_folder}/DE_category_distribution.csv')
-df_selected_date = pie_data[pie_data['Execution Date'] == '2024-03-15']
-selected_pie_data = df_selected_date.groupby('Category Title')['Quantity'].sum().reset_index()
-pie_first_data = px.pie(selected_pie_data, values='Quantity', names='Category Title',
-                        hover_data={'Category Title': False, 'Quantity': True}, hover_name='Category Title')
-pie_first_data.update_traces(hovertemplate='Quantity')
-
-
 # ///////////////Layout//////////////////
 
-layout = html.Div([
-    # Header
-    dbc.Row(
-        [
+def layout(**kwargs):
+    # The layout holds no data, so importing the page and validating its callbacks does not load
+    # the categories; the category dropdown is filled in by update_category_options().
+    return html.Div([
+        # Header
+        dbc.Row(
+            [
+                dbc.Col(
+                    html.H2('Youtube Trends Analytics', style={'color': '#dd2b2b'}),
+                    width={'size': 5, 'offset': 1},
+                ),
+            ]
+        ),
+        # Description
+        dbc.Row(dbc.Col(html.H5('''
+                        Here, you can observe the distribution of categories in the top 100 videos per day and country.
+                        The countries available for selection include all EU member states and a selection of interesting countries from each additional continent.
+                        The date selection is available within the range where data is present.
+                        '''),
+                        width={'size': 4, 'offset': 1}
+                        ),
+                ),
+        dbc.Row(dbc.Col(html.H1('''
+                        '''),
+                        ),
+                ),
+         # Dropdowns for country and date selection
+        dbc.Row([
             dbc.Col(
-                html.H2('Youtube Trends Analytics', style={'color': '#dd2b2b'}),
-                width={'size': 5, 'offset': 1},
+                dcc.Dropdown(
+                    id='country-dropdown',
+                    options=[{'label': country, 'value': iso2} for country, iso2 in eu_countries_iso2.items()],
+                    value='DE',
+                    clearable=False,
+                    searchable=False,
+                ),
+                style={'color': '#262626'},
+                width={'size': 2, 'offset': 1, 'order': 1}
             ),
-        ]
-    ),
-    # Description
-    dbc.Row(dbc.Col(html.H5('''
-                    Here, you can observe the distribution of categories in the top 100 videos per day and country.
-                    The countries available for selection include all EU member states and a selection of interesting countries from each additional continent.
-                    The date selection is available within the range where data is present.
-                    '''),
-                    width={'size': 4, 'offset': 1}
-                    ),
+            # Date picker
+            dbc.Col(
+                dcc.DatePickerSingle(
+                    id='date-picker',
+                    min_date_allowed=datetime(2024, 3, 6),
+                    max_date_allowed=(datetime.today() - timedelta(days=1)),
+                    initial_visible_month=datetime.today(),
+                    date=(datetime(2024, 3, 15))
+                ),
+                width={'size': 1, 'offset': 1, 'order': 0}
             ),
-    dbc.Row(dbc.Col(html.H1('''
-                    '''),
-                    ),
+        ]),
+        # Pie chart and map graph
+        dbc.Row([
+            dbc.Col(
+                # The pie chart is drawn by update_pie_chart() for the initial country and date
+                dcc.Graph(id='pie-chart'),
+                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
+                width={'size': 4, 'offset': 1}
             ),
-     # Dropdowns for country and date selection
-    dbc.Row([
-        dbc.Col(
-            dcc.Dropdown(
-                id='country-dropdown',
-                options=[{'label': country, 'value': iso2} for country, iso2 in eu_countries_iso2.items()],
-                value='DE',
+            dbc.Col(
+                dcc.Graph(id='map-graph'),
+                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
+                width={'size': 3, 'offset': 1},
+            )
+        ],
+        className="g-0"),
+        dbc.Row([
+            dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
+            width={'size':8, 'offset':1}
+                    )
+        ],
+        style={'height':'50px'},
+        ),
+        # Description for weekly graph
+        dbc.Row([
+            dbc.Col(html.H5('''
+                    Here, you can view the distribution of individual
+                     categories over a few days for the selected country above.
+                    '''),
+                    width={'size': 3, 'offset': 1},
+                    
+                    )
+        ],
+        style={'height':'100px'},
+        align="start",),
+        # Dropdown for category selection
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(
+                id='trends-category-dropdown',
+                options=[{'label': 'Music', 'value': 'Music'}],
+                value='Music',
                 clearable=False,
                 searchable=False,
+                # placeholder="Select a category",
             ),
-            style={'color': '#262626'},
-            width={'size': 2, 'offset': 1, 'order': 1}
-        ),
-        # Date picker
-        dbc.Col(
-            dcc.DatePickerSingle(
-                id='date-picker',
-                min_date_allowed=datetime(2024, 3, 6),
-                max_date_allowed=(datetime.today() - timedelta(days=1)),
-                initial_visible_month=datetime.today(),
-                date=(datetime(2024, 3, 15))
+                style={'color': '#262626'},
+                width={'size': 2, 'offset': 1}
             ),
-            width={'size': 1, 'offset': 1, 'order': 0}
-        ),
-    ]),
-    # Pie chart and map graph
-    dbc.Row([
-        dbc.Col(
-            dcc.Graph(id='pie-chart', figure=pie_first_data),
-            style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
-            width={'size': 4, 'offset': 1}
-        ),
-        dbc.Col(
-            dcc.Graph(id='map-graph'),
-            style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
-            width={'size': 3, 'offset': 1},
-        )
-    ],
-    className="g-0"),
-    dbc.Row([
-        dbc.Col(html.Hr(style={'margin': '20px 0', 'border': 'none', 'border-top': '1px solid #ccc'}),
-        width={'size':8, 'offset':1}
-                )
-    ],
-    style={'height':'50px'},
-    ),
-    # Description for weekly graph
-    dbc.Row([
-        dbc.Col(html.H5('''
-                Here, you can view the distribution of individual
-                 categories over a few days for the selected country above.
-                '''),
-                width={'size': 3, 'offset': 1},
-                
-                )
-    ],
-    style={'height':'100px'},
-    align="start",),
-    # Dropdown for category selection
-    dbc.Row([
-        dbc.Col(dcc.Dropdown(
-            id='category-dropdown',
-            options=[{'label': category, 'value': category} for category in category_options['Category Title']],
-            value='Music',
-            clearable=False,
-            searchable=False,
-            # placeholder="Select a category",
-        ),
-            style={'color': '#262626'},
-            width={'size': 2, 'offset': 1}
-        ),
-        # dbc.Col(dcc.Graph(id='weekly-graph'), width=4)
-    ]),
-    dbc.Row([
-        dbc.Col(html.H1()
-        ),
-        # dbc.Col(dcc.Graph(id='weekly-graph'), width=4)
-    ]),
-    # Weekly graph and description
-    dbc.Row([
-        dbc.Col(dcc.Graph(id='weekly-graph'), width={'size':4,'offset':1},
-            style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
+            # dbc.Col(dcc.Graph(id='weekly-graph'), width=4)
+        ]),
+        dbc.Row([
+            dbc.Col(html.H1()
+            ),
+            # dbc.Col(dcc.Graph(id='weekly-graph'), width=4)
+        ]),
+        # Weekly graph and description
+        dbc.Row([
+            dbc.Col(dcc.Graph(id='weekly-graph'), width={'size':4,'offset':1},
+                style={'padding': '5px', 'background-color': '#d1d1d1', 'border-radius': '10px', 'box-shadow': '0px 2px 5px #949494'},
+            ),
+            dbc.Col([html.H5('''
+                    For several years now, the music industry has established that songs
+                    and albums are released on the night of Thursday to Friday.
+                    This is also shown by the trends over the week. On Friday, the number of
+                    music videos jumps up and then increases even further over the next few days as the
+                    new music videos are watched there. The proportion then drops again by next Friday.
+                    
+                    '''),
+                    html.Br(),
+                    html.H5('Unfortunately, on days where there are no values, the Youtube API query failed.'),
+            ],width={'size':4})
+        ],
         ),
-        dbc.Col([html.H5('''
-                For several years now, the music industry has established that songs
-                and albums are released on the night of Thursday to Friday.
-                This is also shown by the trends over the week. On Friday, the number of
-                music videos jumps up and then increases even further over the next few days as the
-                new music videos are watched there. The proportion then drops again by next Friday.
-                
-                '''),
-                html.Br(),
-                html.H5('Unfortunately, on days where there are no values, the Youtube API query failed.'),
-        ],width={'size':4})
-    ],
-    ),
-])
+    ])
 
 
 # ///////////////Callbacks//////////////////
 
+# Fill in the categories when the page is rendered
+@callback(
+    Output('trends-category-dropdown', 'options'),
+    [Input('trends-category-dropdown', 'id')]
+)
+def update_category_options(_):
+    categories = registry.get('categories')['Category Title']
+    return [{'label': category, 'value': category} for category in categories]
+
+
 # Callback to update weekly graph based on category and country selection
 @callback(
     Output('weekly-graph', 'figure'),
-    [Input('category-dropdown', 'value'),
+    [Input('trends-category-dropdown', 'value'),
     Input('country-dropdown', 'value')]
 )
+@memoize('trends_cube')
 def update_weeklygraph(selected_category, selected_country):
     if selected_category and selected_country:
-        weekly_df['Execution Date'] = pd.to_datetime(weekly_df['Execution Date'])
-        filtered_df = weekly_df[(weekly_df['Category Title'] == selected_category) &
-                                (weekly_df['Country'] == selected_country) &
-                                (weekly_df['Execution Date'] >= weekly_df['Execution Date'].min()) &
-                                (weekly_df['Execution Date'] <= weekly_df['Execution Date'].max())]
+        filtered_df = registry.get('trends_cube').series(selected_country, selected_category)
         weekly_fig = px.bar(filtered_df, x='Execution Date', y='Quantity', color='Country', title=f'Data for {selected_category} in {selected_country}')
         weekly_fig.update_traces(marker_color='#dd2b2b', hovertemplate='%{y}')
         weekly_fig.update_xaxes(title_text='Date')
@@ -251,22 +246,25 @@ def update_weeklygraph(selected_category, selected_country):
     [Input('country-dropdown', 'value'),
      Input('date-picker', 'date')]
 )
+@memoize('trends_cube')
 def update_pie_chart(selected_country, selected_date):
     if selected_country is None or selected_date is None:
         return {}
 
-    file_path = f'{data_folder}/{selected_country}_category_distribution.csv'
-    df = pd.read_csv(file_path)
-
     selected_date = datetime.strptime(selected_date[:10], '%Y-%m-%d')
-    df_selected_date = df[df['Execution Date'] == selected_date.strftime('%Y-%m-%d')]
+    trends_cube = registry.get('trends_cube')
+    df_grouped = trends_cube.distribution(selected_country, selected_date.date())
 
-    if df_selected_date.empty:
+    if df_grouped.empty:
+        if trends_cube.is_missing(selected_country, selected_date.date()):
+            message = 'The YouTube API query failed for the selected date.'
+        else:
+            message = 'No data available for the selected date.'
         return {
             'data': [],
             'layout': {
                 'annotations': [{
-                    'text': 'No data available for the selected date.',
+                    'text': message,
                     'x': 0.5,
                     'y': 0.5,
                     'xref': 'paper',
@@ -284,7 +282,6 @@ def update_pie_chart(selected_country, selected_date):
             }
         }
 
-    df_grouped = df_selected_date.groupby('Category Title')['Quantity'].sum().reset_index()
     pie = px.pie(df_grouped, values='Quantity', names='Category Title', hover_name='Category Title',
                 color_discrete_map={
                         'Film & Animation': '#1f77b4',
@@ -316,6 +313,7 @@ def update_pie_chart(selected_country, selected_date):
     Output('map-graph', 'figure'),
     [Input('country-dropdown', 'value')]
 )
+@memoize('country_index')
 def update_map(selected_country):
     if selected_country is None:
         return {}
@@ -323,12 +321,16 @@ def update_map(selected_country):
     # Lade die Koordinaten für das ausgewählte Land
     country_lat, country_lon = get_country_coordinates(selected_country)
 
+    # Zoom so that the whole country is visible, fall back to the old default for unknown countries
+    location = registry.get('country_index').get(selected_country)
+    zoom = zoom_for_bounds(location) if location else 3
+
     # Erstelle eine Karte mit dem ausgewählten Land zentriert
     map_fig = px.choropleth_mapbox(
         color=[1],
         mapbox_style="carto-positron",
         center={"lat": country_lat, "lon": country_lon},
-        zoom=3
+        zoom=zoom
     )
     map_fig.update_layout(
         plot_bgcolor='#e7e7e7',
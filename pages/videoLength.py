@@ -1,5 +1,3 @@
-import pandas as pd
-
 import dash
 import plotly.express as px
 import dash_bootstrap_components as dbc
@@ -7,12 +5,19 @@ import dash_bootstrap_components as dbc
 from dash import dcc, html, callback
 from dash.dependencies import Input, Output
 
+from utils.callbackCache import memoize
+from utils.dataSchemas import VIDEO_LENGTH
+from utils.datasetRegistry import registry
+
 # Register the page with the specified name
 dash.register_page(__name__, name='Video Length')
 
 # Load original and filtered video length data
-video_length_data = pd.read_csv('./data/videoLength/VideoLengthData.csv')
-filtered_video_length_data = pd.read_csv('./data/videoLength/Filtered_VideoLengthData.csv')
+VIDEO_LENGTH_PATH = './data/videoLength/VideoLengthData.csv'
+FILTERED_VIDEO_LENGTH_PATH = './data/videoLength/Filtered_VideoLengthData.csv'
+registry.register('video_length', lambda: VIDEO_LENGTH.read(VIDEO_LENGTH_PATH), [VIDEO_LENGTH_PATH])
+registry.register('filtered_video_length', lambda: VIDEO_LENGTH.read(FILTERED_VIDEO_LENGTH_PATH),
+                  [FILTERED_VIDEO_LENGTH_PATH])
 
 # ///////////////Layout//////////////////
 
@@ -89,20 +94,14 @@ layout = html.Div([
 
 # ///////////////Callbacks//////////////////
 
-# Callback to update graphs and text output based on dropdown selectio
-@callback(
-    [Output('video-length-bar', 'figure'),
-     Output('video-length-lineplot', 'figure'),
-     Output('text-output', 'children')],
-    [Input('data-dropdown', 'value')]
-)
-def update_graphs(selected_data):
+# Builds the graphs and text output of a dropdown selection
+def build_graphs(selected_data):
     if selected_data == 'original_data':
-        data_to_use = video_length_data
+        data_to_use = registry.get('video_length')
         text_output = [html.B("The Original Data"),
                        " refers to the unfiltered dataset obtained from the YouTube API through our request."]
     elif selected_data == 'filtered_data':
-        data_to_use = filtered_video_length_data
+        data_to_use = registry.get('filtered_video_length')
         text_output = [
             html.Div([
                 html.B("The Filtered Data "),
@@ -169,3 +168,16 @@ def update_graphs(selected_data):
     )
 
     return bar_fig, line_fig, text_output
+
+
+# Callback to update graphs and text output based on dropdown selectio
+# The outputs of both dropdown options are built in advance once per data version
+@callback(
+    [Output('video-length-bar', 'figure'),
+     Output('video-length-lineplot', 'figure'),
+     Output('text-output', 'children')],
+    [Input('data-dropdown', 'value')]
+)
+@memoize('video_length', 'filtered_video_length', domain=[('original_data',), ('filtered_data',)])
+def update_graphs(selected_data):
+    return build_graphs(selected_data)
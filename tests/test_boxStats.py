@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.boxStats import box_statistics
+
+
+def _plotly_linear(values):
+    # Transcription of Plotly's box calc for quartilemethod='linear' (Lib.interp and the fences)
+    values = sorted(values)
+    n = len(values)
+
+    def interp(p):
+        position = p * n - 0.5
+        if position < 0:
+            return values[0]
+        if position > n - 1:
+            return values[-1]
+        fraction = position % 1
+        return fraction * values[math.ceil(position)] + (1 - fraction) * values[math.floor(position)]
+
+    q1, median, q3 = interp(0.25), interp(0.5), interp(0.75)
+    lower = min(q1, min(value for value in values if value >= 2.5 * q1 - 1.5 * q3))
+    upper = max(q3, max(value for value in values if value <= 2.5 * q3 - 1.5 * q1))
+    return q1, median, q3, lower, upper
+
+
+@pytest.mark.parametrize('values, expected', [
+    ([1, 2, 3, 4, 5], (1.75, 3, 4.25, 1, 5)),
+    ([1, 2, 3, 4, 5, 6, 7, 8, 9, 40], (3, 5.5, 8, 1, 9)),
+    ([-30, 2, 4, 7, 11, 16], (2, 5.5, 11, 2, 16)),
+])
+def test_statistics_match_plotly_linear_quartiles(values, expected):
+    stats = box_statistics(pd.DataFrame({'group': 'a', 'value': values}), 'group', 'value').iloc[0]
+    computed = tuple(stats[['q1', 'median', 'q3', 'lowerfence', 'upperfence']])
+    assert computed == pytest.approx(expected)
+    assert computed == pytest.approx(_plotly_linear(values))
+
+
+def test_outliers_are_thinned_keeping_the_extremes():
+    values = np.r_[np.arange(1000), np.arange(10000, 10050)]
+    stats = box_statistics(pd.DataFrame({'group': 'a', 'value': values}), 'group', 'value', max_outliers=10).iloc[0]
+    assert stats['upperfence'] == 999
+    assert stats['outlier_count'] == 50
+    assert len(stats['outliers']) == 10
+    assert stats['outliers'][0] == 10000 and stats['outliers'][-1] == 10049
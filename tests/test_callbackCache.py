@@ -0,0 +1,54 @@
+import utils.callbackCache as callback_cache_module
+
+from utils.callbackCache import CallbackCache
+from utils.datasetRegistry import registry
+
+
+def _output(calls):
+    def function(x):
+        calls.append(x)
+        return {'x': x}
+    return function
+
+
+def test_changed_dataset_keeps_outputs_of_other_datasets(tmp_path):
+    first, second = tmp_path / 'first.csv', tmp_path / 'second.csv'
+    first.write_text('a\n')
+    second.write_text('b\n')
+    registry.register('test_first', first.read_text, [str(first)])
+    registry.register('test_second', second.read_text, [str(second)])
+    registry.get('test_first')
+    registry.get('test_second')
+
+    cache = CallbackCache(str(tmp_path / 'callbacks.sqlite'), memory_entries=16, disk_entries=0)
+    calls = []
+    cache.call('first', _output(calls), (1,), ['test_first'])
+    cache.call('second', _output(calls), (2,), ['test_second'])
+
+    second.write_text('changed\n')
+    assert registry.refresh() == ['test_second']
+    cache.call('first', _output(calls), (1,), ['test_first'])
+    cache.call('second', _output(calls), (2,), ['test_second'])
+    assert calls == [1, 2, 2]
+
+
+def test_pruning_keeps_entries_of_other_generations(tmp_path, monkeypatch):
+    monkeypatch.setattr(callback_cache_module, 'PRUNE_INTERVAL', 1)
+    path = str(tmp_path / 'callbacks.sqlite')
+    registry.register('test_pruning', lambda: None, [str(tmp_path)])
+    calls = []
+
+    # A worker of the previous release and one of the current release share the database
+    old = CallbackCache(path, memory_entries=0, disk_entries=10, version='old')
+    new = CallbackCache(path, memory_entries=0, disk_entries=10, version='new')
+    old.call('callback', _output(calls), (1,), ['test_pruning'])
+    new.call('callback', _output(calls), (1,), ['test_pruning'])
+    old.call('callback', _output(calls), (1,), ['test_pruning'])
+    assert calls == [1, 1]
+    assert old.stats()['callback']['disk_hits'] == 1
+
+    # Only the least recently stored entries beyond disk_entries are removed
+    for x in range(2, 12):
+        new.call('callback', _output(calls), (x,), ['test_pruning'])
+    old.call('callback', _output(calls), (1,), ['test_pruning'])
+    assert calls[-1] == 1 and len(calls) == 13
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import utils.dataCache as data_cache
+
+from utils.channelStore import ChannelCatalog
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+
+def _write_channel(directory, channel, count):
+    folder = directory / channel
+    folder.mkdir(exist_ok=True)
+    (folder / 'development.csv').write_text('Day,Count,Average per Video,Relative Probability (%)\n'
+                                            f'1,{count},{count / 2},50.0\n2,{count},{count / 2},50.0\n')
+    (folder / 'development_daily.csv').write_text('Day,Hour,Count,Average per Video,Relative Probability\n'
+                                                  f'0,0,{count},{count / 2},0.5\n0,1,{count},{count / 2},0.5\n')
+    return [str(folder / 'development.csv'), str(folder / 'development_daily.csv')]
+
+
+def test_update_reloads_only_changed_channels(tmp_path):
+    directory = tmp_path / 'comments'
+    directory.mkdir()
+    _write_channel(directory, 'a', 10)
+    _write_channel(directory, 'b', 20)
+    catalog = ChannelCatalog(str(directory), summary_path=str(tmp_path / 'summary.json'))
+    first_a, first_b = catalog.get('a'), catalog.get('b')
+
+    changed = _write_channel(directory, 'b', 40) + _write_channel(directory, 'c', 60)
+    updated = catalog.updated(changed)
+
+    assert updated.channels == ['a', 'b', 'c']
+    assert updated.get('a') is first_a
+    assert updated.get('b') is not first_b
+    assert updated.get('b').hourly['Count'][0, 0] == 40
+    assert list(updated.overall()['Average per Video']) == pytest.approx([(5 + 20 + 30) / 3] * 2)
+
+    # the old catalog is unchanged for callbacks still reading it
+    assert catalog.channels == ['a', 'b']
+    assert catalog.get('b') is first_b
+
+
+def test_update_removes_deleted_channels(tmp_path):
+    directory = tmp_path / 'comments'
+    directory.mkdir()
+    _write_channel(directory, 'a', 10)
+    removed = _write_channel(directory, 'b', 20)
+    catalog = ChannelCatalog(str(directory), summary_path=str(tmp_path / 'summary.json'))
+
+    for path in removed:
+        os.remove(path)
+    updated = catalog.updated(removed)
+
+    assert updated.channels == ['a']
+    with pytest.raises(KeyError):
+        updated.get('b')
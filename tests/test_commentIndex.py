@@ -0,0 +1,52 @@
+import numpy as np
+
+from utils.commentIndex import CommentSearch, InvertedIndex, _decode_varints, _encode_varints, normalize_query
+
+TEXTS = ['Stay home, stay safe', 'The second dose is safe', 'Dose two: second', '', 'home SECOND dose']
+
+
+def test_varint_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2 ** 35 + 5], dtype=np.int64)
+    data, lengths = _encode_varints(values)
+    assert list(lengths) == [1, 1, 1, 2, 2, 2, 3, 6]
+    assert len(data) == lengths.sum()
+    assert list(data[3:5]) == [0x80, 0x01]
+    assert list(_decode_varints(data)) == list(values)
+    assert len(_decode_varints(np.zeros(0, dtype=np.uint8))) == 0
+
+
+def test_postings_and_intersection():
+    index = InvertedIndex.build(TEXTS)
+    assert list(index.postings('stay')) == [0]
+    assert list(index.postings('second')) == [1, 2, 4]
+    assert list(index.intersect(['second', 'dose'])) == [1, 2, 4]
+    assert list(index.intersect(['second', 'dose', 'safe'])) == [1]
+    assert list(index.intersect(['home', 'safe'])) == [0]
+
+
+def test_postings_of_many_rows():
+    texts = ['common' + (' rare' if row % 1000 == 999 else '') for row in range(5000)]
+    index = InvertedIndex.build(texts)
+    assert list(index.postings('common')) == list(range(5000))
+    assert list(index.intersect(['common', 'rare'])) == [999, 1999, 2999, 3999, 4999]
+
+
+def test_query_misses():
+    index = InvertedIndex.build(TEXTS)
+    assert len(index.postings('vaccine')) == 0
+    assert len(index.intersect(['second', 'vaccine'])) == 0
+    assert len(index.intersect(['stay', 'dose'])) == 0
+
+    search = CommentSearch(TEXTS)
+    assert len(search.search('vaccine')) == 0
+    assert len(search.search('"dose second"')) == 0
+    assert search.search('') is None
+    assert search.search('!?') is None
+
+
+def test_search_words_and_phrases():
+    search = CommentSearch(TEXTS)
+    assert list(search.search('Second DOSE')) == [1, 2, 4]
+    assert list(search.search('"second dose"')) == [1, 4]
+    assert list(search.search('"safe"')) == [0, 1]
+    assert normalize_query('safe "Second  dose"') == (('safe',), (('second', 'dose'),))
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+import utils.commentStore as comment_store
+import utils.dataCache as data_cache
+
+from utils.commentStore import CommentTextStore, load_comment_corpus
+
+CSV = 'year,query,text,emotion\n2020,COVID-19,stay home,joy\n2021,Lockdown,"wash, hands",\n'
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(comment_store, 'CACHE_DIR', str(tmp_path / 'cache'))
+    data = tmp_path / 'data'
+    data.mkdir()
+    monkeypatch.chdir(tmp_path)
+    path = data / 'comments.csv'
+    path.write_text(CSV)
+    return 'data/comments.csv'
+
+
+def _builds(monkeypatch):
+    built = []
+    build = CommentTextStore.build
+
+    def counted(texts, text_path, offsets_path):
+        built.append(text_path)
+        build(texts, text_path, offsets_path)
+    monkeypatch.setattr(CommentTextStore, 'build', staticmethod(counted))
+    return built
+
+
+def test_store_is_reused_until_the_source_changes(source, monkeypatch):
+    built = _builds(monkeypatch)
+    assert load_comment_corpus(source).texts.get([0, 1]) == ['stay home', 'wash, hands']
+    assert load_comment_corpus(source).texts.get([0, 1]) == ['stay home', 'wash, hands']
+    assert len(built) == 1
+    assert not [name for name in os.listdir('cache') if name.endswith('.tmp')]
+
+    with open(source, 'a') as f:
+        f.write('2022,COVID-19,vaccinated,joy\n')
+    assert load_comment_corpus(source).texts.get([2]) == ['vaccinated']
+    assert len(built) == 2
+
+
+def test_change_during_the_build_is_not_recorded(source, monkeypatch):
+    build = CommentTextStore.build
+
+    def build_then_touch(texts, text_path, offsets_path):
+        build(texts, text_path, offsets_path)
+        os.utime(source, ns=(0, 0))
+    monkeypatch.setattr(CommentTextStore, 'build', staticmethod(build_then_touch))
+    load_comment_corpus(source)
+    assert not os.path.exists('cache/comments.csv.text.json')
+
+    # The next load rebuilds the store instead of trusting it
+    monkeypatch.setattr(CommentTextStore, 'build', staticmethod(build))
+    built = _builds(monkeypatch)
+    load_comment_corpus(source)
+    assert len(built) == 1
+    assert os.path.exists('cache/comments.csv.text.json')
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from utils.commentTiming import CommentTiming, update_channel
+
+
+def _records(*comments):
+    return pd.DataFrame([{'comment_id': comment, 'video_id': video, 'video_published_at': '2024-01-01T00:00:00Z',
+                          'comment_published_at': published} for comment, video, published in comments])
+
+
+FIRST = _records(('c1', 'v1', '2024-01-01T00:30:00Z'),
+                 ('c2', 'v1', '2024-01-01T05:10:00Z'),
+                 ('c3', 'v2', '2024-01-02T01:00:00Z'),
+                 ('c4', 'v2', '2023-12-31T23:00:00Z'))
+
+
+def test_comments_are_binned_by_hours_since_the_release(tmp_path):
+    timing = update_channel(str(tmp_path), [FIRST])
+
+    daily = timing.development_daily()
+    assert daily[['Day', 'Hour', 'Count']].values.tolist() == [[0, 0, 1], [0, 5, 1], [1, 1, 1]]
+    assert list(daily['Average per Video']) == [0.5, 0.5, 0.5]
+    development = timing.development()
+    assert development[['Day', 'Count']].values.tolist() == [[1, 2], [2, 1]]
+    assert development['Relative Probability (%)'].sum() == pytest.approx(100)
+
+
+def test_duplicate_comments_are_counted_once(tmp_path):
+    update_channel(str(tmp_path), [FIRST])
+    # c2 is exported again, c5 twice in the same chunk
+    again = _records(('c2', 'v1', '2024-01-01T05:10:00Z'),
+                     ('c5', 'v3', '2024-01-01T00:10:00Z'),
+                     ('c5', 'v3', '2024-01-01T00:10:00Z'))
+    timing = update_channel(str(tmp_path), [again, again])
+
+    assert int(timing.counts.sum()) == 4
+    assert timing.counts[0, 0] == 2
+    assert timing.video_count == 3
+
+    reloaded = CommentTiming.load(str(tmp_path))
+    assert reloaded.comments == {'c1', 'c2', 'c3', 'c4', 'c5'}
+    assert (reloaded.counts == timing.counts).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.confidenceIntervals import group_mean_intervals
+
+
+def _frame():
+    return pd.DataFrame({'group': ['b', 'a', 'b', 'a', 'b', 'c', 'a', 'b'],
+                         'value': [1.0, 2.0, 3.0, 4.0, np.nan, 5.0, 9.0, 8.0]})
+
+
+def test_group_means_and_intervals():
+    result = group_mean_intervals(_frame(), 'group', ['value'], resamples=200, seed=7)
+
+    assert list(result['group']) == ['a', 'b', 'c']
+    assert list(result['value']) == pytest.approx([5.0, 4.0, 5.0])
+
+    # The groups are resampled in order from one generator, NaN values are dropped
+    rng = np.random.default_rng(7)
+    for row, values in enumerate([np.array([2.0, 4.0, 9.0]), np.array([1.0, 3.0, 8.0])]):
+        means = values[rng.integers(0, len(values), size=(200, len(values)))].mean(axis=1)
+        lower, upper = np.percentile(means, [2.5, 97.5])
+        assert result.loc[row, 'value lower'] == pytest.approx(lower)
+        assert result.loc[row, 'value upper'] == pytest.approx(upper)
+        assert values.min() <= lower <= result.loc[row, 'value'] <= upper <= values.max()
+
+    # A single value has no spread
+    assert result.loc[2, 'value lower'] == result.loc[2, 'value upper'] == 5.0
+
+
+def test_intervals_are_reproducible():
+    first = group_mean_intervals(_frame(), 'group', ['value'], resamples=200, seed=7)
+    second = group_mean_intervals(_frame(), 'group', ['value'], resamples=200, seed=7)
+    pd.testing.assert_frame_equal(first, second)
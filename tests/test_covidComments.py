@@ -0,0 +1,21 @@
+import os
+
+os.environ.setdefault('DEFER_BACKGROUND_TASKS', '1')
+os.environ.setdefault('CALLBACK_DISK_ENTRIES', '0')
+
+import app  # noqa: E402,F401  creates the Dash app the pages register with
+import pages.covidComments as covid_comments  # noqa: E402
+
+NO_MATCH = 'zzzzqqq'
+
+
+def test_line_plot_without_matching_comments():
+    for query in ['All Queries', 'COVID-19']:
+        fig = covid_comments.update_line_plot('All Years', query, NO_MATCH)
+        assert not any(len(trace.get('y', [])) for trace in fig['data'])
+        assert fig['layout']['title']['text'] == 'Relative Emotion Distribution Over Time'
+
+
+def test_line_plot_with_matching_comments():
+    fig = covid_comments.update_line_plot('All Years', 'All Queries', '')
+    assert len(fig['data']) > 0
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+import utils.dataCache as data_cache
+
+from utils.dataCache import read_cached_csv
+
+
+def test_cache_round_trip_without_pickles(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'mixed.csv'
+    path.write_text('text,mixed,number\nx,1,1.5\n,q,2\ny,,3\n')
+
+    def prepare(df):
+        # An object column with numbers and strings
+        return df.assign(mixed=df['mixed'].map({'1': 1, 'q': 'q'}))
+
+    parsed = read_cached_csv(str(path), prepare)
+    cached = read_cached_csv(str(path), prepare)
+    pd.testing.assert_frame_equal(cached, parsed)
+    assert cached['mixed'].tolist()[:2] == [1, 'q']
+
+    cache_path, = (tmp_path / 'cache').glob('*.npz')
+    with np.load(cache_path, allow_pickle=False) as npz:
+        assert all(npz[key].dtype != object for key in npz.files)
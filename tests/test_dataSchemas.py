@@ -0,0 +1,33 @@
+import pytest
+
+import utils.dataSchemas as data_schemas
+
+from utils.dataSchemas import Schema, _between
+
+
+@pytest.fixture(autouse=True)
+def schemas(monkeypatch):
+    monkeypatch.setattr(data_schemas, '_schemas', [])
+
+
+def _schema(*checks):
+    return Schema('test', ['test/*.csv'], {'Value': 'int32'}, checks=checks)
+
+
+def test_version_depends_on_the_values_captured_by_checks():
+    def at_most(limit):
+        return 'small values', ['Value'], lambda df: df['Value'].to_numpy() <= limit
+
+    assert _schema(at_most(10)).version == _schema(at_most(10)).version
+    assert _schema(at_most(10)).version != _schema(at_most(20)).version
+    assert _schema(_between('Value', 0, 5)).version != _schema(_between('Value', 0, 6)).version
+
+
+def test_version_depends_on_default_values():
+    def check(df, limit=10):
+        return df['Value'].to_numpy() <= limit
+
+    first = _schema(('small values', ['Value'], check)).version
+    assert first == _schema(('small values', ['Value'], check)).version
+    check.__defaults__ = (20,)
+    assert first != _schema(('small values', ['Value'], check)).version
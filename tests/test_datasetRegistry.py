@@ -0,0 +1,14 @@
+from utils.datasetRegistry import DatasetRegistry
+
+
+def test_refresh_rebuilds_dependent_datasets_from_new_data(tmp_path):
+    source = tmp_path / 'values.csv'
+    source.write_text('1\n')
+    registry = DatasetRegistry()
+    registry.register('values', source.read_text, [str(source)])
+    registry.register('doubled', lambda: registry.get('values') * 2, [str(source)])
+    assert registry.get('doubled') == '1\n1\n'
+
+    source.write_text('22\n')
+    assert registry.refresh() == ['doubled', 'values']
+    assert registry.get('doubled') == '22\n22\n'
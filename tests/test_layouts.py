@@ -0,0 +1,58 @@
+import os
+
+os.environ.setdefault('DEFER_BACKGROUND_TASKS', '1')
+os.environ.setdefault('CALLBACK_DISK_ENTRIES', '0')
+
+import dash  # noqa: E402
+import app  # noqa: E402
+
+from dash._callback import GLOBAL_CALLBACK_LIST  # noqa: E402
+from utils.datasetRegistry import registry  # noqa: E402
+
+
+def _component_ids(component):
+    ids = {getattr(component, 'id', None)}
+    ids.update(child.id for child in component._traverse_ids())
+    return ids
+
+
+def _callback_ids(callback):
+    ids = {output.rsplit('.', 1)[0] for output in callback['output'].strip('.').split('...')}
+    ids.update(dependency['id'] for dependency in callback['inputs'] + callback['state'])
+    return ids
+
+
+def _page_layouts():
+    layouts = [app.app.layout]
+    for page in dash.page_registry.values():
+        layout = page['layout']
+        layouts.append(layout() if callable(layout) else layout)
+    return layouts
+
+
+def test_page_layouts_read_no_datasets(monkeypatch):
+    # Dash calls every layout() on the first request to build its validation layout
+    read = []
+    monkeypatch.setattr(registry, 'get', read.append)
+    _page_layouts()
+    assert read == []
+
+
+def test_callback_ids_exist_in_layouts():
+    ids = set()
+    for layout in _page_layouts():
+        ids |= _component_ids(layout)
+
+    for callback in GLOBAL_CALLBACK_LIST:
+        missing = _callback_ids(callback) - ids
+        assert not missing, f"{callback['output']} uses ids missing from the layouts: {sorted(missing)}"
+
+
+def test_component_ids_are_unique_across_pages():
+    # The validation layout holds all pages at once, and callbacks of one page would update another
+    seen = {}
+    for page in dash.page_registry.values():
+        layout = page['layout']
+        for component_id in _component_ids(layout() if callable(layout) else layout) - {None}:
+            assert component_id not in seen, f"'{component_id}' is used by {seen[component_id]} and {page['module']}"
+            seen[component_id] = page['module']
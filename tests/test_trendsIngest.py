@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.dataSchemas import SchemaError
+from utils.trendsIngest import _read_appended_rows, country_file, ingest_trends
+
+HEADER = 'Execution Date,Category ID,Quantity,Category Title\n'
+
+
+def _rows(quantity):
+    return pd.DataFrame({'Country': ['XX', 'XX'], 'Execution Date': ['2024-03-27', '2024-03-27'],
+                         'Category ID': [10, 27], 'Quantity': [12, quantity],
+                         'Category Title': ['Music', 'Education']})
+
+
+def test_ingest_rejects_invalid_rows(tmp_path):
+    with pytest.raises(SchemaError, match="'Quantity' is between 1 and 100"):
+        ingest_trends(_rows(0), str(tmp_path))
+    assert not os.path.exists(country_file('XX', str(tmp_path)))
+
+    assert ingest_trends(_rows(5), str(tmp_path)) == 2
+    with open(country_file('XX', str(tmp_path))) as f:
+        assert f.read() == HEADER + '2024-03-27,10,12,Music\n2024-03-27,27,5,Education\n'
+
+
+def test_appended_row_errors_report_file_lines(tmp_path):
+    path = country_file('XX', str(tmp_path))
+    with open(path, 'w') as f:
+        f.write(HEADER + '2024-03-26,10,12,Music\n2024-03-26,27,5,Education\n')
+    offset = os.path.getsize(path)
+    with open(path, 'a') as f:
+        f.write('2024-03-27,10,12,Music\n2024-03-27,27,0,Education\n')
+
+    # The invalid row is the fifth line of the file, not the second of the appended lines
+    with pytest.raises(SchemaError, match='first on line 5'):
+        _read_appended_rows(path, offset)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from utils.wordCloudRenderer import WordCloudCache, place_words, render_wordcloud
+
+WORDS = [f'{word}{i}' for i, word in enumerate(['minecraft', 'fortnite', 'vaccine', 'election', 'recipe'] * 40)]
+COUNTS = np.arange(len(WORDS), 0, -1) * 7
+
+
+def _frequencies(calls, words):
+    def frequencies():
+        calls.append(words)
+        return list(words), list(range(len(words), 0, -1))
+    return frequencies
+
+
+def test_cache_renders_each_key_once():
+    cache = WordCloudCache(budget_mb=1)
+    calls = []
+    first = cache.get(('a', 'b'), _frequencies(calls, ['alpha', 'beta']))
+    second = cache.get(('a', 'b'), _frequencies(calls, ['alpha', 'beta']))
+    assert first == second
+    assert first.startswith('data:image/webp;base64,')
+    assert calls == [['alpha', 'beta']]
+
+
+def test_cache_stays_within_its_budget():
+    calls = []
+    size = len(WordCloudCache().get('probe', _frequencies(calls, ['alpha', 'beta'])))
+    cache = WordCloudCache(budget_mb=2.5 * size / 1024 / 1024)
+    for key in range(5):
+        cache.get(key, _frequencies(calls, ['alpha', 'beta']))
+        assert cache.size() <= cache.budget
+
+    # the least recently used word clouds were removed
+    cache.get(4, _frequencies(calls, ['alpha', 'beta']))
+    assert len(calls) == 6
+    cache.get(0, _frequencies(calls, ['alpha', 'beta']))
+    assert len(calls) == 7
+
+
+def _overlap(first, second):
+    return first[0] < second[2] and second[0] < first[2] and first[1] < second[3] and second[1] < first[3]
+
+
+def test_placed_words_do_not_overlap_and_stay_on_the_canvas():
+    placements = place_words(WORDS, COUNTS, width=480, height=192)
+    boxes = [box for _, box in filter(None, placements)]
+    assert len(placements) == len(WORDS)
+    # The canvas is too small for all words, the rest is skipped
+    assert 10 < len(boxes) < len(WORDS)
+    assert placements[0] is not None
+
+    for i, box in enumerate(boxes):
+        left, top, right, bottom = box
+        assert 0 <= left < right <= 480 and 0 <= top < bottom <= 192
+        assert not any(_overlap(box, other) for other in boxes[i + 1:])
+
+    # The most frequent word is placed first, with the largest font
+    sizes = [size for size, _ in filter(None, placements)]
+    assert sizes[0] == max(sizes)
+
+
+def test_placement_is_deterministic():
+    assert place_words(WORDS, COUNTS) == place_words(WORDS, COUNTS)
+    assert render_wordcloud(WORDS, COUNTS).tobytes() == render_wordcloud(WORDS, COUNTS).tobytes()
+
+
+def test_empty_input():
+    assert place_words([], np.zeros(0)) == []
+    image = render_wordcloud([], np.zeros(0), width=100, height=40)
+    assert image.size == (100, 40)
+    assert len(image.getcolors()) == 1
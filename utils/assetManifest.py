@@ -0,0 +1,71 @@
+import os
+import re
+import pandas as pd
+
+from utils.imageVariants import IMAGE_EXTENSIONS
+from utils.keywordStore import ALL_TOPICS, TOPIC_FOLDER, YEARLY_FOLDER, keyword_manifest
+
+# Manifest of the word cloud images and keyword frequency files of the Keyword Analysis page.
+#
+# The folders are scanned once at startup. Every expected (topic, year) needs an image and a
+# frequency file, otherwise the app refuses to start, so a missing file cannot surface later as
+# an error in a callback.
+
+TOPIC_IMAGE_FOLDER = 'data/keyWordClouds/topicKeyWords'
+YEARLY_IMAGE_FOLDER = 'data/keyWordClouds/yearlyKeyWords'
+
+TOPIC_IMAGE_PATTERN = re.compile(r'youtube_keywords_(?P<topic>[a-z]+)_(?P<year>\d{4})(?P<extension>\.\w+)$')
+YEARLY_IMAGE_PATTERN = re.compile(r'youtube_keywords_(?P<year>\d{4})(?P<extension>\.\w+)$')
+
+
+def image_manifest(topic_folder=TOPIC_IMAGE_FOLDER, yearly_folder=YEARLY_IMAGE_FOLDER):
+    """
+    Scan the folders of the word cloud images.
+
+    :param topic_folder: Folder with the files 'youtube_keywords_{topic}_{year}.jpg'.
+    :type topic_folder: str
+    :param yearly_folder: Folder with the files 'youtube_keywords_{year}.jpg' covering all categories.
+    :type yearly_folder: str
+    :return: Maps every (topic, year) to the path of its image.
+    :rtype: dict
+    """
+    candidates = {}
+    for folder, pattern in ((topic_folder, TOPIC_IMAGE_PATTERN), (yearly_folder, YEARLY_IMAGE_PATTERN)):
+        for file_name in os.listdir(folder):
+            match = pattern.match(file_name)
+            if match and match['extension'].lower() in IMAGE_EXTENSIONS:
+                key = (match.groupdict().get('topic') or ALL_TOPICS, int(match['year']))
+                candidates.setdefault(key, []).append(os.path.join(folder, file_name))
+
+    return {key: min(paths, key=lambda path: IMAGE_EXTENSIONS.index(os.path.splitext(path)[1].lower()))
+            for key, paths in candidates.items()}
+
+
+def build_asset_manifest(topics, years):
+    """
+    Scan and validate all assets of the Keyword Analysis page.
+
+    :param topics: Expected topics in display order, including ALL_TOPICS.
+    :type topics: list
+    :param years: Expected years.
+    :type years: iterable
+    :return: DataFrame with the columns 'topic', 'year', 'image' and 'frequencies', one row per
+             (topic, year) in the order of `topics` and `years`.
+    :rtype: pandas.DataFrame
+    :raises ValueError: If an image or a frequency file is missing.
+    """
+    images = image_manifest()
+    frequencies = keyword_manifest(TOPIC_FOLDER, YEARLY_FOLDER)
+
+    rows = []
+    missing = []
+    for topic in topics:
+        for year in years:
+            key = (topic, year)
+            missing += [f'{kind} for {key}' for kind, manifest in (('image', images), ('frequencies', frequencies))
+                        if key not in manifest]
+            rows.append((topic, year, images.get(key), frequencies.get(key)))
+    if missing:
+        raise ValueError(f"Keyword Analysis assets missing: {', '.join(missing)}")
+
+    return pd.DataFrame(rows, columns=['topic', 'year', 'image', 'frequencies'])
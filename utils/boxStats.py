@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Precomputed boxplot statistics.
+#
+# Instead of sending every data point to the browser and letting Plotly compute the boxes, the
+# quartiles, whisker ends and outliers of every group are computed once on the server. A figure
+# then only needs a handful of numbers per box, plus a bounded sample of the outliers, no matter
+# how many videos the data contains.
+#
+# The quartiles use the same interpolation as Plotly's 'linear' quartile method (the 'hazen'
+# method of numpy.percentile), and the whiskers end at the last points within 1.5 IQR of the box,
+# so the boxes look exactly as if Plotly had computed them from the raw points.
+
+# Distance of the fences from the box in multiples of the interquartile range
+WHISKER_RANGE = 1.5
+
+# Maximum number of outliers kept per group; larger sets are thinned out evenly by rank, so the
+# most extreme points are always kept. The boxes and whiskers are computed from all points, and
+# 'outlier_count' holds the number before thinning, so figures can say how many are shown.
+MAX_OUTLIERS = 100
+
+
+def _quantile(sorted_values, q):
+    """
+    Quantile with Plotly's 'linear' interpolation.
+
+    :param sorted_values: The values, sorted ascending.
+    :type sorted_values: numpy.ndarray
+    :param q: The quantile between 0 and 1.
+    :type q: float
+    :return: The quantile.
+    :rtype: float
+    """
+    position = min(max(q * len(sorted_values) - 0.5, 0), len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return float(sorted_values[lower] + (position - lower) * (sorted_values[upper] - sorted_values[lower]))
+
+
+def _thin_out(values, limit):
+    if len(values) <= limit:
+        return values
+    return values[np.unique(np.linspace(0, len(values) - 1, limit).round().astype(int))]
+
+
+def box_statistics(df, group_column, value_column, order=None, max_outliers=MAX_OUTLIERS):
+    """
+    Compute the boxplot statistics of a column for every group.
+
+    :param df: The data.
+    :type df: pandas.DataFrame
+    :param group_column: Column with the group of every row, e.g. the video length bucket.
+    :type group_column: str
+    :param value_column: Column with the values of the boxes.
+    :type value_column: str
+    :param order: Groups in display order; defaults to the order of their first appearance.
+    :type order: list
+    :param max_outliers: Maximum number of outliers kept per group.
+    :type max_outliers: int
+    :return: DataFrame with one row per group that has values and the columns 'group', 'count',
+             'q1', 'median', 'q3', 'lowerfence', 'upperfence', 'outlier_count' and 'outliers'
+             (array of the kept outliers).
+    :rtype: pandas.DataFrame
+    """
+    values = df[value_column].to_numpy(dtype=np.float64)
+    groups = df[group_column].to_numpy()
+    valid = ~np.isnan(values)
+    if order is None:
+        order = list(pd.unique(groups))
+
+    rows = []
+    for group in order:
+        group_values = np.sort(values[valid & (groups == group)])
+        if len(group_values) == 0:
+            continue
+
+        q1, median, q3 = (_quantile(group_values, q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        # The whiskers end at the most extreme values within the fences
+        lower = np.searchsorted(group_values, q1 - WHISKER_RANGE * iqr, side='left')
+        upper = np.searchsorted(group_values, q3 + WHISKER_RANGE * iqr, side='right')
+        outliers = np.concatenate([group_values[:lower], group_values[upper:]])
+
+        rows.append({'group': group, 'count': len(group_values), 'q1': q1, 'median': median, 'q3': q3,
+                     'lowerfence': float(group_values[lower]), 'upperfence': float(group_values[upper - 1]),
+                     'outlier_count': len(outliers), 'outliers': _thin_out(outliers, max_outliers)})
+
+    return pd.DataFrame(rows, columns=['group', 'count', 'q1', 'median', 'q3', 'lowerfence', 'upperfence',
+                                       'outlier_count', 'outliers'])
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import functools
+
+from collections import OrderedDict
+
+from dash import no_update
+from plotly.io.json import to_json_plotly
+
+from utils.dataCache import CACHE_DIR
+from utils.datasetRegistry import registry
+
+# Memoization of Dash callbacks that are pure functions of their inputs and the datasets.
+#
+# Building a Plotly Express figure takes far longer than sending it: px validates every property
+# and the result is walked again by the JSON encoder on every response. Outputs are stored already
+# converted into plain JSON types (dicts, lists, strings and numbers), so a hit skips the
+# construction and the encoder only has to write out basic types.
+#
+# Outputs are keyed by (callback, inputs, dataset fingerprints, code version). A callback declares
+# the datasets it reads; their fingerprints identify the state of their source files, so they are
+# the same in all worker processes of a node, and a reload of changed data gives new keys for the
+# callbacks reading it only. The code version is APP_VERSION if set by the deployment, else a hash
+# of the Python sources of the app, so outputs stored on disk by a previous release are not served
+# after a deploy either.
+#
+# There are two tiers:
+#   memory  A bounded LRU per process.
+#   disk    A SQLite database in data/.cache shared by all workers, so an output computed by one
+#           worker is reused by the others. The least recently stored entries beyond
+#           CALLBACK_DISK_ENTRIES are removed from time to time. Outdated entries are never looked
+#           up again and age out; they are not deleted right away, because workers that have not
+#           reloaded yet, or still run the previous release, keep using theirs.
+#
+# Callbacks with a small, fully enumerable input domain declare it, and warm_callbacks() computes
+# their outputs in advance, so even the first visitors hit the cache.
+#
+# Callbacks that depend on more than their arguments, e.g. on dash.ctx.triggered_id, must not be
+# memoized. Outputs containing dash.no_update are passed through without caching.
+
+CALLBACK_CACHE_PATH = os.environ.get('CALLBACK_CACHE_PATH', os.path.join(CACHE_DIR, 'callbacks.sqlite'))
+# Entries of the in-process LRU
+CALLBACK_MEMORY_ENTRIES = int(os.environ.get('CALLBACK_MEMORY_ENTRIES', 256))
+# Entries kept in the shared database, 0 disables the disk tier
+CALLBACK_DISK_ENTRIES = int(os.environ.get('CALLBACK_DISK_ENTRIES', 5000))
+# Stores between two clean-ups of the database
+PRUNE_INTERVAL = 100
+# Root folder of the app, whose Python sources make up the code version
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MISSING = object()
+
+# Memoized functions and their input domains, see warm_callbacks()
+_domains = []
+
+
+def code_version(folder=APP_DIR):
+    """
+    Hash the Python sources of the app, skipping the data, the tests and hidden folders.
+
+    :param folder: Root folder of the app.
+    :type folder: str
+    :return: The hex digest of the sources.
+    :rtype: str
+    """
+    sha1 = hashlib.sha1()
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '__')) and d not in ('data', 'tests'))
+        for file in sorted(files):
+            if file.endswith('.py'):
+                path = os.path.join(root, file)
+                sha1.update(os.path.relpath(path, folder).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    sha1.update(f.read())
+    return sha1.hexdigest()
+
+
+CODE_VERSION = os.environ.get('APP_VERSION') or code_version()
+
+
+def plain_json(value):
+    """
+    Convert callback outputs like figures and Dash components into plain JSON types.
+    """
+    return json.loads(to_json_plotly(value))
+
+
+def _has_no_update(value):
+    return value is no_update or (isinstance(value, (list, tuple)) and any(item is no_update for item in value))
+
+
+class CallbackCache:
+    """
+    Two-tier cache of callback outputs with hit and miss counters per callback.
+    """
+
+    def __init__(self, path=CALLBACK_CACHE_PATH, memory_entries=CALLBACK_MEMORY_ENTRIES,
+                 disk_entries=CALLBACK_DISK_ENTRIES, version=CODE_VERSION):
+        """
+        :param path: Path of the shared SQLite database.
+        :type path: str
+        :param memory_entries: Maximum number of outputs kept in memory.
+        :type memory_entries: int
+        :param disk_entries: Maximum number of outputs kept in the database, 0 disables it.
+        :type disk_entries: int
+        :param version: Code version the outputs are computed with.
+        :type version: str
+        """
+        self.path = path
+        self.version = version
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stores = 0
+
+    def _connection(self):
+        # sqlite3 connections can neither be shared between threads nor survive a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS outputs (key TEXT PRIMARY KEY, stored REAL, value TEXT)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, callback_id, counter):
+        with self._lock:
+            stats = self._stats.setdefault(callback_id, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+            stats[counter] += 1
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load(self, key):
+        try:
+            row = self._connection().execute('SELECT value FROM outputs WHERE key = ?', (key,)).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Reading the callback cache '{self.path}' failed: {e}")
+            return _MISSING
+        return _MISSING if row is None else json.loads(row[0])
+
+    def _store(self, key, value):
+        try:
+            connection = self._connection()
+            connection.execute('INSERT OR REPLACE INTO outputs (key, stored, value) VALUES (?, ?, ?)',
+                               (key, time.time(), json.dumps(value)))
+            with self._lock:
+                self._stores += 1
+                prune = self._stores % PRUNE_INTERVAL == 0
+            if prune:
+                connection.execute('DELETE FROM outputs WHERE key NOT IN '
+                                   '(SELECT key FROM outputs ORDER BY stored DESC LIMIT ?)', (self.disk_entries,))
+        except (sqlite3.Error, OSError) as e:
+            print(f"Writing the callback cache '{self.path}' failed: {e}")
+
+    def call(self, callback_id, function, args, datasets=()):
+        """
+        Get the outputs of a callback, computing them if neither tier has them.
+
+        :param callback_id: Unique name of the callback.
+        :type callback_id: str
+        :param function: The callback function.
+        :type function: callable
+        :param args: The inputs and states of the callback.
+        :type args: tuple
+        :param datasets: Names of the registry datasets the callback reads.
+        :type datasets: iterable
+        :return: The outputs, in plain JSON types if they were cached.
+        """
+        fingerprint = registry.fingerprint(datasets)
+        key = hashlib.sha1(json.dumps([callback_id, args, fingerprint, self.version], sort_keys=True, default=str)
+                           .encode('utf-8')).hexdigest()
+
+        with self._lock:
+            value = self._memory.get(key, _MISSING)
+            if value is not _MISSING:
+                self._memory.move_to_end(key)
+        if value is not _MISSING:
+            self._count(callback_id, 'memory_hits')
+            return value
+
+        if self.disk_entries > 0:
+            value = self._load(key)
+            if value is not _MISSING:
+                self._count(callback_id, 'disk_hits')
+                self._remember(key, value)
+                return value
+
+        self._count(callback_id, 'misses')
+        value = function(*args)
+        if _has_no_update(value):
+            return value
+
+        value = plain_json(value)
+        # Outputs computed while their data was reloaded may mix old and new data and are not stored
+        if registry.fingerprint(datasets) == fingerprint:
+            self._remember(key, value)
+            if self.disk_entries > 0:
+                self._store(key, value)
+        return value
+
+    def stats(self):
+        """
+        Hit and miss counters of this process.
+
+        :return: Maps every callback to its counters 'memory_hits', 'disk_hits' and 'misses'.
+        :rtype: dict
+        """
+        with self._lock:
+            return {callback_id: dict(stats) for callback_id, stats in self._stats.items()}
+
+
+callback_cache = CallbackCache()
+
+
+def memoize(*datasets, domain=()):
+    """
+    Decorator memoizing a callback in the shared callback cache. Apply it below @callback, e.g.
+    @memoize('trends_cube').
+
+    :param datasets: Names of all registry datasets the callback reads. Changes to other datasets
+                     keep its outputs.
+    :type datasets: str
+    :param domain: All input combinations as tuples of arguments, computed by warm_callbacks().
+    :type domain: iterable
+    :return: The decorator.
+    :rtype: callable
+    """
+    if not datasets or not all(isinstance(name, str) for name in datasets):
+        raise TypeError('memoize() needs the names of the datasets the callback reads')
+
+    def decorator(function):
+        callback_id = f'{function.__module__}.{function.__qualname__}'
+
+        @functools.wraps(function)
+        def memoized(*args):
+            return callback_cache.call(callback_id, function, args, datasets)
+
+        if domain:
+            _domains.append((memoized, [tuple(args) for args in domain]))
+        return memoized
+
+    return decorator
+
+
+def warm_callbacks(background=True):
+    """
+    Compute the outputs of all memoized callbacks for every input combination of their domain.
+
+    :param background: If True, compute them in a background thread.
+    :type background: bool
+    """
+    def warm():
+        for memoized, domain in list(_domains):
+            try:
+                for args in domain:
+                    memoized(*args)
+            except Exception as e:
+                print(f'Warming the callback {memoized.__qualname__} failed: {e}')
+
+    if background:
+        threading.Thread(target=warm, name='callback-warmer', daemon=True).start()
+    else:
+        warm()
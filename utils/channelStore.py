@@ -0,0 +1,302 @@
+import os
+import copy
+import json
+import threading
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+
+from utils.dataCache import CACHE_DIR
+from utils.dataSchemas import COMMENT_DAYS, COMMENT_HOURS
+
+# Comment timing data of the channels on the Comment Behavior page.
+#
+# Every channel folder contains 'development.csv' with one row per day after the video release
+# and 'development_daily.csv' with one row per (day, hour). The hourly values are kept as dense
+# day x hour matrices, so the hours of a day are a single row of each matrix.
+#
+# Channels are discovered by scanning the comment directory. Only a small summary of the first
+# days of every channel stays in memory for the overall chart; it is stored in data/.cache and
+# only re-read for channels whose files changed. The full data of a channel is loaded on first
+# access and kept in an LRU cache limited by a memory budget.
+#
+# When files of some channels change, ChannelCatalog.updated() re-reads only these channels and
+# keeps the loaded data of all others.
+
+HOURS = 24
+
+# Days after the release covered by the summary of the overall chart
+SUMMARY_DAYS = 30
+SUMMARY_COLUMNS = ['Average per Video', 'Relative Probability (%)']
+SUMMARY_PATH = os.path.join(CACHE_DIR, 'comments_summary.json')
+
+# Memory budget of the loaded channels in megabytes
+CHANNEL_CACHE_MB = float(os.environ.get('CHANNEL_CACHE_MB', 64))
+
+# Columns of the hourly matrices; 'Relative Probability' is stored as 'Relative Probability (%)'
+# to match the column name of the daily series.
+HOURLY_COLUMNS = {'Count': 'Count', 'Average per Video': 'Average per Video',
+                  'Relative Probability (%)': 'Relative Probability'}
+
+
+class ChannelData:
+    """
+    Daily series and day x hour matrices of the comments of one channel.
+    """
+
+    def __init__(self, name, daily, first_day, hourly, present):
+        """
+        :param name: Name of the channel.
+        :type name: str
+        :param daily: One row per day after the release, with the columns 'Day', 'Count',
+                      'Average per Video' and 'Relative Probability (%)'.
+        :type daily: pandas.DataFrame
+        :param first_day: Day of the first row of the hourly matrices.
+        :type first_day: int
+        :param hourly: Maps the value columns to matrices of shape (days, 24).
+        :type hourly: dict
+        :param present: Boolean matrix of shape (days, 24), True for the hours with data.
+        :type present: numpy.ndarray
+        """
+        self.name = name
+        self.daily = daily
+        self.first_day = first_day
+        self.hourly = hourly
+        self.present = present
+        for matrix in list(hourly.values()) + [present]:
+            matrix.flags.writeable = False
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the data of the channel in bytes.
+        """
+        return (int(self.daily.memory_usage(deep=True).sum()) + self.present.nbytes
+                + sum(matrix.nbytes for matrix in self.hourly.values()))
+
+    @classmethod
+    def from_frames(cls, name, daily, hourly):
+        """
+        Build the channel data from the content of its two files.
+
+        :param name: Name of the channel.
+        :type name: str
+        :param daily: Content of 'development.csv'.
+        :type daily: pandas.DataFrame
+        :param hourly: Content of 'development_daily.csv'.
+        :type hourly: pandas.DataFrame
+        :return: The channel data.
+        :rtype: ChannelData
+        """
+        days = hourly['Day'].to_numpy(dtype=np.int64)
+        hours = hourly['Hour'].to_numpy(dtype=np.int64)
+        first_day = int(days.min()) if len(days) else 0
+        shape = (int(days.max()) - first_day + 1 if len(days) else 0, HOURS)
+
+        matrices = {}
+        for column, source in HOURLY_COLUMNS.items():
+            matrices[column] = np.zeros(shape, dtype=np.float64)
+            matrices[column][days - first_day, hours] = hourly[source].to_numpy(dtype=np.float64)
+        present = np.zeros(shape, dtype=bool)
+        present[days - first_day, hours] = True
+
+        return cls(name, daily, first_day, matrices, present)
+
+    def hours(self, day):
+        """
+        Hourly values of one day after the release.
+
+        :param day: The day, counted like the 'Day' column of 'development_daily.csv'.
+        :type day: int
+        :return: DataFrame with the columns 'Hour', 'Count', 'Average per Video' and
+                 'Relative Probability (%)' for the hours with data.
+        :rtype: pandas.DataFrame
+        """
+        row = day - self.first_day
+        if row < 0 or row >= len(self.present):
+            return pd.DataFrame(columns=['Hour'] + list(HOURLY_COLUMNS))
+
+        present = self.present[row]
+        data = {'Hour': np.flatnonzero(present)}
+        for column, matrix in self.hourly.items():
+            data[column] = matrix[row, present]
+        return pd.DataFrame(data)
+
+
+def load_channel(directory, channel):
+    """
+    Load the comment timing data of a channel.
+
+    :param directory: Directory with one folder per channel.
+    :type directory: str
+    :param channel: Name of the channel folder.
+    :type channel: str
+    :return: The channel data.
+    :rtype: ChannelData
+    """
+    folder = os.path.join(directory, channel)
+    return ChannelData.from_frames(channel,
+                                   COMMENT_DAYS.read(os.path.join(folder, 'development.csv')),
+                                   COMMENT_HOURS.read(os.path.join(folder, 'development_daily.csv')))
+
+
+def discover_channels(directory):
+    """
+    Find all channel folders that contain a 'development.csv'.
+
+    :param directory: Directory with one folder per channel.
+    :type directory: str
+    :return: Channel names, sorted alphabetically ignoring case.
+    :rtype: list
+    """
+    channels = [entry.name for entry in os.scandir(directory)
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'development.csv'))]
+    return sorted(channels, key=str.lower)
+
+
+def _channel_signature(directory, channel):
+    stat = os.stat(os.path.join(directory, channel, 'development.csv'))
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_summary(directory, channels, summary_path=SUMMARY_PATH, unchanged=()):
+    """
+    Load the first SUMMARY_DAYS days of the daily series of all channels.
+
+    The summary is kept in a file and only re-read for channels whose 'development.csv' changed.
+
+    :param directory: Directory with one folder per channel.
+    :type directory: str
+    :param channels: Names of the channel folders.
+    :type channels: list
+    :param summary_path: Path of the summary file.
+    :type summary_path: str
+    :param unchanged: Channels known not to have changed since the summary file was written; their
+                      files are not checked.
+    :type unchanged: set
+    :return: Array of shape (channels, SUMMARY_DAYS, len(SUMMARY_COLUMNS)), NaN for missing days.
+    :rtype: numpy.ndarray
+    """
+    try:
+        with open(summary_path, encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+
+    summary = np.full((len(channels), SUMMARY_DAYS, len(SUMMARY_COLUMNS)), np.nan)
+    entries = {}
+    for i, channel in enumerate(channels):
+        entry = stored.get(channel)
+        signature = None if entry is not None and channel in unchanged else _channel_signature(directory, channel)
+        if entry is None or (signature is not None and entry['signature'] != signature):
+            daily = COMMENT_DAYS.read(os.path.join(directory, channel, 'development.csv'))
+            daily = daily[(daily['Day'] >= 1) & (daily['Day'] <= SUMMARY_DAYS)]
+            values = np.full((SUMMARY_DAYS, len(SUMMARY_COLUMNS)), np.nan)
+            values[daily['Day'].to_numpy(dtype=np.int64) - 1] = daily[SUMMARY_COLUMNS].to_numpy(dtype=np.float64)
+            # NaN is not valid JSON, missing days are stored as null
+            entry = {'signature': signature,
+                     'values': [[None if np.isnan(value) else value for value in day] for day in values.tolist()]}
+        entries[channel] = entry
+        summary[i] = np.array(entry['values'], dtype=np.float64)
+
+    if entries != stored:
+        try:
+            os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+            tmp_path = f'{summary_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, summary_path)
+        except OSError as e:
+            print(f"Could not write channel summary '{summary_path}': {e}")
+    return summary
+
+
+class ChannelCatalog:
+    """
+    All channels of the comment directory, with their full data loaded on demand.
+    """
+
+    def __init__(self, directory, budget_mb=CHANNEL_CACHE_MB, summary_path=SUMMARY_PATH):
+        """
+        :param directory: Directory with one folder per channel.
+        :type directory: str
+        :param budget_mb: Memory budget in megabytes for the loaded channels. The most recently
+                          used channel is always kept, even if it exceeds the budget alone.
+        :type budget_mb: float
+        :param summary_path: Path of the summary file.
+        :type summary_path: str
+        """
+        self.directory = directory
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.summary_path = summary_path
+        self.channels = discover_channels(directory)
+        self.summary = load_summary(directory, self.channels, summary_path)
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def updated(self, changed_paths):
+        """
+        Bring the catalog up to date after some files changed, re-reading only the affected channels.
+
+        The catalog itself is not modified, callbacks may still be reading it.
+
+        :param changed_paths: Paths of the added, removed or modified files below the directory.
+        :type changed_paths: list
+        :return: A new catalog sharing the loaded data of the unchanged channels.
+        :rtype: ChannelCatalog
+        """
+        changed = {os.path.relpath(path, self.directory).split(os.sep)[0] for path in changed_paths}
+        present = {channel for channel in changed
+                   if os.path.exists(os.path.join(self.directory, channel, 'development.csv'))}
+
+        catalog = copy.copy(self)
+        catalog.channels = sorted((set(self.channels) - changed) | present, key=str.lower)
+        catalog.summary = load_summary(self.directory, catalog.channels, self.summary_path,
+                                       unchanged=set(self.channels) - changed)
+        with self._lock:
+            catalog._loaded = OrderedDict((channel, data) for channel, data in self._loaded.items()
+                                          if channel not in changed)
+        catalog._lock = threading.Lock()
+        return catalog
+
+    def overall(self):
+        """
+        Average the first SUMMARY_DAYS days of all channels over the channels.
+
+        :return: DataFrame with the columns 'Day', 'Average per Video', 'Relative Probability (%)'
+                 and 'Channel' for the days with data of at least one channel.
+        :rtype: pandas.DataFrame
+        """
+        counted = (~np.isnan(self.summary)).sum(axis=0)
+        average = np.nansum(self.summary, axis=0) / np.maximum(counted, 1)
+        days = np.flatnonzero(counted[:, 0] > 0)
+        average_overall = pd.DataFrame(average[days], columns=SUMMARY_COLUMNS)
+        average_overall.insert(0, 'Day', days + 1)
+        average_overall['Channel'] = 'Overall'
+        return average_overall
+
+    def get(self, channel):
+        """
+        Get the data of a channel, loading it on first access.
+
+        :param channel: Name of the channel.
+        :type channel: str
+        :return: The channel data.
+        :rtype: ChannelData
+        :raises KeyError: If the channel is not part of the catalog.
+        """
+        with self._lock:
+            if channel in self._loaded:
+                self._loaded.move_to_end(channel)
+                return self._loaded[channel]
+        if channel not in self.channels:
+            raise KeyError(channel)
+
+        channel_data = load_channel(self.directory, channel)
+        with self._lock:
+            self._loaded[channel] = channel_data
+            self._loaded.move_to_end(channel)
+            while len(self._loaded) > 1 and sum(data.nbytes for data in self._loaded.values()) > self.budget:
+                self._loaded.popitem(last=False)
+        return channel_data
@@ -0,0 +1,242 @@
+import re
+import numpy as np
+
+from functools import lru_cache
+
+# Full-text search over the Covid comments.
+#
+# The index maps every token to the sorted list of rows it occurs in. The lists are stored
+# delta-encoded as variable-length integers (7 bits per byte, the high bit marks a continuation)
+# in one shared byte array, which keeps the index a fraction of the size of the texts. Lists are
+# decoded with numpy only for the tokens of a query and intersected starting with the shortest.
+
+TOKEN_PATTERN = re.compile(r'\w+')
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text):
+    """
+    Split a text into lowercase word tokens.
+
+    :param text: The text.
+    :type text: str
+    :return: List of tokens in order of occurrence.
+    :rtype: list
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_query(query):
+    """
+    Normalize a search query into its words and quoted phrases.
+
+    :param query: The query, e.g. 'vaccine "second dose"'.
+    :type query: str
+    :return: Tuple of (sorted words, sorted phrases), phrases being tuples of tokens. None if the
+             query contains no tokens.
+    :rtype: tuple
+    """
+    if not query:
+        return None
+    words = set(tokenize(PHRASE_PATTERN.sub(' ', query)))
+    phrases = set()
+    for phrase in PHRASE_PATTERN.findall(query):
+        tokens = tuple(tokenize(phrase))
+        if len(tokens) == 1:
+            # A phrase of one word is just a word
+            words.add(tokens[0])
+        elif tokens:
+            phrases.add(tokens)
+    if not words and not phrases:
+        return None
+    return tuple(sorted(words)), tuple(sorted(phrases))
+
+
+def _encode_varints(values):
+    """
+    Encode non-negative integers as concatenated variable-length integers.
+
+    :param values: The integers.
+    :type values: numpy.ndarray
+    :return: Tuple of (bytes, number of bytes per value).
+    :rtype: tuple
+    """
+    values = values.astype(np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    remaining = values >> np.uint64(7)
+    while remaining.any():
+        lengths += remaining > 0
+        remaining >>= np.uint64(7)
+
+    starts = np.cumsum(lengths) - lengths
+    value_of_byte = np.repeat(np.arange(len(values)), lengths)
+    position = np.arange(lengths.sum()) - starts[value_of_byte]
+    data = (values[value_of_byte] >> (np.uint64(7) * position.astype(np.uint64))) & np.uint64(0x7f)
+    data |= np.where(position < lengths[value_of_byte] - 1, 0x80, 0).astype(np.uint64)
+    return data.astype(np.uint8), lengths
+
+
+def _decode_varints(data):
+    """
+    Decode concatenated variable-length integers.
+
+    :param data: The encoded bytes.
+    :type data: numpy.ndarray
+    :return: The integers.
+    :rtype: numpy.ndarray
+    """
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.int64)
+    last = data < 0x80
+    ends = np.flatnonzero(last)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    value_of_byte = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    position = np.arange(len(data)) - starts[value_of_byte]
+    parts = (data & 0x7f).astype(np.int64) << (7 * position)
+    return np.add.reduceat(parts, starts)
+
+
+class InvertedIndex:
+    """
+    Token to row postings for a list of texts, with compressed posting lists.
+    """
+
+    def __init__(self, tokens, starts, data, counts):
+        """
+        :param tokens: Maps every token to its position in `starts` and `counts`.
+        :type tokens: dict
+        :param starts: Byte offset of every posting list in `data` (length tokens + 1).
+        :type starts: numpy.ndarray
+        :param data: The varint encoded, delta encoded posting lists.
+        :type data: numpy.ndarray
+        :param counts: Number of rows per token.
+        :type counts: numpy.ndarray
+        """
+        self.tokens = tokens
+        self.starts = starts
+        self.data = data
+        self.counts = counts
+
+    @classmethod
+    def build(cls, texts):
+        """
+        Build the index.
+
+        :param texts: The texts; the position of a text is its row number.
+        :type texts: iterable
+        :return: The index.
+        :rtype: InvertedIndex
+        """
+        tokens = {}
+        token_ids = []
+        rows = []
+        for row, text in enumerate(texts):
+            for token in set(tokenize(text)):
+                token_ids.append(tokens.setdefault(token, len(tokens)))
+                rows.append(row)
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+
+        # Group the rows by token; the stable sort keeps the rows of a token in ascending order
+        order = np.argsort(token_ids, kind='stable')
+        token_ids, rows = token_ids[order], rows[order]
+        counts = np.bincount(token_ids, minlength=len(tokens))
+        first = np.r_[True, token_ids[1:] != token_ids[:-1]] if len(rows) else np.zeros(0, dtype=bool)
+        deltas = np.where(first, rows, rows - np.r_[0, rows[:-1]])
+
+        data, lengths = _encode_varints(deltas)
+        bytes_per_token = np.bincount(token_ids, weights=lengths, minlength=len(tokens)).astype(np.int64)
+        starts = np.zeros(len(tokens) + 1, dtype=np.int64)
+        np.cumsum(bytes_per_token, out=starts[1:])
+        return cls(tokens, starts, data, counts)
+
+    def postings(self, token):
+        """
+        Rows containing a token.
+
+        :param token: The token, already normalized by tokenize().
+        :type token: str
+        :return: Sorted array of row numbers.
+        :rtype: numpy.ndarray
+        """
+        token_id = self.tokens.get(token)
+        if token_id is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.cumsum(_decode_varints(self.data[self.starts[token_id]:self.starts[token_id + 1]]))
+
+    def intersect(self, tokens):
+        """
+        Rows containing all tokens.
+
+        :param tokens: The tokens.
+        :type tokens: iterable
+        :return: Sorted array of row numbers.
+        :rtype: numpy.ndarray
+        """
+        tokens = set(tokens)
+        if any(token not in self.tokens for token in tokens):
+            return np.zeros(0, dtype=np.int64)
+        # Start with the rarest token, so every intersection works on the smallest possible set
+        rows = None
+        for token in sorted(tokens, key=lambda token: self.counts[self.tokens[token]]):
+            postings = self.postings(token)
+            rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+            if len(rows) == 0:
+                break
+        return rows
+
+
+class CommentSearch:
+    """
+    Search over a list of texts by words and quoted phrases, with results cached by normalized query.
+    """
+
+    def __init__(self, texts, cache_size=256):
+        """
+        :param texts: Indexable texts, e.g. a CommentTextStore; used to build the index and to verify phrases.
+        :param cache_size: Number of queries whose results are kept.
+        :type cache_size: int
+        """
+        self.texts = texts
+        self.index = InvertedIndex.build(texts[row] for row in range(len(texts)))
+        self._search = lru_cache(maxsize=cache_size)(self._find)
+
+    def search(self, query):
+        """
+        Rows that contain all words and phrases of a query.
+
+        :param query: The query; phrases are written in double quotes.
+        :type query: str
+        :return: Sorted array of row numbers, None if the query is empty.
+        :rtype: numpy.ndarray
+        """
+        normalized = normalize_query(query)
+        if normalized is None:
+            return None
+        return self._search(normalized)
+
+    def search_normalized(self, normalized):
+        """
+        Same as search(), for a query already normalized by normalize_query().
+
+        :param normalized: The normalized query.
+        :type normalized: tuple
+        :return: Sorted array of row numbers.
+        :rtype: numpy.ndarray
+        """
+        return self._search(normalized)
+
+    def _find(self, normalized):
+        words, phrases = normalized
+        rows = self.index.intersect(set(words).union(*phrases))
+        # The index only knows that all tokens of a phrase occur, check their order in the texts
+        if phrases and len(rows):
+            rows = rows[np.array([all(_contains_phrase(tokenize(self.texts[row]), phrase) for phrase in phrases)
+                                  for row in rows], dtype=bool)]
+        rows.flags.writeable = False
+        return rows
+
+
+def _contains_phrase(tokens, phrase):
+    size = len(phrase)
+    return any(tuple(tokens[i:i + size]) == phrase for i in range(len(tokens) - size + 1))
@@ -0,0 +1,211 @@
+import os
+import json
+import numpy as np
+
+from functools import lru_cache
+
+from utils.commentIndex import CommentSearch, normalize_query
+from utils.dataCache import CACHE_DIR
+from utils.dataSchemas import COVID_COMMENTS
+from utils.emotionCube import EmotionCube
+
+# Storage for the Covid comments that keeps the comment bodies out of the Python heap.
+#
+# The bodies are written once into a side file of concatenated UTF-8 text plus an array of
+# byte offsets per row. The file is memory-mapped, so all workers share the same pages of the
+# OS page cache and a comment is only decoded when it is displayed. The in-memory part of the
+# corpus only consists of the categorical 'year', 'query' and 'emotion' columns.
+
+
+class CommentTextStore:
+    """
+    Read-only, memory-mapped list of comment bodies indexed by row.
+    """
+
+    def __init__(self, text_path, offsets_path):
+        """
+        :param text_path: Path to the file with the concatenated UTF-8 encoded comments.
+        :type text_path: str
+        :param offsets_path: Path to the .npy file with the byte offsets of the rows (length rows + 1).
+        :type offsets_path: str
+        """
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        if self.offsets[-1] > 0:
+            self._buffer = np.memmap(text_path, dtype=np.uint8, mode='r')
+        else:
+            self._buffer = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self._buffer[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def get(self, rows):
+        """
+        Decode the comments of several rows.
+
+        :param rows: Row numbers.
+        :type rows: iterable
+        :return: List of comments.
+        :rtype: list
+        """
+        return [self[row] for row in rows]
+
+    @staticmethod
+    def build(texts, text_path, offsets_path):
+        """
+        Write comments into a text file and an offsets file.
+
+        :param texts: The comments, missing values are stored as empty strings.
+        :type texts: iterable
+        :param text_path: Path to the text file.
+        :type text_path: str
+        :param offsets_path: Path to the .npy offsets file.
+        :type offsets_path: str
+        """
+        encoded = [text.encode('utf-8') if isinstance(text, str) else b'' for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+
+        os.makedirs(os.path.dirname(text_path), exist_ok=True)
+        tmp_suffix = f'.{os.getpid()}.tmp'
+        with open(text_path + tmp_suffix, 'wb') as f:
+            f.write(b''.join(encoded))
+        with open(offsets_path + tmp_suffix, 'wb') as f:
+            np.save(f, offsets)
+        os.replace(text_path + tmp_suffix, text_path)
+        os.replace(offsets_path + tmp_suffix, offsets_path)
+
+
+class CommentCorpus:
+    """
+    The Covid comments: compact categorical columns in memory, the bodies in a memory-mapped store.
+
+    Rows are additionally indexed by (year, query, emotion), so the rows behind any bar of the
+    charts can be found without scanning the columns, and by the words of their texts for the search.
+    """
+
+    def __init__(self, frame, texts):
+        """
+        :param frame: Frame with the categorical columns 'year', 'query' and 'emotion'.
+        :type frame: pandas.DataFrame
+        :param texts: Comment bodies in the same row order as the frame.
+        :type texts: CommentTextStore
+        """
+        self.frame = frame
+        self.texts = texts
+
+        year_codes = frame['year'].cat.codes.to_numpy()
+        query_codes = frame['query'].cat.codes.to_numpy()
+        emotion_codes = frame['emotion'].cat.codes.to_numpy()
+        self._codes = year_codes, query_codes, emotion_codes
+        self.cube = EmotionCube.from_codes(year_codes, query_codes, emotion_codes,
+                                           frame['year'].cat.categories, frame['query'].cat.categories,
+                                           frame['emotion'].cat.categories)
+        self.search = CommentSearch(texts)
+        self._search_cube = lru_cache(maxsize=64)(self._cube_for_query)
+
+        # Rows sorted by their (year, query, emotion) cell; comments without emotion are not indexed.
+        self._shape = (len(self.cube.years), len(self.cube.queries), len(self.cube.emotions))
+        valid = np.flatnonzero(emotion_codes >= 0)
+        cells = np.ravel_multi_index((year_codes[valid], query_codes[valid], emotion_codes[valid]), self._shape)
+        order = np.argsort(cells, kind='stable')
+        self._rows = valid[order]
+        self._cell_starts = np.searchsorted(cells[order], np.arange(np.prod(self._shape) + 1))
+
+    def emotion_cube(self, search=None):
+        """
+        Emotion counts of the comments matching a search.
+
+        :param search: Words and quoted phrases the comments must contain, None or empty for all comments.
+        :type search: str
+        :return: The counts; the cube of all comments if there is no search.
+        :rtype: EmotionCube
+        """
+        normalized = normalize_query(search)
+        if normalized is None:
+            return self.cube
+        return self._search_cube(normalized)
+
+    def _cube_for_query(self, normalized):
+        rows = self.search.search_normalized(normalized)
+        year_codes, query_codes, emotion_codes = (codes[rows] for codes in self._codes)
+        return EmotionCube.from_codes(year_codes, query_codes, emotion_codes,
+                                      self.cube.years, self.cube.queries, self.cube.emotions)
+
+    def rows(self, year=None, query=None, emotion=None, search=None):
+        """
+        Row numbers of the comments matching a selection.
+
+        :param year: The year, None for all years.
+        :type year: int
+        :param query: The query, None for all queries.
+        :type query: str
+        :param emotion: The emotion, None for all emotions.
+        :type emotion: str
+        :param search: Words and quoted phrases the comments must contain, None or empty for all comments.
+        :type search: str
+        :return: Sorted array of row numbers.
+        :rtype: numpy.ndarray
+        """
+        positions = []
+        for value, axis in ((year, self.cube.years), (query, self.cube.queries), (emotion, self.cube.emotions)):
+            if value is None:
+                positions.append(range(len(axis)))
+            elif value in axis:
+                positions.append([axis.index(value)])
+            else:
+                return np.zeros(0, dtype=np.int64)
+
+        cells = np.ravel_multi_index(np.ix_(*positions), self._shape).ravel()
+        parts = [self._rows[self._cell_starts[cell]:self._cell_starts[cell + 1]] for cell in cells]
+        rows = np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+        matches = self.search.search(search)
+        if matches is not None:
+            rows = np.intersect1d(rows, matches, assume_unique=True)
+        return rows
+
+
+def load_comment_corpus(path):
+    """
+    Load the comment corpus, rebuilding the text store if the source file changed.
+
+    :param path: Path to the comments CSV with the columns 'year', 'query', 'text' and 'emotion'.
+    :type path: str
+    :return: The corpus.
+    :rtype: CommentCorpus
+    """
+    # The source is checked before it is read, so a change during the reads is never recorded as read
+    stat = os.stat(path)
+    source = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+    frame = COVID_COMMENTS.read(path)
+    frame = frame.astype({'year': 'category', 'query': 'category', 'emotion': 'category'})
+    source['rows'] = len(frame)
+
+    base = os.path.join(CACHE_DIR, os.path.relpath(os.path.normpath(path), 'data'))
+    text_path, offsets_path, meta_path = base + '.text', base + '.offsets.npy', base + '.text.json'
+
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            fresh = json.load(f) == source
+    except (OSError, ValueError):
+        fresh = False
+
+    if not fresh:
+        texts = COVID_COMMENTS.parse(path, usecols=['text'])['text']
+        CommentTextStore.build(texts, text_path, offsets_path)
+        stat = os.stat(path)
+        # The meta file is replaced last, after the store it describes is complete
+        if (stat.st_mtime_ns, stat.st_size, len(texts)) == (source['mtime_ns'], source['size'], source['rows']):
+            tmp_path = f'{meta_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(source, f)
+            os.replace(tmp_path, meta_path)
+
+    texts = CommentTextStore(text_path, offsets_path)
+    if len(texts) != len(frame):
+        raise ValueError(f"'{path}' changed while it was read, {len(texts)} comments for {len(frame)} rows")
+    return CommentCorpus(frame, texts)
@@ -0,0 +1,206 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+from utils.dataSchemas import COMMENT_HOURS, COMMENT_IDS, COMMENT_VIDEOS
+
+# Builds the comment timing aggregates of a channel from raw comment timestamps.
+#
+# The input are records of (comment, video, video published_at, comment published_at). Every
+# comment is binned by the hours elapsed since the release of its video:
+#   development_daily.csv  Day (0 = first 24 hours), Hour (0-23 within that day), Count,
+#                          Average per Video, Relative Probability (share of all comments)
+#   development.csv        Day (1 = first 24 hours), Count, Average per Video,
+#                          Relative Probability (%) (share of all comments in percent)
+# Only days and hours with comments are written.
+#
+# Updates are incremental: the counts are read back from the existing development_daily.csv and
+# the known videos from 'videos.csv' in the channel folder, so new comments are added without the
+# history. Records are processed in chunks, e.g. from pandas.read_csv(..., chunksize=...).
+#
+# The identifiers of the counted comments are kept in 'comment_ids.csv', so comments that are added
+# again, e.g. from overlapping exports, are counted only once. Comments counted before this ledger
+# existed are not known by identifier and cannot be recognized.
+#
+# Update a channel from the command line with:
+#   python -m utils.commentTiming data/comments/ColdFusion new_comments.csv
+
+HOURS = 24
+VIDEO_LEDGER = 'videos.csv'
+COMMENT_LEDGER = 'comment_ids.csv'
+# Ledger entry of a video counted before the ledger existed
+UNKNOWN_VIDEO = 'unknown-'
+
+COMMENT_COLUMN = 'comment_id'
+VIDEO_COLUMN = 'video_id'
+VIDEO_PUBLISHED_COLUMN = 'video_published_at'
+COMMENT_PUBLISHED_COLUMN = 'comment_published_at'
+
+
+class CommentTiming:
+    """
+    Comment counts per (day, hour) after the release of the videos of one channel.
+    """
+
+    def __init__(self, counts=None, videos=(), base_videos=0, comments=()):
+        """
+        :param counts: Counts of shape (days, 24).
+        :type counts: numpy.ndarray
+        :param videos: Identifiers of the videos counted so far.
+        :type videos: iterable
+        :param base_videos: Number of videos counted without a known identifier.
+        :type base_videos: int
+        :param comments: Identifiers of the comments counted so far.
+        :type comments: iterable
+        """
+        self.counts = np.zeros((0, HOURS), dtype=np.int64) if counts is None else counts
+        self.videos = set(videos)
+        self.base_videos = base_videos
+        self.comments = set(comments)
+
+    @property
+    def video_count(self):
+        return self.base_videos + len(self.videos)
+
+    @classmethod
+    def load(cls, folder):
+        """
+        Read the aggregates and the video ledger of a channel folder.
+
+        If the aggregates exist without a ledger, the number of videos is derived from the
+        'Average per Video' column and all videos of later records are treated as new. These
+        videos are written to the ledger as placeholders without identifier.
+
+        :param folder: The channel folder.
+        :type folder: str
+        :return: The timing data, empty if the folder has no aggregates yet.
+        :rtype: CommentTiming
+        """
+        daily_path = os.path.join(folder, 'development_daily.csv')
+        ledger_path = os.path.join(folder, VIDEO_LEDGER)
+        comments_path = os.path.join(folder, COMMENT_LEDGER)
+        if not os.path.exists(daily_path):
+            return cls()
+
+        daily = COMMENT_HOURS.parse(daily_path)
+        days = daily['Day'].to_numpy(dtype=np.int64)
+        counts = np.zeros((int(days.max()) + 1 if len(days) else 0, HOURS), dtype=np.int64)
+        counts[days, daily['Hour'].to_numpy(dtype=np.int64)] = daily['Count'].to_numpy(dtype=np.int64)
+
+        comments = COMMENT_IDS.parse(comments_path)['Comment'] if os.path.exists(comments_path) else ()
+        if os.path.exists(ledger_path):
+            return cls(counts, COMMENT_VIDEOS.parse(ledger_path)['Video'], comments=comments)
+        base_videos = int(round(daily['Count'].iloc[0] / daily['Average per Video'].iloc[0])) if len(daily) else 0
+        return cls(counts, base_videos=base_videos, comments=comments)
+
+    def add(self, records):
+        """
+        Add comments to the counts.
+
+        :param records: Comments with the columns COMMENT_COLUMN, VIDEO_COLUMN, VIDEO_PUBLISHED_COLUMN and
+                        COMMENT_PUBLISHED_COLUMN. Comments published before their video and comments
+                        that were counted already are ignored.
+        :type records: pandas.DataFrame
+        """
+        comment_ids = records[COMMENT_COLUMN].astype(str)
+        records = records[~comment_ids.duplicated() & ~comment_ids.isin(self.comments)]
+        self.comments.update(comment_ids)
+
+        video_published = pd.to_datetime(records[VIDEO_PUBLISHED_COLUMN], utc=True)
+        comment_published = pd.to_datetime(records[COMMENT_PUBLISHED_COLUMN], utc=True)
+        elapsed = ((comment_published - video_published) // pd.Timedelta(hours=1)).to_numpy()
+        elapsed = elapsed[elapsed >= 0].astype(np.int64)
+
+        if len(elapsed):
+            added = np.bincount(elapsed, minlength=HOURS * -(-(int(elapsed.max()) + 1) // HOURS))
+            added = added.reshape(-1, HOURS)
+            if len(added) > len(self.counts):
+                self.counts = np.vstack([self.counts, np.zeros((len(added) - len(self.counts), HOURS), dtype=np.int64)])
+            self.counts[:len(added)] += added
+        self.videos.update(records[VIDEO_COLUMN].astype(str))
+
+    def development(self):
+        """
+        :return: The content of 'development.csv'.
+        :rtype: pandas.DataFrame
+        """
+        per_day = self.counts.sum(axis=1)
+        days = np.flatnonzero(per_day)
+        return pd.DataFrame({
+            'Day': days + 1,
+            'Count': per_day[days],
+            'Average per Video': per_day[days] / max(self.video_count, 1),
+            'Relative Probability (%)': per_day[days] / max(per_day.sum(), 1) * 100,
+        })
+
+    def development_daily(self):
+        """
+        :return: The content of 'development_daily.csv'.
+        :rtype: pandas.DataFrame
+        """
+        days, hours = np.nonzero(self.counts)
+        counts = self.counts[days, hours]
+        return pd.DataFrame({
+            'Day': days,
+            'Hour': hours,
+            'Count': counts,
+            'Average per Video': counts / max(self.video_count, 1),
+            'Relative Probability': counts / max(self.counts.sum(), 1),
+        })
+
+    def save(self, folder):
+        """
+        Write the aggregates and the video ledger into a channel folder.
+
+        :param folder: The channel folder.
+        :type folder: str
+        """
+        os.makedirs(folder, exist_ok=True)
+        files = [('development_daily.csv', self.development_daily()),
+                 ('development.csv', self.development())]
+        if self.video_count:
+            placeholders = [f'{UNKNOWN_VIDEO}{i}' for i in range(self.base_videos)]
+            files.append((VIDEO_LEDGER, pd.DataFrame({'Video': placeholders + sorted(self.videos)})))
+        if self.comments:
+            files.append((COMMENT_LEDGER, pd.DataFrame({'Comment': sorted(self.comments)})))
+        for file_name, df in files:
+            path = os.path.join(folder, file_name)
+            # Write to a temporary file first, so the app never reads a half-written file.
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            df.to_csv(tmp_path, index=False, lineterminator='\n')
+            os.replace(tmp_path, path)
+
+
+def update_channel(folder, chunks):
+    """
+    Add raw comment records to the aggregates of a channel.
+
+    :param folder: The channel folder, e.g. 'data/comments/ColdFusion'.
+    :type folder: str
+    :param chunks: Iterable of DataFrames with the columns COMMENT_COLUMN, VIDEO_COLUMN,
+                   VIDEO_PUBLISHED_COLUMN and COMMENT_PUBLISHED_COLUMN.
+    :type chunks: iterable
+    :return: The updated timing data.
+    :rtype: CommentTiming
+    """
+    timing = CommentTiming.load(folder)
+    for chunk in chunks:
+        timing.add(chunk)
+    timing.save(folder)
+    return timing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Add raw comment timestamps to the aggregates of a channel.')
+    parser.add_argument('folder', help='channel folder, e.g. data/comments/ColdFusion')
+    parser.add_argument('records', nargs='+',
+                        help=f"CSV files with the columns '{COMMENT_COLUMN}', '{VIDEO_COLUMN}', "
+                             f"'{VIDEO_PUBLISHED_COLUMN}' and '{COMMENT_PUBLISHED_COLUMN}'")
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help='rows read at once')
+    args = parser.parse_args()
+
+    columns = [COMMENT_COLUMN, VIDEO_COLUMN, VIDEO_PUBLISHED_COLUMN, COMMENT_PUBLISHED_COLUMN]
+    result = update_channel(args.folder, (chunk for path in args.records
+                                          for chunk in pd.read_csv(path, usecols=columns, chunksize=args.chunksize)))
+    print(f'{args.folder}: {int(result.counts.sum())} comments on {result.video_count} videos')
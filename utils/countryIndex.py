@@ -0,0 +1,141 @@
+import json
+import math
+import pandas as pd
+
+from utils.dataSchemas import COUNTRY_CENTROIDS
+
+# Offline index of country centroids and bounding boxes used to centre the Trends map.
+# The index is built once from the bundled GeoJSON (plus a small table for the countries
+# outside of Europe) and shipped as a CSV, so no geocoding request is sent at runtime.
+#
+# Rebuild it with:  python -m utils.countryIndex
+
+GEOJSON_PATH = 'data/europe.geojson'
+INDEX_PATH = 'data/countryCentroids.csv'
+
+COLUMNS = ['ISO2', 'Name', 'Lat', 'Lon', 'MinLat', 'MinLon', 'MaxLat', 'MaxLon']
+
+# Countries of the Trends page that are not part of europe.geojson.
+# Centroid and bounding box refer to the mainland (contiguous states for the USA).
+NON_EUROPEAN_COUNTRIES = [
+    # ISO2, Name, Lat, Lon, MinLat, MinLon, MaxLat, MaxLon
+    ('AU', 'Australia', -25.73, 134.49, -39.14, 113.34, -10.67, 153.57),
+    ('BR', 'Brazil', -10.79, -53.10, -33.75, -73.99, 5.27, -34.73),
+    ('CA', 'Canada', 61.36, -98.31, 41.68, -141.00, 83.11, -52.62),
+    ('IN', 'India', 22.89, 79.61, 6.75, 68.18, 35.50, 97.40),
+    ('JP', 'Japan', 36.20, 138.25, 31.03, 129.41, 45.55, 145.54),
+    ('NG', 'Nigeria', 9.59, 8.09, 4.24, 2.69, 13.87, 14.58),
+    ('US', 'USA', 39.83, -98.58, 24.52, -124.73, 49.38, -66.95),
+]
+
+
+def _ring_centroid(ring):
+    """
+    Compute the signed area and the centroid of a closed polygon ring (shoelace formula).
+
+    :param ring: List of [lon, lat] coordinates.
+    :type ring: list
+    :return: Tuple of (area, lon, lat).
+    :rtype: tuple
+    """
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    area /= 2
+    if area == 0:
+        return 0.0, ring[0][0], ring[0][1]
+    return area, cx / (6 * area), cy / (6 * area)
+
+
+def _feature_location(feature):
+    """
+    Compute centroid and bounding box of the largest polygon of a GeoJSON feature.
+
+    Using the largest polygon keeps overseas territories and small islands from pulling
+    the map away from the mainland.
+
+    :param feature: GeoJSON feature with a Polygon or MultiPolygon geometry.
+    :type feature: dict
+    :return: Tuple of (lat, lon, min_lat, min_lon, max_lat, max_lon).
+    :rtype: tuple
+    """
+    geometry = feature['geometry']
+    polygons = geometry['coordinates']
+    if geometry['type'] == 'Polygon':
+        polygons = [polygons]
+
+    best = None
+    for polygon in polygons:
+        area, lon, lat = _ring_centroid(polygon[0])
+        if best is None or abs(area) > abs(best[0]):
+            best = (area, lon, lat, polygon[0])
+
+    _, lon, lat, ring = best
+    lons = [point[0] for point in ring]
+    lats = [point[1] for point in ring]
+    return lat, lon, min(lats), min(lons), max(lats), max(lons)
+
+
+def build_country_index(geojson_path=GEOJSON_PATH, index_path=INDEX_PATH):
+    """
+    Build the country index from the GeoJSON file and the non-European table and save it as CSV.
+
+    :param geojson_path: Path to the GeoJSON file with the European countries.
+    :type geojson_path: str
+    :param index_path: Path the index CSV is written to.
+    :type index_path: str
+    :return: DataFrame with one row per country.
+    :rtype: pandas.DataFrame
+    """
+    with open(geojson_path, encoding='utf-8') as f:
+        geojson_data = json.load(f)
+
+    rows = []
+    for feature in geojson_data['features']:
+        properties = feature['properties']
+        rows.append((properties['ISO2'], properties['NAME']) + _feature_location(feature))
+    rows.extend(NON_EUROPEAN_COUNTRIES)
+
+    index_df = pd.DataFrame(rows, columns=COLUMNS).sort_values('ISO2')
+    index_df = index_df.round({column: 4 for column in COLUMNS[2:]})
+    index_df.to_csv(index_path, index=False)
+    return index_df
+
+
+def load_country_index(index_path=INDEX_PATH):
+    """
+    Load the prebuilt country index into a dictionary keyed by ISO2 code.
+
+    :param index_path: Path to the index CSV.
+    :type index_path: str
+    :return: Dictionary mapping ISO2 codes to dictionaries with the columns of the index.
+    :rtype: dict
+    """
+    index_df = COUNTRY_CENTROIDS.read(index_path)
+    return index_df.set_index('ISO2').to_dict('index')
+
+
+def zoom_for_bounds(location, min_zoom=1, max_zoom=6):
+    """
+    Estimate a mapbox zoom level at which the bounding box of a country fits into a small map.
+
+    :param location: Entry of the country index.
+    :type location: dict
+    :param min_zoom: Smallest zoom level returned.
+    :type min_zoom: float
+    :param max_zoom: Largest zoom level returned.
+    :type max_zoom: float
+    :return: Zoom level.
+    :rtype: float
+    """
+    span = max(location['MaxLon'] - location['MinLon'], (location['MaxLat'] - location['MinLat']) * 1.5)
+    zoom = math.log2(360 / max(span, 1e-3)) - 0.5
+    return min(max(zoom, min_zoom), max_zoom)
+
+
+if __name__ == '__main__':
+    built = build_country_index()
+    print(f'Wrote {len(built)} countries to {INDEX_PATH}')
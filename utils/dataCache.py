@@ -0,0 +1,246 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Binary cache for the CSV files under data/.
+#
+# Every CSV is converted once into an uncompressed .npz file with one typed array per column.
+# Text columns are stored as integer codes plus their distinct values packed into a single
+# UTF-8 buffer with offsets, so loading them does not involve any parsing. The rare object columns
+# with other values than strings keep their distinct values as JSON instead; the cache holds no
+# pickled objects and is loaded with allow_pickle=False. A cached copy is
+# reused as long as the modification time and size of its source are unchanged; if they
+# changed, the SHA-1 of the source decides whether the cache has to be rebuilt.
+#
+# Build the cache for all files in advance with:  python -m utils.dataCache
+
+DATA_DIR = 'data'
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+# Bump when the layout of the cached files changes, so that old caches are rebuilt.
+CACHE_FORMAT = 3
+
+META_KEY = '__meta__'
+
+
+def _file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _cache_path(path, read_kwargs, version=None):
+    """
+    Path of the cached copy of a source file for a given set of read_csv arguments.
+
+    :param path: Path to the source CSV.
+    :type path: str
+    :param read_kwargs: Keyword arguments passed to pandas.read_csv.
+    :type read_kwargs: dict
+    :param version: Identifies the preparation of the parsed data, e.g. the hash of a schema.
+    :type version: str
+    :return: Path of the .npz file.
+    :rtype: str
+    """
+    relative = os.path.relpath(os.path.normpath(path), DATA_DIR)
+    if relative.startswith('..'):
+        relative = os.path.normpath(path).lstrip(os.sep).replace(os.sep, '_')
+    key_text = repr(sorted(read_kwargs.items()))
+    if version is not None:
+        key_text += version
+    key = hashlib.sha1(key_text.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f'{relative}.{key}.npz')
+
+
+def _encode_frame(df):
+    """
+    Split a DataFrame into typed column arrays and a JSON-serializable description.
+
+    :param df: The frame to encode.
+    :type df: pandas.DataFrame
+    :return: Tuple of (arrays, columns), where arrays maps array names to numpy arrays and
+             columns describes how to rebuild each column.
+    :rtype: tuple
+    """
+    arrays = {}
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df.iloc[:, i]
+        column = {'name': name, 'key': f'c{i}', 'dtype': str(series.dtype)}
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            values = series.astype('category') if series.dtype == object else series
+            categories = values.cat.categories
+            arrays[column['key']] = values.cat.codes.to_numpy()
+            if all(isinstance(value, str) for value in categories):
+                arrays[column['key'] + '_text'], arrays[column['key'] + '_offsets'] = _pack_strings(categories)
+                column['kind'] = 'codes'
+            else:
+                # Mixed object columns are rare; their distinct values are stored as JSON.
+                arrays[column['key'] + '_json'] = np.frombuffer(json.dumps(categories.tolist()).encode('utf-8'),
+                                                                dtype=np.uint8)
+                column['kind'] = 'json'
+        else:
+            arrays[column['key']] = series.to_numpy()
+            if arrays[column['key']].dtype == object:
+                raise TypeError(f"column '{name}' of type {series.dtype} holds Python objects")
+            column['kind'] = 'values'
+        columns.append(column)
+    return arrays, columns
+
+
+def _pack_strings(strings):
+    text = ''.join(strings)
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in strings], out=offsets[1:])
+    return np.frombuffer(text.encode('utf-8'), dtype=np.uint8), offsets
+
+
+def _unpack_strings(buffer, offsets):
+    text = buffer.tobytes().decode('utf-8')
+    bounds = offsets.tolist()
+    return [text[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+def _decode_frame(npz, columns):
+    data = {}
+    for column in columns:
+        values = npz[column['key']]
+        if column['kind'] in ('codes', 'json'):
+            if column['kind'] == 'codes':
+                categories = _unpack_strings(npz[column['key'] + '_text'], npz[column['key'] + '_offsets'])
+            else:
+                categories = json.loads(npz[column['key'] + '_json'].tobytes().decode('utf-8'))
+            if column['dtype'] == 'category':
+                data[column['name']] = pd.Categorical.from_codes(values, categories)
+            else:
+                lookup = np.empty(len(categories) + 1, dtype=object)
+                lookup[:-1] = categories
+                lookup[-1] = np.nan
+                data[column['name']] = lookup[values]
+        else:
+            data[column['name']] = values
+    return pd.DataFrame(data, columns=[column['name'] for column in columns])
+
+
+def _write_cache(cache_path, df, meta):
+    arrays, meta['columns'] = _encode_frame(df)
+    arrays[META_KEY] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Write to a temporary file first, so concurrent readers never see a half-written cache.
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, cache_path)
+
+
+def _read_meta(npz):
+    return json.loads(npz[META_KEY].tobytes().decode('utf-8'))
+
+
+def read_cached_csv(path, prepare=None, version=None, **read_kwargs):
+    """
+    Read a CSV file through the binary cache.
+
+    The cached copy is (re)built from the CSV if it does not exist yet or if the source changed.
+    If the cache cannot be written, the CSV is read directly.
+
+    :param path: Path to the source CSV.
+    :type path: str
+    :param prepare: Function applied to the parsed DataFrame before it is cached, e.g. to convert
+                    or validate columns. It is not applied to frames loaded from the cache.
+    :type prepare: callable
+    :param version: Part of the cache key identifying prepare, so that changing it rebuilds the
+                    cached copies.
+    :type version: str
+    :param read_kwargs: Keyword arguments passed to pandas.read_csv when the cache is built.
+    :return: The file content.
+    :rtype: pandas.DataFrame
+    """
+    cache_path = _cache_path(path, read_kwargs, version)
+    stat = os.stat(path)
+
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as npz:
+                meta = _read_meta(npz)
+                if meta['format'] == CACHE_FORMAT:
+                    if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+                        return _decode_frame(npz, meta['columns'])
+                    if meta['size'] == stat.st_size and meta['sha1'] == _file_sha1(path):
+                        # Only the timestamp changed (e.g. after a checkout), the content is the same.
+                        df = _decode_frame(npz, meta['columns'])
+                        meta['mtime_ns'] = stat.st_mtime_ns
+                        _try_write_cache(cache_path, df, meta)
+                        return df
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable cache '{cache_path}': {e}")
+
+    df = pd.read_csv(path, **read_kwargs)
+    if prepare is not None:
+        df = prepare(df)
+    meta = {
+        'format': CACHE_FORMAT,
+        'source': path,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': _file_sha1(path),
+    }
+    _try_write_cache(cache_path, df, meta)
+    return df
+
+
+def _try_write_cache(cache_path, df, meta):
+    try:
+        _write_cache(cache_path, df, dict(meta))
+    except (OSError, TypeError, ValueError) as e:
+        # TypeError: object values that JSON cannot represent; the CSV is read directly then
+        print(f"Could not write cache '{cache_path}': {e}")
+
+
+def source_files(data_dir=DATA_DIR):
+    """
+    List all CSV sources under the data directory, including the extensionless
+    frequency files of the keyword analysis.
+
+    :param data_dir: The data directory.
+    :type data_dir: str
+    :return: Sorted list of paths.
+    :rtype: list
+    """
+    paths = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for file_name in files:
+            if file_name.endswith('.csv') or file_name.startswith('frequent_words_'):
+                paths.append(os.path.join(root, file_name))
+    return sorted(paths)
+
+
+def build_cache(data_dir=DATA_DIR):
+    """
+    Convert every CSV source under the data directory into its binary cache, parsed with the types
+    of its schema, see utils/dataSchemas.py.
+
+    :param data_dir: The data directory.
+    :type data_dir: str
+    :return: Number of files processed.
+    :rtype: int
+    :raises SchemaError: If a file does not match its schema.
+    """
+    # The schemas build on this module; the files are cached with the types the pages read them with
+    from utils.dataSchemas import schema_for
+
+    paths = source_files(data_dir)
+    for path in paths:
+        schema_for(path, data_dir).read(path)
+    return len(paths)
+
+
+if __name__ == '__main__':
+    count = build_cache()
+    print(f'Cached {count} files in {CACHE_DIR}')
@@ -0,0 +1,423 @@
+import os
+import fnmatch
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+
+from utils.dataCache import DATA_DIR, read_cached_csv, source_files
+
+# Catalog of the columns, types and invariants of every file family under data/.
+#
+# Without a schema, pandas infers the types of every file: text columns become object columns with
+# one Python string per row and all numbers become int64 or float64. A schema declares the columns
+# to read (other columns are skipped while parsing), compact types for them (categoricals for
+# repeated labels, small integers for counts and ids, datetime64 for dates) and the invariants the
+# pages rely on. A file that does not match its schema raises a SchemaError naming the file, the
+# schema and every violation, instead of failing later inside a callback.
+#
+# Files are read through the binary cache. The types are parsed and the invariants checked when
+# the cached copy is built, so a file is validated once per change and an invalid file is never
+# cached. Parse and check all files under data/ with:
+#   python -m utils.dataSchemas
+
+# Type of the date columns, parsed as datetime64 from ISO dates 'YYYY-MM-DD'
+DATE = 'date'
+
+_schemas = []
+
+
+class SchemaError(ValueError):
+    """
+    A data file does not match its schema.
+    """
+
+
+class Schema:
+    """
+    Columns, types and invariants of one file family.
+    """
+
+    def __init__(self, name, patterns, columns, optional=None, usecols=None, nullable=(), checks=(),
+                 keep_default_na=True):
+        """
+        :param name: Name of the file family, used in error messages.
+        :type name: str
+        :param patterns: Glob patterns of the files relative to the data directory.
+        :type patterns: list
+        :param columns: Maps every required column to its type: a numpy or pandas dtype name,
+                        'category', 'str' or DATE.
+        :type columns: dict
+        :param optional: Maps columns that only some files of the family have to their type. They
+                         are only read if requested through usecols.
+        :type optional: dict
+        :param usecols: Columns read by default, all required columns if None.
+        :type usecols: list
+        :param nullable: Columns that may contain missing values.
+        :type nullable: iterable
+        :param checks: Triples of (description, columns, function) of the invariants. The function
+                       gets the DataFrame and returns a boolean Series, False for the rows violating
+                       it. Checks are skipped if one of their columns was not read.
+        :type checks: iterable
+        :param keep_default_na: If False, strings like 'NA' and 'null' are values, not missing.
+        :type keep_default_na: bool
+        """
+        self.name = name
+        self.patterns = list(patterns)
+        self.columns = dict(columns)
+        self.optional = dict(optional or {})
+        self.usecols = list(usecols or columns)
+        self.nullable = set(nullable)
+        self.checks = list(checks)
+        self.keep_default_na = keep_default_na
+        self.version = self._version()
+        _schemas.append(self)
+
+    def _version(self):
+        # Part of the binary cache key, so cached copies are rebuilt when the schema changes
+        parts = [self.name, sorted(self.types().items()), sorted(self.nullable), self.keep_default_na]
+        for description, columns, check in self.checks:
+            parts.append([description, columns, _check_text(check)])
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def types(self):
+        """
+        :return: Maps all required and optional columns to their types.
+        :rtype: dict
+        """
+        return {**self.columns, **self.optional}
+
+    def read_kwargs(self, usecols=None):
+        """
+        Arguments of pandas.read_csv that parse the given columns with their declared types. Date
+        columns are read as categoricals and converted afterwards, see _parse_dates().
+
+        :param usecols: The columns to read, the default columns of the schema if None.
+        :type usecols: list
+        :return: The keyword arguments.
+        :rtype: dict
+        :raises KeyError: If one of the columns is not declared.
+        """
+        types = self.types()
+        usecols = list(self.usecols if usecols is None else usecols)
+        kwargs = {'usecols': usecols,
+                  'dtype': {column: 'category' if types[column] == DATE else types[column] for column in usecols}}
+        if not self.keep_default_na:
+            kwargs['keep_default_na'] = False
+        return kwargs
+
+    def read(self, path, usecols=None):
+        """
+        Read a file through the binary cache, validating it when the cached copy is built.
+
+        :param path: Path to the file.
+        :type path: str
+        :param usecols: The columns to read, the default columns of the schema if None.
+        :type usecols: list
+        :return: The file content.
+        :rtype: pandas.DataFrame
+        :raises SchemaError: If the file does not match the schema.
+        """
+        try:
+            return read_cached_csv(path, prepare=lambda df: self.validate(self._parse_dates(df), path),
+                                   version=self.version,
+                                   **self.read_kwargs(usecols))
+        except SchemaError:
+            raise
+        except ValueError as e:
+            raise self._parse_error(path, e, usecols) from e
+
+    def parse(self, source, usecols=None, name=None, first_line=2, **read_kwargs):
+        """
+        Parse and validate CSV data without the binary cache, e.g. rows appended to a file.
+
+        :param source: Path or file-like object passed to pandas.read_csv.
+        :param usecols: The columns to read, the default columns of the schema if None.
+        :type usecols: list
+        :param name: Name of the source in error messages, the path if None.
+        :type name: str
+        :param first_line: Line number of the first row in error messages, e.g. of the first appended
+                           row in its file.
+        :type first_line: int
+        :param read_kwargs: Additional keyword arguments of pandas.read_csv, e.g. header and names.
+        :return: The data.
+        :rtype: pandas.DataFrame
+        :raises SchemaError: If the data does not match the schema.
+        """
+        if name is None:
+            name = source if isinstance(source, str) else '<data>'
+        try:
+            df = self._parse_dates(pd.read_csv(source, **self.read_kwargs(usecols), **read_kwargs))
+        except ValueError as e:
+            raise self._parse_error(name, e, usecols) from e
+        return self.validate(df, name, first_line)
+
+    def _parse_dates(self, df):
+        # A file has few distinct dates on many rows, so only the distinct values are parsed
+        types = self.types()
+        for column in df.columns:
+            if types.get(column) == DATE and isinstance(df[column].dtype, pd.CategoricalDtype):
+                values = list(df[column].cat.categories)
+                dates = np.array(values, dtype='datetime64[D]')
+                # numpy also accepts months and timestamps, which do not survive the round trip
+                invalid = [value for value, date in zip(values, np.datetime_as_string(dates)) if value != date]
+                if invalid:
+                    raise ValueError(f"'{column}' has values that are not dates 'YYYY-MM-DD': {invalid[:3]}")
+                # Code -1 of missing values selects the NaT at the end
+                lookup = np.append(dates, np.datetime64('NaT')).astype('datetime64[ns]')
+                df[column] = lookup[df[column].cat.codes.to_numpy()]
+        return df
+
+    def _parse_error(self, name, error, usecols):
+        # pandas reports missing columns in its own words; name them explicitly if the header is readable
+        expected = self.usecols if usecols is None else usecols
+        try:
+            header = pd.read_csv(name, nrows=0).columns
+            missing = [column for column in expected if column not in header]
+        except (OSError, ValueError):
+            missing = []
+        if missing:
+            return SchemaError(f"'{name}' does not match the schema '{self.name}': missing columns {missing}")
+        return SchemaError(f"'{name}' does not match the schema '{self.name}': {error}")
+
+    def validate(self, df, name='<data>', first_line=2):
+        """
+        Check the types and invariants of parsed data.
+
+        :param df: The data.
+        :type df: pandas.DataFrame
+        :param name: Name of the source in error messages.
+        :type name: str
+        :param first_line: Line number of the first row in error messages, the line after the header
+                           by default.
+        :type first_line: int
+        :return: The data, unchanged.
+        :rtype: pandas.DataFrame
+        :raises SchemaError: Listing all violations, if there are any.
+        """
+        types = self.types()
+        problems = []
+        for column in df.columns:
+            if column not in types:
+                problems.append(f"undeclared column '{column}'")
+                continue
+            expected = types[column]
+            if expected == DATE:
+                valid = pd.api.types.is_datetime64_dtype(df[column])
+            elif expected == 'str':
+                valid = df[column].dtype == object
+            else:
+                valid = str(df[column].dtype) == expected
+            if not valid:
+                problems.append(f"'{column}' has the type {df[column].dtype} instead of {expected}")
+
+        for column in df.columns:
+            if column not in self.nullable and df[column].hasnans:
+                problems += _violations(f"'{column}' has no missing values", df[column].notna(), first_line)
+        # Invariants of columns that failed the checks above would only repeat the problem
+        if not problems:
+            for description, columns, check in self.checks:
+                if all(column in df.columns for column in columns):
+                    problems += _violations(description, check(df), first_line)
+
+        if problems:
+            raise SchemaError(f"'{name}' does not match the schema '{self.name}':\n  " + '\n  '.join(problems))
+        return df
+
+
+def _check_text(function):
+    # Source of a check with its default and closure values, e.g. the bounds of _between(). Unlike
+    # the bytecode, the source does not change with the Python version.
+    try:
+        source = inspect.getsource(function)
+    except (OSError, TypeError):
+        source = function.__qualname__
+    captured = [cell.cell_contents for cell in function.__closure__ or ()]
+    return [source, repr(function.__defaults__),
+            [_check_text(value) if inspect.isfunction(value) else repr(value) for value in captured]]
+
+
+def _violations(description, valid, first_line=2):
+    valid = np.asarray(valid, dtype=bool)
+    if valid.all():
+        return []
+    rows = np.flatnonzero(~valid)
+    return [f'{description}: violated by {len(rows)} rows, first on line {rows[0] + first_line}']
+
+
+# The checks compare numpy arrays, pandas operations cost more than the comparison on small files
+
+def _between(column, lower, upper):
+    def check(df):
+        values = df[column].to_numpy()
+        return (values >= lower) & (values <= upper)
+    return f"'{column}' is between {lower} and {upper}", [column], check
+
+
+def _positive(column):
+    return f"'{column}' is positive", [column], lambda df: df[column].to_numpy() > 0
+
+
+def _non_negative(*columns):
+    return [(f"'{column}' is not negative", [column], lambda df, column=column: df[column].to_numpy() >= 0)
+            for column in columns]
+
+
+def _unique(*columns):
+    return f'{list(columns)} is unique', list(columns), lambda df: ~df.duplicated(list(columns))
+
+
+# Trends100vRegions: daily top 100 categories per country, see utils/trendsIngest.py
+
+TRENDS = Schema(
+    'Trends100vRegions', ['Trends100vRegions/*_category_distribution.csv'],
+    {'Execution Date': DATE, 'Category ID': 'int16', 'Quantity': 'int32', 'Category Title': 'category'},
+    checks=[_positive('Category ID'), _between('Quantity', 1, 100)])
+
+TRENDS_MISSING = Schema(
+    'Trends100vRegions missing days', ['Trends100vRegions/missing_dates.csv'],
+    {'Country': 'str', 'Execution Date': DATE},
+    checks=[("'Country' is an ISO2 code", ['Country'], lambda df: df['Country'].str.fullmatch('[A-Z]{2}'))])
+
+# comments: comment timing per channel folder, see utils/channelStore.py and utils/commentTiming.py
+
+COMMENT_DAYS = Schema(
+    'comments development', ['comments/*/development.csv'],
+    {'Day': 'int16', 'Count': 'int32', 'Average per Video': 'float64', 'Relative Probability (%)': 'float64'},
+    checks=[*_non_negative('Day', 'Count', 'Average per Video'),
+            _between('Relative Probability (%)', 0, 100),
+            _unique('Day')])
+
+COMMENT_HOURS = Schema(
+    'comments development_daily', ['comments/*/development_daily.csv'],
+    {'Day': 'int16', 'Hour': 'int8', 'Count': 'int32', 'Average per Video': 'float64',
+     'Relative Probability': 'float64'},
+    checks=[*_non_negative('Day', 'Count', 'Average per Video'),
+            _between('Hour', 0, 23),
+            _between('Relative Probability', 0, 1),
+            _unique('Day', 'Hour')])
+
+COMMENT_VIDEOS = Schema(
+    'comments videos', ['comments/*/videos.csv'],
+    {'Video': 'str'},
+    checks=[_unique('Video')])
+
+COMMENT_IDS = Schema(
+    'comments comment ids', ['comments/*/comment_ids.csv'],
+    {'Comment': 'str'},
+    checks=[_unique('Comment')])
+
+# covidComments: comments on COVID-19 videos with their emotion; the text is read separately
+
+COVID_COMMENTS = Schema(
+    'covidComments', ['covidComments/*.csv'],
+    {'year': 'int16', 'query': 'category', 'text': 'str', 'emotion': 'category'},
+    usecols=['year', 'query', 'emotion'], nullable=['emotion'],
+    checks=[("'year' is 2005 or later", ['year'], lambda df: df['year'] >= 2005)])
+
+# duration and categoryData: one row per video, one file per channel or category
+
+VIDEO_COLUMNS = {'Video_Views': 'int64', 'Comment/View': 'float64', 'Like/View': 'float64', 'Seconds': 'int32'}
+VIDEO_CHECKS = [*_non_negative('Video_Views', 'Comment/View', 'Like/View'),
+                _positive('Seconds')]
+
+BOXPLOT_VIDEOS = Schema(
+    'duration boxplot', ['duration/Boxplot_Data.csv'],
+    {**VIDEO_COLUMNS, 'Category': 'int8', 'Length': 'category'},
+    checks=VIDEO_CHECKS)
+
+CATEGORY_VIDEOS = Schema(
+    'categoryData', ['categoryData/Categories_Formatted.csv'],
+    {**VIDEO_COLUMNS, 'Category': 'int8', 'Title': 'category'},
+    checks=VIDEO_CHECKS)
+
+# Checked after the more specific patterns above
+VIDEOS = Schema(
+    'videos', ['duration/*_Formatted.csv', 'categoryData/*_Formatted.csv'],
+    VIDEO_COLUMNS, optional={'Category': 'int8', 'Video_ID': 'str'},
+    checks=VIDEO_CHECKS)
+
+# videoLength: average video duration per year and category
+
+VIDEO_LENGTH = Schema(
+    'videoLength', ['videoLength/*.csv'],
+    {'Year': 'int16', 'VideoCategoryId': 'int16', 'Duration': 'float64', 'Category Title': 'category',
+     'Duration_minutes': 'float64'},
+    checks=[_positive('Duration'),
+            ("'Duration_minutes' is 'Duration' in minutes", ['Duration', 'Duration_minutes'],
+             lambda df: np.isclose(df['Duration_minutes'] * 60, df['Duration'])),
+            _unique('Year', 'VideoCategoryId')])
+
+# keyWordClouds: word frequencies per topic and year; the first, unnamed column is skipped
+
+KEYWORD_FREQUENCIES = Schema(
+    'keyWordClouds', ['keyWordClouds/*/frequent_words_*'],
+    {'words': 'str', 'numbers': 'int32'},
+    # 'null' and 'nan' are words here, not missing values
+    keep_default_na=False,
+    checks=[_positive('numbers')])
+
+# Lookup tables
+
+CATEGORIES = Schema(
+    'categories', ['Categories.csv'],
+    {'Category ID': 'int16', 'Category Title': 'str'},
+    checks=[_unique('Category ID'), _unique('Category Title')])
+
+COUNTRY_CENTROIDS = Schema(
+    'country centroids', ['countryCentroids.csv'],
+    {'ISO2': 'str', 'Name': 'str', 'Lat': 'float64', 'Lon': 'float64', 'MinLat': 'float64', 'MinLon': 'float64',
+     'MaxLat': 'float64', 'MaxLon': 'float64'},
+    # 'NA' is the code of Namibia
+    keep_default_na=False,
+    checks=[("'Lat' is between 'MinLat' and 'MaxLat'", ['Lat', 'MinLat', 'MaxLat'],
+             lambda df: df['Lat'].between(df['MinLat'], df['MaxLat'])),
+            ("'Lon' is between 'MinLon' and 'MaxLon'", ['Lon', 'MinLon', 'MaxLon'],
+             lambda df: df['Lon'].between(df['MinLon'], df['MaxLon'])),
+            _unique('ISO2')])
+
+
+def schema_for(path, data_dir=DATA_DIR):
+    """
+    Find the schema of a file by its path.
+
+    :param path: Path to the file.
+    :type path: str
+    :param data_dir: The data directory the patterns are relative to.
+    :type data_dir: str
+    :return: The first schema with a matching pattern.
+    :rtype: Schema
+    :raises SchemaError: If no schema matches.
+    """
+    relative = os.path.relpath(os.path.normpath(path), data_dir).replace(os.sep, '/')
+    for schema in _schemas:
+        if any(fnmatch.fnmatchcase(relative, pattern) for pattern in schema.patterns):
+            return schema
+    raise SchemaError(f"No schema declared for '{path}'")
+
+
+def read_data(path, usecols=None):
+    """
+    Read and validate a file under the data directory with the schema matching its path.
+
+    :param path: Path to the file.
+    :type path: str
+    :param usecols: The columns to read, the default columns of the schema if None.
+    :type usecols: list
+    :return: The file content.
+    :rtype: pandas.DataFrame
+    :raises SchemaError: If no schema matches or the file does not match it.
+    """
+    return schema_for(path).read(path, usecols)
+
+
+if __name__ == '__main__':
+    failures = 0
+    paths = source_files()
+    for path in paths:
+        try:
+            schema_for(path).parse(path)
+        except SchemaError as e:
+            failures += 1
+            print(e)
+    print(f'Checked {len(paths)} files, {failures} do not match their schema')
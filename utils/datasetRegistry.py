@@ -0,0 +1,268 @@
+import os
+import time
+import hashlib
+import threading
+
+from types import MappingProxyType
+
+# Central registry for the datasets of all pages.
+#
+# Pages register every dataset with a loader and the files it is built from. Registering does
+# not load anything: a dataset is loaded on its first access, or earlier by load_all(), which the
+# app runs in a background thread after startup.
+#
+# Callbacks read datasets from the current snapshot, which is never modified: when source files
+# change, the affected datasets are rebuilt in the background and a new snapshot replaces the old
+# one with a single assignment. A callback that is already running keeps working on the snapshot
+# it started with, so it never sees a mix of old and new frames.
+#
+# A loader may build on datasets registered before it with get(). During a refresh, such reads
+# from the refreshing thread return the datasets rebuilt by the same refresh.
+#
+# Datasets must be treated as read-only by callbacks.
+
+# Seconds between two checks of the source files, 0 disables the watcher.
+RELOAD_INTERVAL = float(os.environ.get('DATA_RELOAD_INTERVAL', 30))
+
+
+class Snapshot:
+    """
+    Immutable set of loaded datasets together with a version number that increases with every reload.
+
+    The version counts the reloads of one process. The fingerprints identify the state of the
+    source files of every dataset instead, so they are the same in all processes that loaded the
+    same files.
+    """
+
+    def __init__(self, datasets, version, fingerprints=None):
+        self.datasets = MappingProxyType(dict(datasets))
+        self.version = version
+        self.fingerprints = MappingProxyType(dict(fingerprints or {}))
+
+    def __getitem__(self, name):
+        return self.datasets[name]
+
+
+def _signature(sources):
+    """
+    Fingerprint of a list of source files and directories based on paths, sizes and modification times.
+
+    :param sources: Paths to files or directories; directories are scanned recursively.
+    :type sources: list
+    :return: Tuple describing the current state of the sources.
+    :rtype: tuple
+    """
+    entries = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for file_name in sorted(files):
+                    entries.append(_file_entry(os.path.join(root, file_name)))
+        else:
+            entries.append(_file_entry(source))
+    return tuple(entries)
+
+
+def _file_entry(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+class DatasetRegistry:
+    """
+    Registry of named datasets that are reloaded when their source files change.
+    """
+
+    def __init__(self):
+        self._datasets = {}
+        self._snapshot = Snapshot({}, version=0)
+        self._lock = threading.Lock()
+        self._watcher = None
+        # Datasets rebuilt by a running refresh, visible to the loaders it calls
+        self._refreshing = threading.local()
+
+    def register(self, name, loader, sources, updater=None):
+        """
+        Register a dataset. It is loaded on first access, see get(), or by load_all().
+
+        :param name: Unique name of the dataset.
+        :type name: str
+        :param loader: Function without arguments that builds the dataset from its sources.
+        :type loader: callable
+        :param sources: Files and directories the dataset is built from.
+        :type sources: list
+        :param updater: Optional function (dataset, changed_paths) -> dataset that brings the dataset up
+                        to date incrementally. If it is not given, changes trigger a complete reload.
+        :type updater: callable
+        """
+        with self._lock:
+            self._datasets[name] = {'loader': loader, 'updater': updater, 'sources': list(sources),
+                                    'signature': _signature(sources), 'load_lock': threading.Lock(),
+                                    'seconds': None}
+            self._swap({}, reload=False)
+
+    def get(self, name):
+        """
+        Get a dataset from the current snapshot, loading it on first access.
+
+        :param name: Name of the dataset.
+        :type name: str
+        :return: The dataset.
+        :raises KeyError: If no dataset of that name is registered.
+        """
+        rebuilt = getattr(self._refreshing, 'changed', None)
+        if rebuilt and name in rebuilt:
+            return rebuilt[name]
+        snapshot = self._snapshot
+        if name in snapshot.datasets:
+            return snapshot[name]
+        return self._load(name)
+
+    def _load(self, name):
+        dataset = self._datasets[name]
+        # Concurrent first accesses wait for a single load
+        with dataset['load_lock']:
+            if name in self._snapshot.datasets:
+                return self._snapshot[name]
+            start = time.perf_counter()
+            signature = _signature(dataset['sources'])
+            value = dataset['loader']()
+            with self._lock:
+                dataset['signature'] = signature
+                dataset['seconds'] = time.perf_counter() - start
+                self._swap({name: value}, reload=False)
+        return value
+
+    def load_all(self):
+        """
+        Load all datasets that were not accessed yet. Failing loaders are reported and retried on
+        their next access.
+
+        :return: The number of datasets this call loaded.
+        :rtype: int
+        """
+        loaded = 0
+        for name in list(self._datasets):
+            if name in self._snapshot.datasets:
+                continue
+            try:
+                self.get(name)
+                loaded += 1
+            except Exception as e:
+                print(f"Loading dataset '{name}' failed: {e}")
+        return loaded
+
+    def timing_report(self):
+        """
+        Describe how long the loaded datasets took to load, slowest first.
+
+        :return: The report.
+        :rtype: str
+        """
+        with self._lock:
+            timings = sorted(((dataset['seconds'], name) for name, dataset in self._datasets.items()
+                              if dataset['seconds'] is not None), reverse=True)
+        lines = [f'Loaded {len(timings)} of {len(self._datasets)} datasets in {sum(t for t, _ in timings):.2f} s']
+        lines += [f'  {name:<24}{seconds:>7.3f} s' for seconds, name in timings]
+        return '\n'.join(lines)
+
+    def snapshot(self):
+        """
+        Get the current snapshot. Use it to read several datasets that have to fit together.
+        Datasets that were never accessed are not part of it, see load_all().
+
+        :return: The current snapshot.
+        :rtype: Snapshot
+        """
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def fingerprint(self, names):
+        """
+        Identify the state of the source files of some datasets, e.g. to key outputs computed from them.
+
+        :param names: Names of the datasets.
+        :type names: iterable
+        :return: The hex digest, the same in all processes that loaded the same files.
+        :rtype: str
+        :raises KeyError: If one of the datasets is not registered.
+        """
+        fingerprints = self._snapshot.fingerprints
+        return hashlib.sha1(repr(sorted((name, fingerprints[name]) for name in names)).encode('utf-8')).hexdigest()
+
+    def _swap(self, changed, reload=True):
+        datasets = dict(self._snapshot.datasets)
+        datasets.update(changed)
+        fingerprints = {name: hashlib.sha1(repr(dataset['signature']).encode('utf-8')).hexdigest()
+                        for name, dataset in self._datasets.items()}
+        # A first load adds a dataset without replacing data, so the version only changes on reloads.
+        version = self._snapshot.version + 1 if reload else self._snapshot.version
+        # The only place the snapshot is replaced; a single reference assignment.
+        self._snapshot = Snapshot(datasets, version, fingerprints)
+
+    def refresh(self):
+        """
+        Rebuild all datasets whose sources changed and publish them in a new snapshot.
+
+        A dataset whose loader fails keeps its previous value and is retried on the next refresh.
+
+        :return: Names of the reloaded datasets.
+        :rtype: list
+        """
+        with self._lock:
+            changed = {}
+            self._refreshing.changed = changed
+            try:
+                for name, dataset in self._datasets.items():
+                    # Datasets that were never accessed are loaded from the current files anyway
+                    if name not in self._snapshot.datasets:
+                        continue
+                    signature = _signature(dataset['sources'])
+                    if signature == dataset['signature']:
+                        continue
+                    try:
+                        if dataset['updater'] is not None:
+                            changed_paths = sorted({entry[0] for entry in
+                                                    set(signature) ^ set(dataset['signature'])})
+                            changed[name] = dataset['updater'](self._snapshot[name], changed_paths)
+                        else:
+                            changed[name] = dataset['loader']()
+                    except Exception as e:
+                        print(f"Reloading dataset '{name}' failed: {e}")
+                        continue
+                    dataset['signature'] = signature
+            finally:
+                self._refreshing.changed = None
+
+            if changed:
+                self._swap(changed)
+                print(f"Reloaded datasets {sorted(changed)} (version {self._snapshot.version})")
+            return sorted(changed)
+
+    def start_watcher(self, interval=RELOAD_INTERVAL):
+        """
+        Start a background thread that calls refresh() every `interval` seconds.
+
+        :param interval: Seconds between two checks, 0 disables the watcher.
+        :type interval: float
+        """
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                self.refresh()
+
+        self._watcher = threading.Thread(target=watch, name='dataset-watcher', daemon=True)
+        self._watcher.start()
+
+
+registry = DatasetRegistry()
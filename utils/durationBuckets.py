@@ -0,0 +1,159 @@
+import os
+import numpy as np
+import pandas as pd
+
+from utils.confidenceIntervals import bootstrap_means
+from utils.dataSchemas import VIDEOS
+
+# Viewer interactions per video length bucket for any number of channels.
+#
+# Every file '{channel}_Formatted.csv' in the duration folder holds one row per video with the
+# columns 'Seconds', 'Like/View' and 'Comment/View'. The videos of all channels are binned into
+# length buckets in one vectorized step, and the average rates of every (channel, bucket) are
+# computed with a single bincount over the combined (channel, bucket) codes, together with their
+# bootstrap confidence intervals. The result is a small channels x buckets table, so showing
+# another channel is a lookup.
+
+FILE_SUFFIX = '_Formatted.csv'
+
+# Upper bounds in seconds of all length buckets but the last; a video of exactly 300 seconds is in
+# the first bucket. The buckets match the 'Category' column of the files.
+DEFAULT_EDGES = (300, 600, 1200, 1800, 3600)
+
+RATE_COLUMNS = ['Like/View', 'Comment/View']
+
+
+def bucket_labels(edges):
+    """
+    Labels of the length buckets in minutes, e.g. '0-5', '5-10', ..., '60+'.
+
+    :param edges: Upper bounds in seconds of all buckets but the last.
+    :type edges: iterable
+    :return: One label per bucket.
+    :rtype: list
+    """
+    minutes = [f'{edge / 60:g}' for edge in edges]
+    return [f'{lower}-{upper}' for lower, upper in zip(['0'] + minutes, minutes)] + [f'{minutes[-1]}+']
+
+
+def assign_buckets(seconds, edges):
+    """
+    Length bucket of every video.
+
+    :param seconds: Length of the videos in seconds.
+    :type seconds: numpy.ndarray
+    :param edges: Upper bounds in seconds of all buckets but the last.
+    :type edges: iterable
+    :return: Position of the bucket of every video, between 0 and len(edges).
+    :rtype: numpy.ndarray
+    """
+    return np.digitize(seconds, edges, right=True)
+
+
+def discover_duration_files(folder):
+    """
+    Find the video files of all channels and categories.
+
+    :param folder: Folder with the files '{channel}_Formatted.csv'.
+    :type folder: str
+    :return: Maps every channel name to its file, sorted alphabetically ignoring case.
+    :rtype: dict
+    """
+    names = sorted((file_name[:-len(FILE_SUFFIX)] for file_name in os.listdir(folder)
+                    if file_name.endswith(FILE_SUFFIX)), key=str.lower)
+    return {name: os.path.join(folder, name + FILE_SUFFIX) for name in names}
+
+
+class DurationBuckets:
+    """
+    Video counts and average interaction rates per channel and length bucket.
+    """
+
+    def __init__(self, channels, labels, counts, rates, intervals):
+        """
+        :param channels: Channel names.
+        :type channels: list
+        :param labels: Bucket labels.
+        :type labels: list
+        :param counts: Number of videos, shape (channels, buckets).
+        :type counts: numpy.ndarray
+        :param rates: Maps every column of RATE_COLUMNS to its averages, shape (channels, buckets),
+                      NaN for empty buckets.
+        :type rates: dict
+        :param intervals: Maps every column of RATE_COLUMNS to the (lower, upper) bounds of the
+                          confidence intervals of its averages, each of shape (channels, buckets).
+        :type intervals: dict
+        """
+        self.channels = channels
+        self.labels = labels
+        self.counts = counts
+        self.rates = rates
+        self.intervals = intervals
+        self._positions = {channel: i for i, channel in enumerate(channels)}
+
+    @classmethod
+    def from_files(cls, files, edges=DEFAULT_EDGES):
+        """
+        Compute the buckets of several channels.
+
+        :param files: Maps every channel name to its '*_Formatted.csv' file.
+        :type files: dict
+        :param edges: Upper bounds in seconds of all buckets but the last.
+        :type edges: iterable
+        :return: The buckets.
+        :rtype: DurationBuckets
+        """
+        channels = list(files)
+        frames = [VIDEOS.read(path)[['Seconds'] + RATE_COLUMNS] for path in files.values()]
+        videos = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Seconds'] + RATE_COLUMNS)
+        channel_codes = np.repeat(np.arange(len(channels)), [len(frame) for frame in frames])
+
+        buckets = len(tuple(edges)) + 1
+        codes = channel_codes * buckets + assign_buckets(videos['Seconds'].to_numpy(), edges)
+        size = len(channels) * buckets
+        counts = np.bincount(codes, minlength=size)
+
+        rates = {}
+        intervals = {}
+        for column in RATE_COLUMNS:
+            means, lower, upper = bootstrap_means(videos[column].to_numpy(), codes, size)
+            rates[column] = means.reshape(len(channels), buckets)
+            intervals[column] = (lower.reshape(len(channels), buckets), upper.reshape(len(channels), buckets))
+
+        return cls(channels, bucket_labels(edges), counts.reshape(len(channels), buckets), rates, intervals)
+
+    def channel(self, channel):
+        """
+        Interactions of one channel per length bucket.
+
+        :param channel: The channel name.
+        :type channel: str
+        :return: DataFrame with the columns 'Length', 'Videos', 'Like/View' and 'Comment/View' and
+                 the bounds '... lower' and '... upper' of their confidence intervals, one row per
+                 bucket with videos.
+        :rtype: pandas.DataFrame
+        :raises KeyError: If the channel is unknown.
+        """
+        i = self._positions[channel]
+        present = self.counts[i] > 0
+        data = {'Length': np.asarray(self.labels, dtype=object)[present], 'Videos': self.counts[i][present]}
+        for column, values in self.rates.items():
+            lower, upper = self.intervals[column]
+            data[column] = values[i][present]
+            data[f'{column} lower'] = lower[i][present]
+            data[f'{column} upper'] = upper[i][present]
+        return pd.DataFrame(data)
+
+
+def load_duration_buckets(folder, edges=DEFAULT_EDGES):
+    """
+    Discover the channel files of a folder and compute their buckets.
+
+    :param folder: Folder with the files '{channel}_Formatted.csv'.
+    :type folder: str
+    :param edges: Upper bounds in seconds of all buckets but the last.
+    :type edges: iterable
+    :return: The buckets.
+    :rtype: DurationBuckets
+    """
+    return DurationBuckets.from_files(discover_duration_files(folder), edges)
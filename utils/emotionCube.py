@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+class EmotionCube:
+    """
+    Counts of comments per (year, query, emotion).
+
+    The last position of the year and the query axis holds the marginal over all years and all
+    queries, so every combination of the dropdowns on the Covid Comments page is a single lookup.
+    The counts are read-only.
+    """
+
+    def __init__(self, years, queries, emotions, counts):
+        """
+        :param years: Years along the first axis (without the marginal).
+        :type years: list
+        :param queries: Queries along the second axis (without the marginal).
+        :type queries: list
+        :param emotions: Emotions along the third axis.
+        :type emotions: list
+        :param counts: Array of shape (years + 1, queries + 1, emotions), including the marginals.
+        :type counts: numpy.ndarray
+        """
+        self.years = list(years)
+        self.queries = list(queries)
+        self.emotions = list(emotions)
+        self.counts = counts
+        self.counts.flags.writeable = False
+
+        self._year_pos = {year: i for i, year in enumerate(self.years)}
+        self._query_pos = {query: i for i, query in enumerate(self.queries)}
+
+    @classmethod
+    def from_codes(cls, year_codes, query_codes, emotion_codes, years, queries, emotions):
+        """
+        Count the comments given as integer codes into the axes.
+
+        :param year_codes: Position of the year of every comment.
+        :type year_codes: numpy.ndarray
+        :param query_codes: Position of the query of every comment.
+        :type query_codes: numpy.ndarray
+        :param emotion_codes: Position of the emotion of every comment.
+        :type emotion_codes: numpy.ndarray
+        :param years: Years of the first axis.
+        :type years: list
+        :param queries: Queries of the second axis.
+        :type queries: list
+        :param emotions: Emotions of the third axis.
+        :type emotions: list
+        :return: The cube.
+        :rtype: EmotionCube
+        """
+        # Comments with a missing value (code -1) are not counted.
+        valid = (year_codes >= 0) & (query_codes >= 0) & (emotion_codes >= 0)
+        shape = (len(years), len(queries), len(emotions))
+        flat = np.ravel_multi_index((year_codes[valid], query_codes[valid], emotion_codes[valid]), shape)
+        cells = np.bincount(flat, minlength=np.prod(shape)).reshape(shape)
+
+        counts = np.zeros((shape[0] + 1, shape[1] + 1, shape[2]), dtype=np.int64)
+        counts[:-1, :-1] = cells
+        counts[-1, :-1] = cells.sum(axis=0)
+        counts[:-1, -1] = cells.sum(axis=1)
+        counts[-1, -1] = cells.sum(axis=(0, 1))
+        return cls(years, queries, emotions, counts)
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build the cube from a frame with the columns 'year', 'query' and 'emotion'.
+
+        :param df: The comments.
+        :type df: pandas.DataFrame
+        :return: The cube.
+        :rtype: EmotionCube
+        """
+        year_codes, years = pd.factorize(df['year'], sort=True)
+        query_codes, queries = pd.factorize(df['query'])
+        emotion_codes, emotions = pd.factorize(df['emotion'])
+        return cls.from_codes(year_codes, query_codes, emotion_codes, years, queries, emotions)
+
+    def emotion_counts(self, year=None, query=None):
+        """
+        Number of comments per emotion.
+
+        :param year: The year, None for all years.
+        :type year: int
+        :param query: The query, None for all queries.
+        :type query: str
+        :return: Series of counts indexed by emotion.
+        :rtype: pandas.Series
+        """
+        year_pos = -1 if year is None else self._year_pos.get(year)
+        query_pos = -1 if query is None else self._query_pos.get(query)
+        if year_pos is None or query_pos is None:
+            return pd.Series(0, index=pd.Index(self.emotions, name='emotion'))
+        return pd.Series(self.counts[year_pos, query_pos], index=pd.Index(self.emotions, name='emotion'))
+
+    def counts_over_years(self, query=None):
+        """
+        Number of comments per year and emotion.
+
+        :param query: The query, None for all queries.
+        :type query: str
+        :return: DataFrame indexed by year with one column per emotion.
+        :rtype: pandas.DataFrame
+        """
+        query_pos = -1 if query is None else self._query_pos.get(query)
+        if query_pos is None:
+            counts = np.zeros((len(self.years), len(self.emotions)), dtype=np.int64)
+        else:
+            counts = self.counts[:-1, query_pos]
+        return pd.DataFrame(counts, index=pd.Index(self.years, name='year'),
+                            columns=pd.Index(self.emotions, name='emotion'))
@@ -0,0 +1,78 @@
+import os
+
+from flask import abort, request, send_from_directory
+
+from utils.imageVariants import IMAGE_EXTENSIONS, VARIANT_FOLDER, find_variant
+
+# Serve the pre-rendered word cloud images as static files.
+#
+# The images are sent as they are stored (compressed JPEG/PNG/WebP bytes); the server never
+# decodes them. URLs carry the modification time of the file as version, so browsers may cache
+# every response for a year and still pick up a replaced image immediately. The WebP variants
+# built by utils.imageVariants are served from the same route.
+
+IMAGE_ROUTE = '/wordclouds/'
+IMAGE_FOLDER = 'data/keyWordClouds'
+VARIANT_EXTENSION = '.webp'
+
+# Seconds a browser may cache a versioned image
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def image_url(path, size=None):
+    """
+    Versioned URL of an image below the image folder.
+
+    :param path: Path to the image, e.g. 'data/keyWordClouds/yearlyKeyWords/youtube_keywords_2013.jpg'.
+    :type path: str
+    :param size: Name of a WebP variant ('thumb' or 'full'); the original is used if the variant was not built.
+    :type size: str
+    :return: The URL, e.g. '/wordclouds/yearlyKeyWords/youtube_keywords_2013.full.webp?v=17a3c...'.
+    :rtype: str
+    """
+    url = variant_url(path, size) if size else None
+    return url if url is not None else _versioned_url(path, IMAGE_FOLDER)
+
+
+def variant_url(path, size):
+    """
+    Versioned URL of a WebP variant of an image, without falling back to the original.
+
+    :param path: Path to the image, e.g. 'data/keyWordClouds/yearlyKeyWords/youtube_keywords_2013.jpg'.
+    :type path: str
+    :param size: Name of the variant ('thumb' or 'full').
+    :type size: str
+    :return: The URL, None if the variant was not built or is outdated.
+    :rtype: str
+    """
+    variant = find_variant(path, size)
+    return _versioned_url(variant, VARIANT_FOLDER) if variant is not None else None
+
+
+def _versioned_url(path, folder):
+    relative_path = os.path.relpath(path, folder).replace(os.sep, '/')
+    version = format(os.stat(path).st_mtime_ns, 'x')
+    return f'{IMAGE_ROUTE}{relative_path}?v={version}'
+
+
+def register_image_routes(server):
+    """
+    Add the route serving the images to the Flask server of the app.
+
+    :param server: The Flask server.
+    :type server: flask.Flask
+    """
+    folder = os.path.abspath(IMAGE_FOLDER)
+    variant_folder = os.path.abspath(VARIANT_FOLDER)
+
+    @server.route(f'{IMAGE_ROUTE}<path:filename>')
+    def serve_image(filename):
+        if filename.lower().endswith(VARIANT_EXTENSION):
+            response = send_from_directory(variant_folder, filename, max_age=MAX_AGE)
+        elif filename.lower().endswith(IMAGE_EXTENSIONS):
+            response = send_from_directory(folder, filename, max_age=MAX_AGE)
+        else:
+            abort(404)
+        if 'v' in request.args:
+            response.cache_control.immutable = True
+        return response
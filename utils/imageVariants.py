@@ -0,0 +1,143 @@
+import os
+
+from PIL import Image
+
+from utils.dataCache import CACHE_DIR
+
+# Pre-scaled WebP variants of the word cloud images.
+#
+# Every word cloud is converted into a small thumbnail, shown immediately and used to prefetch
+# all years of a topic, and a full-resolution image. If several files exist for the same word
+# cloud (e.g. a .png and a .jpg export), only one of them is converted. The page shows the
+# original files for images without an up-to-date variant, but neither the blur-up thumbnail nor
+# prefetches them, and the app prints a warning at startup.
+#
+# gunicorn builds the variants before the workers are started, see when_ready() in gunicorn.conf.py.
+# Build them by hand with:  python -m utils.imageVariants
+
+SOURCE_FOLDER = 'data/keyWordClouds'
+VARIANT_FOLDER = os.path.join(CACHE_DIR, 'keyWordClouds')
+
+# Maximum width in pixels of every variant; images are never scaled up.
+VARIANT_WIDTHS = {'thumb': 480, 'full': 1920}
+WEBP_QUALITY = 80
+
+# Preferred source if a word cloud exists in several formats, best first. The page and the image
+# route use the same order, so a variant is always built from the file the page references.
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def variant_path(path, size):
+    """
+    Path of a variant of a source image.
+
+    :param path: Path to the source image below the source folder.
+    :type path: str
+    :param size: Name of the variant, one of VARIANT_WIDTHS.
+    :type size: str
+    :return: Path of the WebP file.
+    :rtype: str
+    """
+    stem = os.path.splitext(os.path.relpath(path, SOURCE_FOLDER))[0]
+    return os.path.join(VARIANT_FOLDER, f'{stem}.{size}.webp')
+
+
+def source_images(folder=SOURCE_FOLDER):
+    """
+    Find the word cloud images, one file per word cloud.
+
+    :param folder: Folder with the word cloud images.
+    :type folder: str
+    :return: Tuple of (sorted paths of the sources, paths of the skipped duplicates).
+    :rtype: tuple
+    """
+    candidates = {}
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for file_name in files:
+            stem, extension = os.path.splitext(file_name)
+            if extension.lower() in IMAGE_EXTENSIONS:
+                candidates.setdefault(os.path.join(root, stem), []).append(os.path.join(root, file_name))
+
+    sources = []
+    duplicates = []
+    for paths in candidates.values():
+        paths.sort(key=lambda path: IMAGE_EXTENSIONS.index(os.path.splitext(path)[1].lower()))
+        sources.append(paths[0])
+        duplicates.extend(paths[1:])
+    return sorted(sources), sorted(duplicates)
+
+
+def _is_fresh(path, source):
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def find_variant(path, size):
+    """
+    Find an up-to-date variant of an image.
+
+    :param path: Path to the source image below the source folder.
+    :type path: str
+    :param size: Name of the variant, one of VARIANT_WIDTHS.
+    :type size: str
+    :return: Path of the variant, None if it was not built or is older than the source.
+    :rtype: str
+    """
+    variant = variant_path(path, size)
+    return variant if _is_fresh(variant, path) else None
+
+
+def missing_variants(folder=SOURCE_FOLDER):
+    """
+    Find the word cloud images without an up-to-date variant.
+
+    :param folder: Folder with the word cloud images.
+    :type folder: str
+    :return: Sorted paths of the images with a missing or outdated variant.
+    :rtype: list
+    """
+    sources, _ = source_images(folder)
+    return [source for source in sources
+            if any(find_variant(source, size) is None for size in VARIANT_WIDTHS)]
+
+
+def build_variants(folder=SOURCE_FOLDER):
+    """
+    Build the missing or outdated variants of all word cloud images.
+
+    :param folder: Folder with the word cloud images.
+    :type folder: str
+    :return: Tuple of (number of variants written, paths of the skipped duplicates).
+    :rtype: tuple
+    """
+    sources, duplicates = source_images(folder)
+    written = 0
+    for source in sources:
+        # Variants are named after the image without extension, so all formats of a word cloud share them
+        outdated = {size: width for size, width in VARIANT_WIDTHS.items()
+                    if not _is_fresh(variant_path(source, size), source)}
+        if not outdated:
+            continue
+        with Image.open(source) as image:
+            image = image.convert('RGB')
+            for size, width in outdated.items():
+                variant = image.copy()
+                variant.thumbnail((width, width * image.height // image.width), Image.LANCZOS)
+
+                path = variant_path(source, size)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                variant.save(tmp_path, format='WEBP', quality=WEBP_QUALITY, method=6)
+                os.replace(tmp_path, path)
+                written += 1
+    return written, duplicates
+
+
+if __name__ == '__main__':
+    count, skipped = build_variants()
+    print(f'Wrote {count} image variants to {VARIANT_FOLDER}')
+    for path in skipped:
+        print(f'Skipped duplicate {path}')
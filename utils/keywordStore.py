@@ -0,0 +1,246 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+
+from utils.dataSchemas import KEYWORD_FREQUENCIES
+
+# All keyword frequency lists of the Keyword Analysis page in one in-memory store.
+#
+# The lists of every (topic, year) are concatenated into flat arrays of word codes and counts,
+# sorted by (topic, year, descending count). The top N words of any (topic, year) are therefore
+# the first N entries of its contiguous slice. The files are located through a manifest that is
+# checked once at load time, so a missing or malformed file stops the app from starting instead
+# of failing later in a callback.
+#
+# For comparisons across years, the counts are additionally kept as a sparse term x (topic, year)
+# matrix, so the trajectory of several words is a single row and column selection.
+
+TOPIC_FOLDER = 'data/keyWordClouds/topicFrequentWords'
+YEARLY_FOLDER = 'data/keyWordClouds/yearlyfrequentWords'
+
+# Topic name of the lists covering all categories
+ALL_TOPICS = 'all categories'
+
+TOPIC_FILE_PATTERN = re.compile(r'frequent_words_(?P<topic>[a-z]+)_(?P<year>\d{4})$')
+YEARLY_FILE_PATTERN = re.compile(r'frequent_words_(?P<year>\d{4})\.csv$')
+
+
+def keyword_manifest(topic_folder=TOPIC_FOLDER, yearly_folder=YEARLY_FOLDER):
+    """
+    Scan the folders of the keyword frequency lists.
+
+    :param topic_folder: Folder with the files 'frequent_words_{topic}_{year}'.
+    :type topic_folder: str
+    :param yearly_folder: Folder with the files 'frequent_words_{year}.csv' covering all categories.
+    :type yearly_folder: str
+    :return: Maps every (topic, year) to the path of its file.
+    :rtype: dict
+    """
+    manifest = {}
+    for file_name in sorted(os.listdir(topic_folder)):
+        match = TOPIC_FILE_PATTERN.match(file_name)
+        if match:
+            manifest[(match['topic'], int(match['year']))] = os.path.join(topic_folder, file_name)
+    for file_name in sorted(os.listdir(yearly_folder)):
+        match = YEARLY_FILE_PATTERN.match(file_name)
+        if match:
+            manifest[(ALL_TOPICS, int(match['year']))] = os.path.join(yearly_folder, file_name)
+    return manifest
+
+
+def validate_manifest(manifest, topics, years):
+    """
+    Check that the manifest contains a file for every expected (topic, year).
+
+    :param manifest: Maps (topic, year) to file paths, see keyword_manifest().
+    :type manifest: dict
+    :param topics: Expected topics, including ALL_TOPICS.
+    :type topics: list
+    :param years: Expected years.
+    :type years: iterable
+    :raises ValueError: If files are missing.
+    """
+    missing = [(topic, year) for topic in topics for year in years if (topic, year) not in manifest]
+    if missing:
+        raise ValueError(f'Keyword frequency files missing for {missing}')
+
+
+class KeywordStore:
+    """
+    Word counts of all (topic, year) keyword lists, each list sorted by descending count.
+    """
+
+    def __init__(self, vocabulary, word_codes, counts, segments):
+        """
+        :param vocabulary: All distinct words.
+        :type vocabulary: list
+        :param word_codes: Position of the word of every entry in the vocabulary.
+        :type word_codes: numpy.ndarray
+        :param counts: Count of every entry.
+        :type counts: numpy.ndarray
+        :param segments: Maps every (topic, year) to the (start, stop) slice of its entries.
+        :type segments: dict
+        """
+        self.vocabulary = np.asarray(vocabulary, dtype=object)
+        self.word_codes = word_codes
+        self.counts = counts
+        self.segments = segments
+        self.word_codes.flags.writeable = False
+        self.counts.flags.writeable = False
+        self.terms = TermIndex(self)
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        """
+        Read all files of a manifest into one store.
+
+        :param manifest: Maps (topic, year) to file paths, see keyword_manifest().
+        :type manifest: dict
+        :return: The store.
+        :rtype: KeywordStore
+        :raises SchemaError: If a file does not match the keyword frequency schema.
+        """
+        frames = []
+        for (topic, year), path in sorted(manifest.items()):
+            df = KEYWORD_FREQUENCIES.read(path)
+            frames.append(pd.DataFrame({'topic': topic, 'year': year,
+                                        'words': df['words'].astype(str), 'numbers': df['numbers']}))
+        entries = pd.concat(frames, ignore_index=True)
+
+        # The stable sort keeps words with equal counts in file order, like DataFrame.nlargest
+        entries = entries.sort_values(['topic', 'year', 'numbers'], ascending=[True, True, False], kind='stable')
+        word_codes, vocabulary = pd.factorize(entries['words'])
+        topics = entries['topic'].to_numpy()
+        years = entries['year'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, (topics[1:] != topics[:-1]) | (years[1:] != years[:-1])])
+        stops = np.append(starts[1:], len(entries))
+        segments = {(topics[start], int(years[start])): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+        return cls(list(vocabulary), word_codes.astype(np.int32), entries['numbers'].to_numpy(dtype=np.int64), segments)
+
+    def top(self, topic, year, n=50):
+        """
+        Most frequent words of a topic and year.
+
+        :param topic: The topic, or ALL_TOPICS.
+        :type topic: str
+        :param year: The year.
+        :type year: int
+        :param n: Number of words.
+        :type n: int
+        :return: DataFrame with the columns 'words' and 'numbers', sorted by descending count.
+        :rtype: pandas.DataFrame
+        """
+        start, stop = self.segments.get((topic, year), (0, 0))
+        stop = min(stop, start + n)
+        return pd.DataFrame({'words': self.vocabulary[self.word_codes[start:stop]], 'numbers': self.counts[start:stop]})
+
+
+class TermIndex:
+    """
+    Sparse term x (topic, year) matrix of the word counts of a KeywordStore.
+    """
+
+    def __init__(self, store):
+        """
+        :param store: The keyword store.
+        :type store: KeywordStore
+        """
+        self.columns = sorted(store.segments)
+        column_codes = np.zeros(len(store.counts), dtype=np.int32)
+        for column, key in enumerate(self.columns):
+            start, stop = store.segments[key]
+            column_codes[start:stop] = column
+
+        # Duplicate (term, column) entries are summed up
+        self.matrix = sparse.csr_matrix((store.counts, (store.word_codes, column_codes)),
+                                        shape=(len(store.vocabulary), len(self.columns)))
+        self.totals = np.asarray(self.matrix.sum(axis=0)).ravel()
+
+        self._terms = store.vocabulary
+        self._term_pos = {term: i for i, term in enumerate(store.vocabulary)}
+        self._sorted_terms = np.sort(store.vocabulary.astype(str))
+
+    def complete(self, prefix, limit=20):
+        """
+        Terms starting with a prefix, in alphabetical order.
+
+        :param prefix: The beginning of the terms.
+        :type prefix: str
+        :param limit: Maximum number of terms.
+        :type limit: int
+        :return: List of terms.
+        :rtype: list
+        """
+        prefix = prefix.lower()
+        start = np.searchsorted(self._sorted_terms, prefix)
+        terms = self._sorted_terms[start:start + limit]
+        return [term for term in terms if term.startswith(prefix)]
+
+    def top_terms(self, topics, years, n=100):
+        """
+        Most frequent terms of several topics and years combined.
+
+        :param topics: The topics.
+        :type topics: list
+        :param years: The years.
+        :type years: iterable
+        :param n: Number of terms.
+        :type n: int
+        :return: Tuple of (terms, counts), sorted by descending count.
+        :rtype: tuple
+        """
+        topics, years = set(topics), set(years)
+        columns = [i for i, (topic, year) in enumerate(self.columns) if topic in topics and year in years]
+        counts = np.asarray(self.matrix[:, columns].sum(axis=1)).ravel()
+
+        top = np.argpartition(-counts, min(n, len(counts) - 1))[:n] if len(counts) > n else np.arange(len(counts))
+        top = top[counts[top] > 0]
+        top = top[np.lexsort((top, -counts[top]))]
+        return [self._terms[i] for i in top], counts[top]
+
+    def trajectory(self, terms, topic=ALL_TOPICS, share=False):
+        """
+        Counts of terms per year within one topic.
+
+        :param terms: The terms; unknown terms are left out.
+        :type terms: list
+        :param topic: The topic, or ALL_TOPICS.
+        :type topic: str
+        :param share: If True, return the share of all counted words of that year in percent.
+        :type share: bool
+        :return: DataFrame indexed by year with one column per known term.
+        :rtype: pandas.DataFrame
+        """
+        terms = [term for term in dict.fromkeys(terms) if term in self._term_pos]
+        columns = [i for i, (column_topic, year) in enumerate(self.columns) if column_topic == topic]
+        years = pd.Index([self.columns[i][1] for i in columns], name='year')
+
+        values = self.matrix[[self._term_pos[term] for term in terms]][:, columns].toarray().T.astype(float)
+        if share:
+            values = values / np.maximum(self.totals[columns], 1)[:, None] * 100
+        return pd.DataFrame(values, index=years, columns=pd.Index(terms, name='term'))
+
+
+def load_keyword_store(topics, years, topic_folder=TOPIC_FOLDER, yearly_folder=YEARLY_FOLDER):
+    """
+    Scan, validate and load all keyword frequency lists.
+
+    :param topics: Expected topics, including ALL_TOPICS.
+    :type topics: list
+    :param years: Expected years.
+    :type years: iterable
+    :param topic_folder: Folder with the topic files.
+    :type topic_folder: str
+    :param yearly_folder: Folder with the files covering all categories.
+    :type yearly_folder: str
+    :return: The store.
+    :rtype: KeywordStore
+    :raises ValueError: If a file is missing or malformed.
+    """
+    manifest = keyword_manifest(topic_folder, yearly_folder)
+    validate_manifest(manifest, topics, years)
+    return KeywordStore.from_manifest(manifest)
@@ -0,0 +1,87 @@
+import os
+import argparse
+
+# Memory report of the gunicorn master and its workers.
+#
+# The numbers come from /proc/<pid>/smaps_rollup (Linux 4.14 or newer):
+#   unique  Private_Clean + Private_Dirty, memory only this process uses
+#   shared  Shared_Clean + Shared_Dirty, memory also mapped by other processes, e.g. the datasets
+#           the master loaded before the fork and the workers did not modify since
+#   pss     Proportional set size, the shared memory split evenly between its users
+# The sum of the unique memory of all workers is what another worker would roughly add.
+#
+# Print the report of a running server with:
+#   python -m utils.memoryReport <pid of the gunicorn master>
+
+ROLLUP_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def memory_usage(pid):
+    """
+    Read the memory usage of a process.
+
+    :param pid: The process id.
+    :type pid: int
+    :return: Dict with the keys 'rss', 'pss', 'shared' and 'unique' in kB.
+    :rtype: dict
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup', encoding='ascii') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ROLLUP_FIELDS:
+                fields[name] = int(value.split()[0])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'shared': fields['Shared_Clean'] + fields['Shared_Dirty'],
+            'unique': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def child_pids(pid):
+    """
+    Find the direct child processes of a process, e.g. the workers of the gunicorn master.
+
+    :param pid: The process id.
+    :type pid: int
+    :return: The process ids of the children.
+    :rtype: list
+    """
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        try:
+            with open(f'/proc/{pid}/task/{task}/children', encoding='ascii') as f:
+                children += [int(child) for child in f.read().split()]
+        except OSError:
+            continue
+    return sorted(children)
+
+
+def memory_report(master_pid):
+    """
+    Format the memory usage of a master process and its workers as a table.
+
+    :param master_pid: The process id of the gunicorn master.
+    :type master_pid: int
+    :return: The report.
+    :rtype: str
+    """
+    lines = [f"{'process':<16}{'rss MB':>10}{'pss MB':>10}{'shared MB':>12}{'unique MB':>12}"]
+    total = {'rss': 0, 'pss': 0, 'shared': 0, 'unique': 0}
+    for i, pid in enumerate([master_pid] + child_pids(master_pid)):
+        try:
+            usage = memory_usage(pid)
+        except OSError:
+            continue
+        for key in total:
+            total[key] += usage[key]
+        name = f'master {pid}' if i == 0 else f'worker {pid}'
+        lines.append(f"{name:<16}{usage['rss'] / 1024:>10.1f}{usage['pss'] / 1024:>10.1f}"
+                     f"{usage['shared'] / 1024:>12.1f}{usage['unique'] / 1024:>12.1f}")
+    lines.append(f"{'total':<16}{total['rss'] / 1024:>10.1f}{total['pss'] / 1024:>10.1f}"
+                 f"{total['shared'] / 1024:>12.1f}{total['unique'] / 1024:>12.1f}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show the memory usage of the gunicorn master and its workers.')
+    parser.add_argument('pid', type=int, help='process id of the gunicorn master')
+    print(memory_report(parser.parse_args().pid))
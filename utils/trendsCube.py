@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+
+class TrendsCube:
+    """
+    Dense (country, date, category) cube of the top 100 category quantities.
+
+    The cube is built once from the concatenated Trends100vRegions data. Lookups for a single
+    country and date (pie chart) or a single country and category (weekly graph) are plain array
+    slices. All arrays are read-only, so the cube can be shared between callbacks safely.
+    """
+
+    def __init__(self, countries, dates, categories, quantities, present, missing=(), sources=None):
+        """
+        :param countries: ISO2 codes along the first axis.
+        :type countries: list
+        :param dates: Sorted dates along the second axis.
+        :type dates: numpy.ndarray of datetime64[D]
+        :param categories: Category titles along the third axis.
+        :type categories: list
+        :param quantities: Array of shape (countries, dates, categories) with the quantities.
+        :type quantities: numpy.ndarray
+        :param present: Boolean array of shape (countries, dates), True where data was collected.
+        :type present: numpy.ndarray
+        :param missing: (country, date) pairs for which the data collection is known to have failed.
+        :type missing: iterable
+        :param sources: Maps the source files to the number of bytes the cube was built from.
+        :type sources: dict
+        """
+        self.countries = list(countries)
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.categories = list(categories)
+        self.quantities = quantities
+        self.present = present
+        self.missing = frozenset((country, np.datetime64(date, 'D')) for country, date in missing)
+        self.sources = dict(sources or {})
+        self.quantities.flags.writeable = False
+        self.present.flags.writeable = False
+        self.dates.flags.writeable = False
+
+        self._country_pos = {country: i for i, country in enumerate(self.countries)}
+        self._category_pos = {category: i for i, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_frame(cls, df, missing=(), sources=None):
+        """
+        Build the cube from a frame with the columns 'Country', 'Execution Date', 'Category Title'
+        and 'Quantity'. Quantities of duplicate rows are summed up.
+
+        :param df: The concatenated trends data.
+        :type df: pandas.DataFrame
+        :param missing: (country, date) pairs for which the data collection is known to have failed.
+        :type missing: iterable
+        :param sources: Maps the source files to the number of bytes the cube was built from.
+        :type sources: dict
+        :return: The cube.
+        :rtype: TrendsCube
+        """
+        country_codes, countries = pd.factorize(df['Country'], sort=True)
+        category_codes, categories = pd.factorize(df['Category Title'], sort=True)
+        day_values = pd.to_datetime(df['Execution Date']).values.astype('datetime64[D]')
+        dates, date_codes = np.unique(day_values, return_inverse=True)
+
+        quantities = np.zeros((len(countries), len(dates), len(categories)), dtype=np.int32)
+        np.add.at(quantities, (country_codes, date_codes, category_codes), df['Quantity'].to_numpy())
+        present = np.zeros((len(countries), len(dates)), dtype=bool)
+        present[country_codes, date_codes] = True
+
+        return cls(countries, dates, categories, quantities, present, missing, sources)
+
+    def with_rows(self, df, missing=(), sources=None):
+        """
+        Create a new cube that additionally contains the given rows. The cube itself is not changed.
+
+        Only the new rows are processed; the existing quantities are copied over as they are.
+        The rows may only contain (country, date) pairs without data so far, the trends data is
+        append-only.
+
+        :param df: New rows with the columns 'Country', 'Execution Date', 'Category Title' and 'Quantity'.
+        :type df: pandas.DataFrame
+        :param missing: Additional (country, date) pairs for which the data collection failed.
+        :type missing: iterable
+        :param sources: Source files and byte counts that replace the ones of this cube.
+        :type sources: dict
+        :return: The new cube.
+        :rtype: TrendsCube
+        :raises ValueError: If data for one of the (country, date) pairs already exists.
+        """
+        day_values = pd.to_datetime(df['Execution Date']).values.astype('datetime64[D]')
+        countries = sorted(set(self.countries).union(df['Country']))
+        categories = sorted(set(self.categories).union(df['Category Title']))
+        dates = np.union1d(self.dates, day_values)
+
+        country_pos = {country: i for i, country in enumerate(countries)}
+        category_pos = {category: i for i, category in enumerate(categories)}
+        old_countries = [country_pos[country] for country in self.countries]
+        old_categories = [category_pos[category] for category in self.categories]
+        old_dates = np.searchsorted(dates, self.dates)
+
+        quantities = np.zeros((len(countries), len(dates), len(categories)), dtype=np.int32)
+        quantities[np.ix_(old_countries, old_dates, old_categories)] = self.quantities
+        present = np.zeros((len(countries), len(dates)), dtype=bool)
+        present[np.ix_(old_countries, old_dates)] = self.present
+
+        country_codes = df['Country'].map(country_pos).to_numpy(dtype=np.intp)
+        category_codes = df['Category Title'].map(category_pos).to_numpy(dtype=np.intp)
+        date_codes = np.searchsorted(dates, day_values)
+        if present[country_codes, date_codes].any():
+            raise ValueError('Data for some of the (country, date) pairs already exists.')
+
+        np.add.at(quantities, (country_codes, date_codes, category_codes), df['Quantity'].to_numpy(dtype=np.int32))
+        present[country_codes, date_codes] = True
+
+        return TrendsCube(countries, dates, categories, quantities, present,
+                          self.missing.union(missing), self.sources if sources is None else sources)
+
+    def is_missing(self, country, date):
+        """
+        Check whether the data collection for a country and date is known to have failed.
+
+        :param country: ISO2 code of the country.
+        :type country: str
+        :param date: The date, e.g. '2024-03-15'.
+        :type date: str or datetime.date
+        :return: True if the pair was recorded as missing and no data arrived later.
+        :rtype: bool
+        """
+        if (country, np.datetime64(date, 'D')) not in self.missing:
+            return False
+        return self.distribution(country, date).empty
+
+    def date_position(self, date):
+        """
+        Find the position of a date on the date axis.
+
+        :param date: The date, e.g. '2024-03-15'.
+        :type date: str or datetime.date
+        :return: Position of the date, or None if the date is not part of the cube.
+        :rtype: int
+        """
+        day = np.datetime64(date, 'D')
+        position = int(np.searchsorted(self.dates, day))
+        if position < len(self.dates) and self.dates[position] == day:
+            return position
+        return None
+
+    def distribution(self, country, date):
+        """
+        Category distribution of one country on one day.
+
+        :param country: ISO2 code of the country.
+        :type country: str
+        :param date: The date, e.g. '2024-03-15'.
+        :type date: str or datetime.date
+        :return: DataFrame with the columns 'Category Title' and 'Quantity' for all categories
+                 present on that day. Empty if there is no data for the country and date.
+        :rtype: pandas.DataFrame
+        """
+        country_pos = self._country_pos.get(country)
+        date_pos = self.date_position(date)
+        if country_pos is None or date_pos is None or not self.present[country_pos, date_pos]:
+            return pd.DataFrame({'Category Title': [], 'Quantity': []})
+
+        quantities = self.quantities[country_pos, date_pos]
+        mask = quantities > 0
+        return pd.DataFrame({'Category Title': np.asarray(self.categories)[mask], 'Quantity': quantities[mask]})
+
+    def series(self, country, category):
+        """
+        Daily quantities of one category in one country, restricted to the days with data.
+
+        :param country: ISO2 code of the country.
+        :type country: str
+        :param category: Category title.
+        :type category: str
+        :return: DataFrame with the columns 'Execution Date', 'Quantity' and 'Country'.
+        :rtype: pandas.DataFrame
+        """
+        country_pos = self._country_pos.get(country)
+        category_pos = self._category_pos.get(category)
+        if country_pos is None or category_pos is None:
+            return pd.DataFrame({'Execution Date': pd.to_datetime([]), 'Quantity': [], 'Country': []})
+
+        present = self.present[country_pos]
+        return pd.DataFrame({
+            'Execution Date': self.dates[present].astype('datetime64[ns]'),
+            'Quantity': self.quantities[country_pos, present, category_pos],
+            'Country': country,
+        })
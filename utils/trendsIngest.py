@@ -0,0 +1,232 @@
+import io
+import os
+import argparse
+import threading
+import pandas as pd
+
+from utils.dataSchemas import TRENDS, TRENDS_MISSING, SchemaError
+from utils.trendsCube import TrendsCube
+
+# Append-only storage of the daily top 100 category distributions.
+#
+# Every country has one file '{ISO2}_category_distribution.csv' in the data folder. New days are
+# appended to the end of these files and never rewritten, which allows the running app to pick up
+# only the appended bytes instead of re-reading the whole history. Days on which the YouTube API
+# query failed are recorded in a separate ledger, so the page can tell them apart from days that
+# were not collected yet.
+#
+# Ingest new rows from the command line with:
+#   python -m utils.trendsIngest new_rows.csv [--missing DE 2024-03-27 ...]
+# The running app loads the appended data with its next dataset refresh.
+
+TRENDS_FOLDER = 'data/Trends100vRegions'
+FILE_SUFFIX = '_category_distribution.csv'
+MISSING_FILE = 'missing_dates.csv'
+
+FILE_COLUMNS = ['Execution Date', 'Category ID', 'Quantity', 'Category Title']
+MISSING_COLUMNS = ['Country', 'Execution Date']
+
+_ingest_lock = threading.Lock()
+
+
+def country_file(country, folder=TRENDS_FOLDER):
+    return os.path.join(folder, f'{country}{FILE_SUFFIX}')
+
+
+def _read_missing(folder):
+    path = os.path.join(folder, MISSING_FILE)
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, 'rb') as f:
+        content = f.read()
+    missing = TRENDS_MISSING.parse(io.BytesIO(content), name=path)
+    return list(zip(missing['Country'], missing['Execution Date'])), len(content)
+
+
+def load_trends(folder=TRENDS_FOLDER):
+    """
+    Load all country files and the ledger of missing days and build the trends cube.
+
+    :param folder: Folder with the country files.
+    :type folder: str
+    :return: The trends cube, including the number of bytes read from every file.
+    :rtype: TrendsCube
+    """
+    dfs = []
+    sources = {}
+
+    # Concatenate all CSV files into a single DataFrame
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.endswith(FILE_SUFFIX):
+            path = os.path.join(folder, file_name)
+            size = os.path.getsize(path)
+            df = TRENDS.read(path)
+            df['Country'] = file_name[:2]
+            dfs.append(df)
+            sources[path] = size
+    weekly_df = pd.concat(dfs, ignore_index=True)
+
+    missing, sources[os.path.join(folder, MISSING_FILE)] = _read_missing(folder)
+    return TrendsCube.from_frame(weekly_df, missing, sources)
+
+
+def _count_lines(path, offset, chunk_size=1 << 20):
+    # Lines before the offset, counted in chunks so the history is never held in memory
+    lines = 0
+    with open(path, 'rb') as f:
+        while offset > 0:
+            chunk = f.read(min(chunk_size, offset))
+            if not chunk:
+                break
+            lines += chunk.count(b'\n')
+            offset -= len(chunk)
+    return lines
+
+
+def _read_appended_rows(path, offset):
+    """
+    Read the complete lines appended to a country file after the given byte offset.
+
+    :param path: Path to the country file.
+    :type path: str
+    :param offset: Number of bytes already read.
+    :type offset: int
+    :return: Tuple of (rows, new offset).
+    :rtype: tuple
+    :raises SchemaError: If the rows do not match the schema, with their line numbers in the file.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        tail = f.read()
+    # Ignore a line that is still being written.
+    tail = tail[:tail.rfind(b'\n') + 1]
+    if offset == 0:
+        rows = TRENDS.parse(io.BytesIO(tail), name=path)
+    else:
+        rows = TRENDS.parse(io.BytesIO(tail), name=path, first_line=_count_lines(path, offset) + 1,
+                            header=None, names=FILE_COLUMNS)
+    return rows, offset + len(tail)
+
+
+def update_trends(cube, changed_paths, folder=TRENDS_FOLDER):
+    """
+    Bring the trends cube up to date with the bytes appended to the changed files.
+
+    Falls back to a complete reload if a file was shrunk or removed, i.e. not only appended to.
+
+    :param cube: The current cube.
+    :type cube: TrendsCube
+    :param changed_paths: Paths of the files that changed since the cube was built.
+    :type changed_paths: list
+    :param folder: Folder with the country files.
+    :type folder: str
+    :return: The updated cube.
+    :rtype: TrendsCube
+    """
+    sources = dict(cube.sources)
+    new_rows = []
+    missing = []
+    for path in changed_paths:
+        file_name = os.path.basename(path)
+        if not os.path.exists(path) or os.path.getsize(path) < sources.get(path, 0):
+            return load_trends(folder)
+        if file_name == MISSING_FILE:
+            missing, sources[path] = _read_missing(folder)
+        elif file_name.endswith(FILE_SUFFIX):
+            rows, sources[path] = _read_appended_rows(path, sources.get(path, 0))
+            rows['Country'] = file_name[:2]
+            new_rows.append(rows)
+
+    if not new_rows:
+        new_rows.append(pd.DataFrame(columns=FILE_COLUMNS + ['Country']))
+    try:
+        return cube.with_rows(pd.concat(new_rows, ignore_index=True), missing, sources)
+    except ValueError:
+        # Rows for an existing day, the file was edited instead of appended to.
+        return load_trends(folder)
+
+
+def ingest_trends(rows, folder=TRENDS_FOLDER, cube=None):
+    """
+    Append new daily rows to the country files.
+
+    :param rows: Rows with the columns 'Country', 'Execution Date', 'Category ID', 'Quantity' and
+                 'Category Title'. Every (country, date) pair must be new.
+    :type rows: pandas.DataFrame
+    :param folder: Folder with the country files.
+    :type folder: str
+    :param cube: Current trends cube used to check for existing days. Without it, the dates of
+                 the affected country files are read for the check.
+    :type cube: TrendsCube
+    :return: Number of rows written.
+    :rtype: int
+    :raises SchemaError: If the rows of a country do not match the schema of the country files.
+                         Nothing is written in this case.
+    :raises ValueError: If one of the (country, date) pairs is already stored.
+    """
+    missing_columns = [column for column in ['Country'] + FILE_COLUMNS if column not in rows.columns]
+    if missing_columns:
+        raise SchemaError(f"New rows do not match the schema '{TRENDS.name}': missing columns {missing_columns}")
+    rows = rows.copy()
+    rows['Execution Date'] = pd.to_datetime(rows['Execution Date']).dt.strftime('%Y-%m-%d')
+
+    # Parse the rows as they will be written, so an invalid row never makes a country file unreadable
+    payloads = {}
+    for country, country_rows in rows.groupby('Country'):
+        payloads[country] = country_rows[FILE_COLUMNS].to_csv(index=False, lineterminator='\n')
+        TRENDS.parse(io.StringIO(payloads[country]), name=f'new rows for {country}')
+
+    with _ingest_lock:
+        for country, country_rows in rows.groupby('Country'):
+            path = country_file(country, folder)
+            if cube is not None:
+                duplicates = {date for date in country_rows['Execution Date']
+                              if not cube.distribution(country, date).empty}
+            elif os.path.exists(path):
+                stored_dates = set(TRENDS.read(path, usecols=['Execution Date'])['Execution Date'].dt.strftime('%Y-%m-%d'))
+                duplicates = stored_dates.intersection(country_rows['Execution Date'])
+            else:
+                duplicates = set()
+            if duplicates:
+                raise ValueError(f'Data for {country} on {sorted(duplicates)} is already stored.')
+
+        for country, payload in payloads.items():
+            path = country_file(country, folder)
+            if os.path.exists(path):
+                # The header is only written to new files
+                payload = payload[payload.index('\n') + 1:]
+            with open(path, 'a', encoding='utf-8', newline='') as f:
+                f.write(payload)
+    return len(rows)
+
+
+def record_missing(pairs, folder=TRENDS_FOLDER):
+    """
+    Record (country, date) pairs for which the YouTube API query failed.
+
+    :param pairs: Iterable of (ISO2 code, date) pairs.
+    :type pairs: iterable
+    :param folder: Folder with the country files.
+    :type folder: str
+    """
+    missing = pd.DataFrame(list(pairs), columns=MISSING_COLUMNS)
+    missing['Execution Date'] = pd.to_datetime(missing['Execution Date']).dt.strftime('%Y-%m-%d')
+
+    path = os.path.join(folder, MISSING_FILE)
+    with _ingest_lock:
+        missing.to_csv(path, mode='a', header=not os.path.exists(path), index=False, lineterminator='\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append new days to the Trends100vRegions data.')
+    parser.add_argument('rows', nargs='?',
+                        help="CSV with the columns 'Country', 'Execution Date', 'Category ID', 'Quantity', 'Category Title'")
+    parser.add_argument('--missing', nargs=2, action='append', default=[], metavar=('COUNTRY', 'DATE'),
+                        help='record a failed API query for a country and date')
+    args = parser.parse_args()
+
+    if args.rows:
+        print(f'Appended {ingest_trends(pd.read_csv(args.rows))} rows')
+    if args.missing:
+        record_missing(args.missing)
+        print(f'Recorded {len(args.missing)} missing days')
@@ -0,0 +1,221 @@
+import io
+import os
+import base64
+import threading
+import numpy as np
+
+from collections import OrderedDict
+from importlib.util import find_spec
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Server-side rendering of word clouds from word counts.
+#
+# Words are placed from the most to the least frequent one. The canvas is divided into a coarse
+# grid of cells that records which cells are already covered by text. For every word, a summed-area
+# table of that grid gives the number of covered cells below every possible position of the word's
+# bounding box in one vectorized step; among the free positions the one closest to the centre of
+# the canvas is taken. Words that do not fit are retried with smaller font sizes and skipped if
+# they do not fit at the smallest size.
+#
+# Rendered word clouds are kept in a cache of their own, bounded by the size of the encoded images,
+# so the large data URIs do not crowd the small figures out of the callback cache.
+
+WIDTH = 960
+HEIGHT = 384
+BACKGROUND = 'white'
+COLORS = ['#dd2b2b', '#606060', '#121212', '#949494', '#a61c1c']
+
+# Size in pixels of a cell of the occupancy grid
+CELL_SIZE = 4
+MIN_FONT_SIZE = 10
+MAX_FONT_SIZE = 96
+# Margin in pixels around every word
+PADDING = 2
+
+# Memory budget of the cached word clouds in megabytes
+WORDCLOUD_CACHE_MB = float(os.environ.get('WORDCLOUD_CACHE_MB', 16))
+
+# DejaVu Sans ships with matplotlib and covers umlauts and other non-ASCII letters. The file is
+# located without importing matplotlib, which would slow down the start of the app.
+FONT_PATH = os.path.join(find_spec('matplotlib').submodule_search_locations[0], 'mpl-data', 'fonts', 'ttf',
+                         'DejaVuSans.ttf')
+
+
+_fonts = {}
+
+
+def _font(size):
+    if size not in _fonts:
+        _fonts[size] = ImageFont.truetype(FONT_PATH, size=size)
+    return _fonts[size]
+
+
+def _free_position(occupied, box_height, box_width):
+    """
+    Find the free position for a box closest to the centre of the grid.
+
+    :param occupied: Boolean occupancy grid.
+    :type occupied: numpy.ndarray
+    :param box_height: Height of the box in cells.
+    :type box_height: int
+    :param box_width: Width of the box in cells.
+    :type box_width: int
+    :return: (row, column) of the top left cell, or None if the box does not fit anywhere.
+    :rtype: tuple
+    """
+    rows, columns = occupied.shape
+    if box_height > rows or box_width > columns:
+        return None
+
+    # Summed-area table with a leading row and column of zeros
+    table = np.zeros((rows + 1, columns + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(occupied, axis=0), axis=1, out=table[1:, 1:])
+    covered = (table[box_height:, box_width:] - table[:-box_height, box_width:]
+               - table[box_height:, :-box_width] + table[:-box_height, :-box_width])
+
+    free_rows, free_columns = np.nonzero(covered == 0)
+    if len(free_rows) == 0:
+        return None
+    # Distance of the box centres to the grid centre; the x axis is compressed for a wide cloud
+    distance = ((((free_rows + box_height / 2) - rows / 2) * columns / rows) ** 2
+                + ((free_columns + box_width / 2) - columns / 2) ** 2)
+    best = np.argmin(distance)
+    return int(free_rows[best]), int(free_columns[best])
+
+
+def place_words(words, counts, width=WIDTH, height=HEIGHT):
+    """
+    Place the words of a word cloud on the occupancy grid.
+
+    :param words: The words, sorted by descending count.
+    :type words: list
+    :param counts: Count of every word.
+    :type counts: numpy.ndarray
+    :param width: Width of the image in pixels.
+    :type width: int
+    :param height: Height of the image in pixels.
+    :type height: int
+    :return: (font size, box) of every word, None for the words that did not fit. The box is the
+             (left, top, right, bottom) of the occupied cells in pixels, including the padding.
+    :rtype: list
+    """
+    occupied = np.zeros((height // CELL_SIZE, width // CELL_SIZE), dtype=bool)
+    if len(words) == 0:
+        return []
+
+    # Font sizes scale with the square root of the relative count
+    relative = np.sqrt(np.asarray(counts, dtype=float) / max(counts[0], 1))
+    sizes = (MIN_FONT_SIZE + (MAX_FONT_SIZE - MIN_FONT_SIZE) * relative).astype(int)
+
+    placements = []
+    for word, size in zip(words, sizes):
+        placement = None
+        while size >= MIN_FONT_SIZE:
+            left, top, right, bottom = _font(int(size)).getbbox(word)
+            box_width = -(-(right - left + 2 * PADDING) // CELL_SIZE)
+            box_height = -(-(bottom - top + 2 * PADDING) // CELL_SIZE)
+            position = _free_position(occupied, box_height, box_width)
+            if position is not None:
+                row, column = position
+                occupied[row:row + box_height, column:column + box_width] = True
+                placement = int(size), (column * CELL_SIZE, row * CELL_SIZE,
+                                        (column + box_width) * CELL_SIZE, (row + box_height) * CELL_SIZE)
+                break
+            size = int(size * 0.8)
+        placements.append(placement)
+    return placements
+
+
+def render_wordcloud(words, counts, width=WIDTH, height=HEIGHT):
+    """
+    Render a word cloud.
+
+    :param words: The words, sorted by descending count.
+    :type words: list
+    :param counts: Count of every word.
+    :type counts: numpy.ndarray
+    :param width: Width of the image in pixels.
+    :type width: int
+    :param height: Height of the image in pixels.
+    :type height: int
+    :return: The word cloud.
+    :rtype: PIL.Image.Image
+    """
+    image = Image.new('RGB', (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    for i, (word, placement) in enumerate(zip(words, place_words(words, counts, width, height))):
+        if placement is None:
+            continue
+        size, (box_left, box_top, _, _) = placement
+        font = _font(size)
+        left, top, _, _ = font.getbbox(word)
+        draw.text((box_left + PADDING - left, box_top + PADDING - top), word, font=font, fill=COLORS[i % len(COLORS)])
+    return image
+
+
+def encode_image(image):
+    """
+    Encode an image as WebP data URI for the src of an html.Img.
+
+    :param image: The image.
+    :type image: PIL.Image.Image
+    :return: The data URI.
+    :rtype: str
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', quality=85)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class WordCloudCache:
+    """
+    LRU cache of rendered word clouds as data URIs, bounded by their total size.
+    """
+
+    def __init__(self, budget_mb=WORDCLOUD_CACHE_MB):
+        """
+        :param budget_mb: Memory budget in megabytes; the least recently used word clouds are
+                          removed beyond it.
+        :type budget_mb: float
+        """
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, frequencies):
+        """
+        Get a rendered word cloud, rendering it on a cache miss.
+
+        :param key: Hashable description of the selection and its data, e.g. (topics, year range,
+                    top N, dataset fingerprint).
+        :type key: tuple
+        :param frequencies: Function without arguments returning the (words, counts) to render.
+        :type frequencies: callable
+        :return: The word cloud as WebP data URI.
+        :rtype: str
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Render outside of the lock, so other selections are not blocked
+        uri = encode_image(render_wordcloud(*frequencies()))
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = uri
+                self._size += len(uri)
+            while self._size > self.budget and len(self._entries) > 1:
+                self._size -= len(self._entries.popitem(last=False)[1])
+        return uri
+
+    def size(self):
+        """
+        :return: Total size of the cached data URIs in bytes.
+        :rtype: int
+        """
+        with self._lock:
+            return self._size